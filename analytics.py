@@ -0,0 +1,81 @@
+"""Platform analytics read from the trigger-maintained rollup tables
+
+Usage: python analytics.py [--rebuild]   print the summary (or recompute rollups first)
+"""
+import argparse
+import sys
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from config import DATABASE_URL
+
+
+def platform_summary(session):
+    """Sections 6.1-6.3 and 7 totals: a sum over the 16 platform_stats slots"""
+    row = session.execute(text("""
+        SELECT coalesce(sum(accepted_count), 0) AS accepted_count,
+               coalesce(sum(accepted_hours), 0) AS accepted_hours,
+               coalesce(sum(total_cost), 0) AS total_cost,
+               coalesce(sum(job_count), 0) AS job_count,
+               coalesce(sum(application_count), 0) AS application_count
+        FROM platform_stats
+    """)).one()
+    summary = dict(row._mapping)
+    summary['average_pay'] = summary['total_cost'] / summary['accepted_count'] if summary['accepted_count'] else None
+    summary['applicants_per_job'] = summary['application_count'] / summary['job_count'] if summary['job_count'] else None
+    return summary
+
+
+def top_earners(session, average_pay=None, limit=10):
+    """Caregivers by accepted earnings; with average_pay, only those whose pay per appointment beats it (6.4)"""
+    sql = """
+        SELECT s.caregiver_user_id, u.given_name, u.surname, s.hourly_rate, s.accepted_count, s.accepted_hours,
+               s.hourly_rate * s.accepted_hours AS earnings
+        FROM caregiver_stats s
+        JOIN "user" u ON u.user_id = s.caregiver_user_id
+        WHERE s.accepted_count > 0
+    """
+    params = {'limit': limit}
+    if average_pay is not None:
+        sql += " AND s.hourly_rate * s.accepted_hours / s.accepted_count > :average_pay"
+        params['average_pay'] = average_pay
+    sql += " ORDER BY s.hourly_rate * s.accepted_hours DESC LIMIT :limit"
+    return session.execute(text(sql), params).all()
+
+
+def busiest_jobs(session, limit=10):
+    """Jobs with the most applicants (6.1), read from job_stats by index"""
+    return session.execute(text("""
+        SELECT s.job_id, s.applicant_count, j.required_caregiving_type
+        FROM job_stats s
+        JOIN job j ON j.job_id = s.job_id
+        ORDER BY s.applicant_count DESC, s.job_id
+        LIMIT :limit
+    """), {'limit': limit}).all()
+
+
+def rebuild(session):
+    session.execute(text("SELECT rebuild_analytics_rollups()"))
+    session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print platform analytics from the rollup tables')
+    parser.add_argument('--rebuild', action='store_true', help='recompute all rollups from the base tables first')
+    args = parser.parse_args()
+    session = sessionmaker(bind=create_engine(DATABASE_URL))()
+    try:
+        if args.rebuild:
+            rebuild(session)
+            print("Rollups rebuilt")
+        summary = platform_summary(session)
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+    finally:
+        session.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,11 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, has_request_context, g
+from flask import session as flask_session
+from sqlalchemy import delete
+from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, date, time
 import os
+import logging
 import traceback
 
 try:
@@ -12,87 +14,140 @@ try:
 except ImportError:
     pass  # python-dotenv not installed, skip
 
-from config import DATABASE_URL
-if DATABASE_URL:
-    if '@' in DATABASE_URL:
-        parts = DATABASE_URL.split('@')
-        if '://' in parts[0] and ':' in parts[0].split('://')[1]:
-            protocol_user = parts[0].split('://')
-            user_pass = protocol_user[1].split(':')
-            print(f"Using DATABASE_URL: {protocol_user[0]}://{user_pass[0]}:****@{parts[1]}")
+from config import LOG_LEVEL, MATVIEW_MAX_STALENESS, SECRET_KEY, REPLICA_URLS, REPLICA_PIN_SECONDS
+from config import MAINTENANCE_CHUNK_SIZE, MAINTENANCE_REQUEST_CHUNKS
+from changes import on_commit, mark_changed
+import db
 from models import Base, User, Caregiver, Member, Address, Job, JobApplication, Appointment
+from pagination import paginate
+from streaming import wants_stream, stream_list
+from options_cache import dropdown_options, options_cache
+from fragment_cache import cached_rows, fragment_cache
+import instrumentation
+from instrumentation import query_budget
+from versions import conditional, reads_from_replica
+import list_queries
+import search
+from matching import match_caregivers, caregiver_index
+import matviews
+import analytics
+import export
+import batch_api
+import booking
+import availability
+import maintenance
+from validation import CAREGIVING_TYPES, GENDERS, APPOINTMENT_STATUSES, date_value
 from flask import abort
 
-app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s %(message)s')
+logger = logging.getLogger(__name__)
 
-try:
-    engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
-    Session = sessionmaker(bind=engine) #create database engine and session with error handling
-
-    with engine.connect() as conn:
-        conn.execute(text("SELECT 1")) #test connection
-    if DATABASE_URL and '@' in DATABASE_URL:
-        db_info = DATABASE_URL.split('@')[1]
-        print(f"✓ Database connection successful: {db_info}") #mask password in log output
-    else:
-        print(f"✓ Database connection successful")
-except Exception as e:
-    print(f"✗ Database connection error: {e}")
-    if DATABASE_URL:
-        if '@' in DATABASE_URL:
-            parts = DATABASE_URL.split('@')
-            if '://' in parts[0] and ':' in parts[0].split('://')[1]:
-                protocol_user = parts[0].split('://')
-                user_pass = protocol_user[1].split(':')
-                masked_url = f"{protocol_user[0]}://{user_pass[0]}:****@{parts[1]}"
-                print(f"  DATABASE_URL: {masked_url}")
-            else:
-                print(f"  DATABASE_URL: {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else 'configured'}")
-        else:
-            print(f"  DATABASE_URL: configured")
-    else:
-        print(f"  DATABASE_URL: not set")
-    print("\nTroubleshooting:")
-    print("  1. Check if database service is running: brew services list | grep postgresql")
-    print("  2. Check if database user exists: psql -U nazerke -l")
-    print("  3. Check if port is correct (should be 5433)")
-    print("  4. Check if password is correct")
-    print("  5. If using environment variable, check: echo $DATABASE_URL")
-def get_session():
-    try:
-        return Session()
+db.on_engine(instrumentation.instrument_engine) #engines are created lazily, once per process
+
+
+class RouteCollector:
+    """Records @route/@errorhandler views at import so create_app() can attach them to any app
+
+    Unlike a Blueprint this keeps the plain endpoint names ('user_list', not
+    'main.user_list') that every url_for() in the templates uses.
+    """
+
+    def __init__(self):
+        self.rules = []
+        self.error_handlers = []
+
+    def route(self, rule, **options):
+        def decorator(view):
+            self.rules.append((rule, view, options))
+            return view
+        return decorator
+
+    def errorhandler(self, code_or_exception):
+        def decorator(handler):
+            self.error_handlers.append((code_or_exception, handler))
+            return handler
+        return decorator
+
+    def register(self, app):
+        for rule, view, options in self.rules:
+            app.add_url_rule(rule, view_func=view, **options)
+        for code_or_exception, handler in self.error_handlers:
+            app.register_error_handler(code_or_exception, handler)
+
+
+routes = RouteCollector()
+
+
+def create_app(config=None):
+    """Build the Flask app; no database connection is made until the first query"""
+    app = Flask(__name__)
+    app.secret_key = SECRET_KEY
+    app.config.update(config or {})
+    instrumentation.init_app(app) #X-DB-Queries / Server-Timing headers and per-request log line
+    routes.register(app)
+    return app
+
+
+def get_session(): #GET/HEAD may read from a replica, unless this client wrote in the last REPLICA_PIN_SECONDS
+    try:
+        session = db.Session(replica=reads_from_replica())
+        if 'replica_engine' in g: #the server conditional() read the table versions from
+            session.info['replica_engine'] = g.replica_engine
+        return session
     except Exception as e:
         raise SQLAlchemyError(f"Failed to create database session: {e}")
 
 
+@on_commit
+def _pin_to_primary(tables, keys):
+    #the redirect that follows a POST must show the write, which a lagging replica may not have yet
+    if REPLICA_URLS and has_request_context():
+        flask_session['primary_until'] = datetime.now().timestamp() + REPLICA_PIN_SECONDS
+
+
 def first_or_404(query):
     result = query.first()
     if result is None:
         abort(404)
     return result
-@app.route('/')
+
+
+def delete_or_404(session, model, **keys):
+    """Delete one row with a single DELETE; ON DELETE CASCADE in the database removes its children"""
+    table = model.__table__
+    result = session.execute(delete(model).filter_by(**keys).execution_options(synchronize_session=False))
+    if not result.rowcount:
+        abort(404)
+    mark_changed(session, table.name, deleted=True, keys={tuple(keys[col.key] for col in table.primary_key.columns)})
+
+
+@routes.route('/')
 def index():
     return render_template('index.html')
 
 #User routes
-@app.route('/users')
+@routes.route('/users')
+@conditional('user')
+@query_budget(1)
 def user_list(): #list all users
     session = get_session()
     try:
-        users = session.query(User).all()
-        return render_template('user_list.html', users=users)
+        query, columns = list_queries.users(session)
+        if wants_stream():
+            return stream_list(session, 'user_list.html', 'users', query, columns)
+        page, rows_html = cached_rows('users', query, columns)
+        return render_template('user_list.html', users=page.items, page=page, rows_html=rows_html)
     except SQLAlchemyError as e:
         flash(f'Database error: {str(e)}', 'error')
-        return render_template('user_list.html', users=[])
+        return render_template('user_list.html', users=[], page=None)
     except Exception as e:
         flash(f'Error loading users: {str(e)}', 'error')
-        return render_template('user_list.html', users=[])
+        return render_template('user_list.html', users=[], page=None)
     finally:
         session.close()
 
 
-@app.route('/users/create', methods=['GET', 'POST'])
+@routes.route('/users/create', methods=['GET', 'POST'])
 def user_create(): #create a new user
     if request.method == 'POST':
         session = get_session()
@@ -133,7 +188,7 @@ def user_create(): #create a new user
     return render_template('user_form.html', user=None)
 
 
-@app.route('/users/<int:user_id>/edit', methods=['GET', 'POST'])
+@routes.route('/users/<int:user_id>/edit', methods=['GET', 'POST'])
 def user_edit(user_id): #edit an existing user
     session = get_session()
     try:
@@ -156,12 +211,11 @@ def user_edit(user_id): #edit an existing user
         session.close()
 
 
-@app.route('/users/<int:user_id>/delete', methods=['POST'])
+@routes.route('/users/<int:user_id>/delete', methods=['POST'])
 def user_delete(user_id): #delete user
     session = get_session()
     try:
-        user = first_or_404(session.query(User).filter_by(user_id=user_id))
-        session.delete(user)
+        delete_or_404(session, User, user_id=user_id)
         session.commit()
         flash('User deleted successfully!', 'success')
     except Exception as e:
@@ -172,29 +226,34 @@ def user_delete(user_id): #delete user
     return redirect(url_for('user_list'))
 
 #caregiver routes
-@app.route('/caregivers')
+@routes.route('/caregivers')
+@conditional('caregiver', 'user')
+@query_budget(1)
 def caregiver_list():#List all caregivers with user information
     session = get_session()
     try:
-        caregivers = session.query(Caregiver).join(User).all()
-        return render_template('caregiver_list.html', caregivers=caregivers)
+        query, columns = list_queries.caregivers(session)
+        if wants_stream():
+            return stream_list(session, 'caregiver_list.html', 'caregivers', query, columns)
+        page, rows_html = cached_rows('caregivers', query, columns)
+        return render_template('caregiver_list.html', caregivers=page.items, page=page, rows_html=rows_html)
     finally:
         session.close()
 
 
-@app.route('/caregivers/create', methods=['GET', 'POST'])
+@routes.route('/caregivers/create', methods=['GET', 'POST'])
 def caregiver_create(): #Create a new caregiver
     session = get_session()
     try:
         if request.method == 'POST':
             try:
                 gender_value = request.form.get('gender', '').strip()
-                gender_value = gender_value if gender_value in ('M', 'F', 'O') else None
+                gender_value = gender_value if gender_value in GENDERS else None
                 
                 caregiving_type = request.form.get('caregiving_type', '').strip()
-                if not caregiving_type or caregiving_type not in ('Babysitter', 'Elderly Care', 'Playmate'):
+                if not caregiving_type or caregiving_type not in CAREGIVING_TYPES:
                     flash('Invalid caregiving type. Must be one of: Babysitter, Elderly Care, Playmate', 'error')
-                    users = session.query(User).all()
+                    users = dropdown_options('users', session)
                     return render_template('caregiver_form.html', caregiver=None, users=users)
                 
                 hourly_rate = None
@@ -205,7 +264,7 @@ def caregiver_create(): #Create a new caregiver
                             raise ValueError("Hourly rate cannot be negative")
                     except ValueError as e:
                         flash(f'Invalid hourly rate: {str(e)}', 'error')
-                        users = session.query(User).all()
+                        users = dropdown_options('users', session)
                         return render_template('caregiver_form.html', caregiver=None, users=users)
                 
                 caregiver = Caregiver(
@@ -222,12 +281,12 @@ def caregiver_create(): #Create a new caregiver
             except ValueError as e:
                 session.rollback()
                 flash(f'Invalid input: {str(e)}', 'error')
-                users = session.query(User).all()
+                users = dropdown_options('users', session)
                 return render_template('caregiver_form.html', caregiver=None, users=users)
             except KeyError as e:
                 session.rollback()
                 flash(f'Missing required field: {str(e)}', 'error')
-                users = session.query(User).all()
+                users = dropdown_options('users', session)
                 return render_template('caregiver_form.html', caregiver=None, users=users)
             except SQLAlchemyError as e:
                 session.rollback()
@@ -240,21 +299,21 @@ def caregiver_create(): #Create a new caregiver
                     flash('Invalid user ID. The selected user does not exist.', 'error')
                 else:
                     flash(f'Database error: {error_msg}', 'error')
-                users = session.query(User).all()
+                users = dropdown_options('users', session)
                 return render_template('caregiver_form.html', caregiver=None, users=users)
             except Exception as e:
                 session.rollback()
                 flash(f'Error creating caregiver: {str(e)}', 'error')
-                users = session.query(User).all()
+                users = dropdown_options('users', session)
                 return render_template('caregiver_form.html', caregiver=None, users=users)
         
-        users = session.query(User).all()
+        users = dropdown_options('users', session)
         return render_template('caregiver_form.html', caregiver=None, users=users)
     finally:
         session.close()
 
 
-@app.route('/caregivers/<int:caregiver_user_id>/edit', methods=['GET', 'POST'])
+@routes.route('/caregivers/<int:caregiver_user_id>/edit', methods=['GET', 'POST'])
 def caregiver_edit(caregiver_user_id): #Edit an existing caregiver
     session = get_session()
     try:
@@ -263,12 +322,12 @@ def caregiver_edit(caregiver_user_id): #Edit an existing caregiver
         if request.method == 'POST':
             caregiver.photo = request.form.get('photo', '') or None
             gender_value = request.form.get('gender', '').strip()
-            caregiver.gender = gender_value if gender_value in ('M', 'F', 'O') else None
+            caregiver.gender = gender_value if gender_value in GENDERS else None
             
             caregiving_type = request.form.get('caregiving_type', '').strip()
-            if not caregiving_type or caregiving_type not in ('Babysitter', 'Elderly Care', 'Playmate'):
+            if not caregiving_type or caregiving_type not in CAREGIVING_TYPES:
                 flash('Invalid caregiving type. Must be one of: Babysitter, Elderly Care, Playmate', 'error')
-                users = session.query(User).all()
+                users = dropdown_options('users', session)
                 return render_template('caregiver_form.html', caregiver=caregiver, users=users)
             caregiver.caregiving_type = caregiving_type
             
@@ -277,18 +336,17 @@ def caregiver_edit(caregiver_user_id): #Edit an existing caregiver
             flash('Caregiver updated successfully!', 'success')
             return redirect(url_for('caregiver_list'))
         
-        users = session.query(User).all()
+        users = dropdown_options('users', session)
         return render_template('caregiver_form.html', caregiver=caregiver, users=users)
     finally:
         session.close()
 
 
-@app.route('/caregivers/<int:caregiver_user_id>/delete', methods=['POST'])
+@routes.route('/caregivers/<int:caregiver_user_id>/delete', methods=['POST'])
 def caregiver_delete(caregiver_user_id):
     session = get_session()
     try:
-        caregiver = first_or_404(session.query(Caregiver).filter_by(caregiver_user_id=caregiver_user_id))
-        session.delete(caregiver)
+        delete_or_404(session, Caregiver, caregiver_user_id=caregiver_user_id)
         session.commit()
         flash('Caregiver deleted successfully!', 'success')
     except Exception as e:
@@ -298,18 +356,128 @@ def caregiver_delete(caregiver_user_id):
         session.close()
     return redirect(url_for('caregiver_list'))
 
+
+@routes.route('/caregivers/<int:caregiver_user_id>/conflicts')
+@query_budget(2)
+def caregiver_conflicts(caregiver_user_id): #overlapping appointments for one caregiver
+    try:
+        since = date_value(request.args, 'since', default=date.today())
+    except ValueError as e:
+        flash(str(e), 'error')
+        since = date.today()
+    session = get_session()
+    try:
+        caregiver = first_or_404(session.query(Caregiver).options(joinedload(Caregiver.user))
+                                 .filter_by(caregiver_user_id=caregiver_user_id))
+        conflicts, checked = booking.caregiver_conflicts(session, caregiver_user_id, since=since)
+        return render_template('caregiver_conflicts.html', caregiver=caregiver, conflicts=conflicts,
+                               checked=checked, since=since)
+    finally:
+        session.close()
+
+
+@routes.route('/caregivers/<int:caregiver_user_id>/availability', methods=['GET', 'POST'])
+def caregiver_availability(caregiver_user_id): #weekly free hours, one HH:MM-HH:MM list per day
+    session = get_session()
+    try:
+        caregiver = first_or_404(session.query(Caregiver).options(joinedload(Caregiver.user))
+                                 .filter_by(caregiver_user_id=caregiver_user_id))
+        if request.method == 'POST':
+            try:
+                days = {day: availability.parse_ranges(request.form.get(day, '')) for day in availability.DAYS}
+                availability.set_weekly(session, caregiver_user_id, availability.week_from_days(days))
+                session.commit()
+                flash('Availability updated successfully!', 'success')
+                return redirect(url_for('caregiver_availability', caregiver_user_id=caregiver_user_id))
+            except ValueError as e:
+                flash(f'Invalid availability: {str(e)}', 'error')
+                ranges = {day: request.form.get(day, '') for day in availability.DAYS}
+                return render_template('caregiver_availability.html', caregiver=caregiver, ranges=ranges)
+        weekly = availability.get_weekly(session, caregiver_user_id)
+        ranges = {day: availability.ranges_of(availability.day_bits(weekly, i)) for i, day in enumerate(availability.DAYS)}
+        return render_template('caregiver_availability.html', caregiver=caregiver, ranges=ranges)
+    finally:
+        session.close()
+
+
+@routes.route('/availability')
+@query_budget(4)
+def availability_search(): #caregivers free for a whole time window on a given day
+    results, criteria = None, None
+    if request.args:
+        try:
+            criteria = availability.parse_search(request.args)
+        except ValueError as e:
+            flash(f'Invalid search: {str(e)}', 'error')
+    if criteria:
+        session = get_session()
+        try:
+            results = availability.find_available(session, **criteria)
+        finally:
+            session.close()
+    return render_template('availability_search.html', results=results, criteria=criteria,
+                           caregiving_types=CAREGIVING_TYPES, days=availability.DAYS)
+
+
+@routes.route('/api/availability')
+@query_budget(4)
+def availability_api(): #JSON form of /availability
+    try:
+        criteria = availability.parse_search(request.args)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    session = get_session()
+    try:
+        results = availability.find_available(session, **criteria)
+    finally:
+        session.close()
+    return jsonify(date=criteria['on_date'].isoformat(), start=criteria['start'].strftime('%H:%M'),
+                   end=criteria['end'].strftime('%H:%M'),
+                   caregivers=[{'caregiver_user_id': e.caregiver_user_id, 'given_name': e.given_name,
+                                'surname': e.surname, 'city': e.city,
+                                'hourly_rate': str(e.hourly_rate) if e.hourly_rate is not None else None}
+                               for e in results])
+
 #member routes
-@app.route('/members')
+@routes.route('/members')
+@conditional('member', 'user')
+@query_budget(1)
 def member_list():
     session = get_session()
     try:
-        members = session.query(Member).join(User).all()
-        return render_template('member_list.html', members=members)
+        query, columns = list_queries.members(session)
+        if wants_stream():
+            return stream_list(session, 'member_list.html', 'members', query, columns)
+        page, rows_html = cached_rows('members', query, columns)
+        return render_template('member_list.html', members=page.items, page=page, rows_html=rows_html)
     finally:
         session.close()
 
 
-@app.route('/members/create', methods=['GET', 'POST'])
+@routes.route('/members/search')
+@query_budget(1)
+def member_search(): #ranked full-text / substring search over house rules
+    q = request.args.get('q', '').strip()
+    mode = request.args.get('mode', 'fulltext')
+    mode = mode if mode in search.SEARCH_MODES else 'fulltext'
+    city = request.args.get('city', '').strip()
+    caregiving_type = request.args.get('caregiving_type', '')
+    caregiving_type = caregiving_type if caregiving_type in CAREGIVING_TYPES else ''
+    results = []
+    if q:
+        session = get_session()
+        try:
+            results = session.execute(search.member_search(q, mode=mode, city=city or None,
+                                                           caregiving_type=caregiving_type or None)).all()
+        except SQLAlchemyError as e:
+            flash(f'Database error: {str(e)}', 'error')
+        finally:
+            session.close()
+    return render_template('member_search.html', results=results, q=q, mode=mode, city=city,
+                           caregiving_type=caregiving_type, caregiving_types=CAREGIVING_TYPES)
+
+
+@routes.route('/members/create', methods=['GET', 'POST'])
 def member_create():
     session = get_session()
     try:
@@ -327,12 +495,12 @@ def member_create():
             except ValueError as e:
                 session.rollback()
                 flash(f'Invalid input: {str(e)}', 'error')
-                users = session.query(User).all()
+                users = dropdown_options('users', session)
                 return render_template('member_form.html', member=None, users=users)
             except KeyError as e:
                 session.rollback()
                 flash(f'Missing required field: {str(e)}', 'error')
-                users = session.query(User).all()
+                users = dropdown_options('users', session)
                 return render_template('member_form.html', member=None, users=users)
             except SQLAlchemyError as e:
                 session.rollback()
@@ -343,21 +511,21 @@ def member_create():
                     flash('Invalid user ID. The selected user does not exist.', 'error')
                 else:
                     flash(f'Database error: {error_msg}', 'error')
-                users = session.query(User).all()
+                users = dropdown_options('users', session)
                 return render_template('member_form.html', member=None, users=users)
             except Exception as e:
                 session.rollback()
                 flash(f'Error creating member: {str(e)}', 'error')
-                users = session.query(User).all()
+                users = dropdown_options('users', session)
                 return render_template('member_form.html', member=None, users=users)
         
-        users = session.query(User).all()
+        users = dropdown_options('users', session)
         return render_template('member_form.html', member=None, users=users)
     finally:
         session.close()
 
 
-@app.route('/members/<int:member_user_id>/edit', methods=['GET', 'POST'])
+@routes.route('/members/<int:member_user_id>/edit', methods=['GET', 'POST'])
 def member_edit(member_user_id): #edit an existing model
     session = get_session()
     try:
@@ -370,18 +538,17 @@ def member_edit(member_user_id): #edit an existing model
             flash('Member updated successfully!', 'success')
             return redirect(url_for('member_list'))
         
-        users = session.query(User).all()
+        users = dropdown_options('users', session)
         return render_template('member_form.html', member=member, users=users)
     finally:
         session.close()
 
 
-@app.route('/members/<int:member_user_id>/delete', methods=['POST'])
+@routes.route('/members/<int:member_user_id>/delete', methods=['POST'])
 def member_delete(member_user_id):
     session = get_session()
     try:
-        member = first_or_404(session.query(Member).filter_by(member_user_id=member_user_id))
-        session.delete(member)
+        delete_or_404(session, Member, member_user_id=member_user_id)
         session.commit()
         flash('Member deleted successfully!', 'success')
     except Exception as e:
@@ -393,17 +560,22 @@ def member_delete(member_user_id):
 
 
 #address routes
-@app.route('/addresses')
+@routes.route('/addresses')
+@conditional('address', 'member', 'user')
+@query_budget(1)
 def address_list(): #List all addresses with member information
     session = get_session()
     try:
-        addresses = session.query(Address).join(Member).join(User).all()
-        return render_template('address_list.html', addresses=addresses)
+        query, columns = list_queries.addresses(session)
+        if wants_stream():
+            return stream_list(session, 'address_list.html', 'addresses', query, columns)
+        page, rows_html = cached_rows('addresses', query, columns)
+        return render_template('address_list.html', addresses=page.items, page=page, rows_html=rows_html)
     finally:
         session.close()
 
 
-@app.route('/addresses/create', methods=['GET', 'POST'])
+@routes.route('/addresses/create', methods=['GET', 'POST'])
 def address_create():
     session = get_session()
     try:
@@ -422,12 +594,12 @@ def address_create():
             except ValueError as e:
                 session.rollback()
                 flash(f'Invalid input: {str(e)}', 'error')
-                members = session.query(Member).join(User).all()
+                members = dropdown_options('members', session)
                 return render_template('address_form.html', address=None, members=members)
             except KeyError as e:
                 session.rollback()
                 flash(f'Missing required field: {str(e)}', 'error')
-                members = session.query(Member).join(User).all()
+                members = dropdown_options('members', session)
                 return render_template('address_form.html', address=None, members=members)
             except SQLAlchemyError as e:
                 session.rollback()
@@ -438,21 +610,21 @@ def address_create():
                     flash('Invalid member ID. The selected member does not exist.', 'error')
                 else:
                     flash(f'Database error: {error_msg}', 'error')
-                members = session.query(Member).join(User).all()
+                members = dropdown_options('members', session)
                 return render_template('address_form.html', address=None, members=members)
             except Exception as e:
                 session.rollback()
                 flash(f'Error creating address: {str(e)}', 'error')
-                members = session.query(Member).join(User).all()
+                members = dropdown_options('members', session)
                 return render_template('address_form.html', address=None, members=members)
         
-        members = session.query(Member).join(User).all()
+        members = dropdown_options('members', session)
         return render_template('address_form.html', address=None, members=members)
     finally:
         session.close()
 
 
-@app.route('/addresses/<int:member_user_id>/edit', methods=['GET', 'POST'])
+@routes.route('/addresses/<int:member_user_id>/edit', methods=['GET', 'POST'])
 def address_edit(member_user_id): #Edit an existing address
     session = get_session()
     try:
@@ -466,18 +638,17 @@ def address_edit(member_user_id): #Edit an existing address
             flash('Address updated successfully!', 'success')
             return redirect(url_for('address_list'))
         
-        members = session.query(Member).join(User).all()
+        members = dropdown_options('members', session)
         return render_template('address_form.html', address=address, members=members)
     finally:
         session.close()
 
 
-@app.route('/addresses/<int:member_user_id>/delete', methods=['POST'])
+@routes.route('/addresses/<int:member_user_id>/delete', methods=['POST'])
 def address_delete(member_user_id):
     session = get_session()
     try:
-        address = first_or_404(session.query(Address).filter_by(member_user_id=member_user_id))
-        session.delete(address)
+        delete_or_404(session, Address, member_user_id=member_user_id)
         session.commit()
         flash('Address deleted successfully!', 'success')
     except Exception as e:
@@ -488,17 +659,43 @@ def address_delete(member_user_id):
     return redirect(url_for('address_list'))
 
 #job routes
-@app.route('/jobs')
+@routes.route('/jobs')
+@conditional('job', 'member', 'user')
+@query_budget(1)
 def job_list(): #list all jobs with member information
     session = get_session()
     try:
-        jobs = session.query(Job).join(Member).join(User).all()
-        return render_template('job_list.html', jobs=jobs)
+        query, columns = list_queries.jobs(session)
+        if wants_stream():
+            return stream_list(session, 'job_list.html', 'jobs', query, columns)
+        page, rows_html = cached_rows('jobs', query, columns)
+        return render_template('job_list.html', jobs=page.items, page=page, rows_html=rows_html)
     finally:
         session.close()
 
 
-@app.route('/jobs/create', methods=['GET', 'POST'])
+@routes.route('/jobs/search')
+@query_budget(1)
+def job_search(): #ranked full-text / substring search over job requirements
+    q = request.args.get('q', '').strip()
+    mode = request.args.get('mode', 'fulltext')
+    mode = mode if mode in search.SEARCH_MODES else 'fulltext'
+    caregiving_type = request.args.get('caregiving_type', '')
+    caregiving_type = caregiving_type if caregiving_type in CAREGIVING_TYPES else ''
+    results = []
+    if q:
+        session = get_session()
+        try:
+            results = session.execute(search.job_search(q, mode=mode, caregiving_type=caregiving_type or None)).all()
+        except SQLAlchemyError as e:
+            flash(f'Database error: {str(e)}', 'error')
+        finally:
+            session.close()
+    return render_template('job_search.html', results=results, q=q, mode=mode, caregiving_type=caregiving_type,
+                           caregiving_types=CAREGIVING_TYPES)
+
+
+@routes.route('/jobs/create', methods=['GET', 'POST'])
 def job_create():
     session = get_session()
     try:
@@ -511,13 +708,13 @@ def job_create():
                         date_posted = datetime.strptime(date_posted_str, '%Y-%m-%d').date()
                     except ValueError:
                         flash('Invalid date format. Please use YYYY-MM-DD format.', 'error')
-                        members = session.query(Member).join(User).all()
+                        members = dropdown_options('members', session)
                         return render_template('job_form.html', job=None, members=members)
                 
                 required_caregiving_type = request.form.get('required_caregiving_type', '').strip()
-                if not required_caregiving_type or required_caregiving_type not in ('Babysitter', 'Elderly Care', 'Playmate'):
+                if not required_caregiving_type or required_caregiving_type not in CAREGIVING_TYPES:
                     flash('Invalid caregiving type. Must be one of: Babysitter, Elderly Care, Playmate', 'error')
-                    members = session.query(Member).join(User).all()
+                    members = dropdown_options('members', session)
                     return render_template('job_form.html', job=None, members=members)
                 
                 job = Job(
@@ -533,12 +730,12 @@ def job_create():
             except ValueError as e:
                 session.rollback()
                 flash(f'Invalid input: {str(e)}', 'error')
-                members = session.query(Member).join(User).all()
+                members = dropdown_options('members', session)
                 return render_template('job_form.html', job=None, members=members)
             except KeyError as e:
                 session.rollback()
                 flash(f'Missing required field: {str(e)}', 'error')
-                members = session.query(Member).join(User).all()
+                members = dropdown_options('members', session)
                 return render_template('job_form.html', job=None, members=members)
             except SQLAlchemyError as e:
                 session.rollback()
@@ -549,21 +746,21 @@ def job_create():
                     flash('Invalid member ID. The selected member does not exist.', 'error')
                 else:
                     flash(f'Database error: {error_msg}', 'error')
-                members = session.query(Member).join(User).all()
+                members = dropdown_options('members', session)
                 return render_template('job_form.html', job=None, members=members)
             except Exception as e:
                 session.rollback()
                 flash(f'Error creating job: {str(e)}', 'error')
-                members = session.query(Member).join(User).all()
+                members = dropdown_options('members', session)
                 return render_template('job_form.html', job=None, members=members)
         
-        members = session.query(Member).join(User).all()
+        members = dropdown_options('members', session)
         return render_template('job_form.html', job=None, members=members)
     finally:
         session.close()
 
 
-@app.route('/jobs/<int:job_id>/edit', methods=['GET', 'POST'])
+@routes.route('/jobs/<int:job_id>/edit', methods=['GET', 'POST'])
 def job_edit(job_id): #edit already existing job
     session = get_session()
     try:
@@ -573,9 +770,9 @@ def job_edit(job_id): #edit already existing job
             job.member_user_id = int(request.form['member_user_id'])
             
             required_caregiving_type = request.form.get('required_caregiving_type', '').strip()
-            if not required_caregiving_type or required_caregiving_type not in ('Babysitter', 'Elderly Care', 'Playmate'):
+            if not required_caregiving_type or required_caregiving_type not in CAREGIVING_TYPES:
                 flash('Invalid caregiving type. Must be one of: Babysitter, Elderly Care, Playmate', 'error')
-                members = session.query(Member).join(User).all()
+                members = dropdown_options('members', session)
                 return render_template('job_form.html', job=job, members=members)
             job.required_caregiving_type = required_caregiving_type
             
@@ -586,18 +783,36 @@ def job_edit(job_id): #edit already existing job
             flash('Job updated successfully!', 'success')
             return redirect(url_for('job_list'))
         
-        members = session.query(Member).join(User).all()
+        members = dropdown_options('members', session)
         return render_template('job_form.html', job=job, members=members)
     finally:
         session.close()
 
 
-@app.route('/jobs/<int:job_id>/delete', methods=['POST'])
+@routes.route('/jobs/<int:job_id>/matches')
+@query_budget(3)
+def job_matches(job_id): #ranked caregivers for a posted job
+    max_rate = None
+    if request.args.get('max_rate'):
+        try:
+            max_rate = float(request.args['max_rate'])
+        except ValueError:
+            flash('Invalid max hourly rate.', 'error')
+    session = get_session()
+    try:
+        job, city, matches = match_caregivers(session, job_id, max_rate=max_rate)
+        if job is None:
+            abort(404)
+        return render_template('job_matches.html', job=job, city=city, matches=matches, max_rate=max_rate)
+    finally:
+        session.close()
+
+
+@routes.route('/jobs/<int:job_id>/delete', methods=['POST'])
 def job_delete(job_id):
     session = get_session()
     try:
-        job = first_or_404(session.query(Job).filter_by(job_id=job_id))
-        session.delete(job)
+        delete_or_404(session, Job, job_id=job_id)
         session.commit()
         flash('Job deleted successfully!', 'success')
     except Exception as e:
@@ -609,17 +824,36 @@ def job_delete(job_id):
 
 
 #job application routes
-@app.route('/job-applications')
+@routes.route('/job-applications')
+@conditional('job_application', 'caregiver', 'job', 'user')
+@query_budget(1)
 def job_application_list(): #List all job applications with caregiver and job information
     session = get_session()
     try:
-        applications = session.query(JobApplication).join(Caregiver).join(User).join(Job).all()
-        return render_template('job_application_list.html', applications=applications)
+        query, columns = list_queries.job_applications(session)
+        if wants_stream():
+            return stream_list(session, 'job_application_list.html', 'applications', query, columns)
+        page, rows_html = cached_rows('job_applications', query, columns)
+        return render_template('job_application_list.html', applications=page.items, page=page, rows_html=rows_html)
     finally:
         session.close()
 
 
-@app.route('/job-applications/create', methods=['GET', 'POST'])
+@routes.route('/job-applications/view')
+@query_budget(2)
+def job_application_view(): #paginated read of job_application_mv; `matviews.py --watch` keeps it refreshed
+    session = get_session()
+    try:
+        mv = matviews.job_application_mv
+        page = paginate(session.query(mv), [mv.c.job_id, mv.c.caregiver_user_id])
+        return render_template('job_application_view.html', rows=page.items, page=page,
+                               refreshed_at=matviews.last_refreshed(session, 'job_application_mv'),
+                               max_staleness=MATVIEW_MAX_STALENESS)
+    finally:
+        session.close()
+
+
+@routes.route('/job-applications/create', methods=['GET', 'POST'])
 def job_application_create(): #create a new job application
     session = get_session()
     try:
@@ -632,8 +866,8 @@ def job_application_create(): #create a new job application
                         date_applied = datetime.strptime(date_applied_str, '%Y-%m-%d').date()
                     except ValueError:
                         flash('Invalid date format. Please use YYYY-MM-DD format.', 'error')
-                        caregivers = session.query(Caregiver).join(User).all()
-                        jobs = session.query(Job).all()
+                        caregivers = dropdown_options('caregivers', session)
+                        jobs = dropdown_options('jobs', session)
                         return render_template('job_application_form.html', application=None, caregivers=caregivers, jobs=jobs)
                 
                 application = JobApplication(
@@ -648,14 +882,14 @@ def job_application_create(): #create a new job application
             except ValueError as e:
                 session.rollback()
                 flash(f'Invalid input: {str(e)}', 'error')
-                caregivers = session.query(Caregiver).join(User).all()
-                jobs = session.query(Job).all()
+                caregivers = dropdown_options('caregivers', session)
+                jobs = dropdown_options('jobs', session)
                 return render_template('job_application_form.html', application=None, caregivers=caregivers, jobs=jobs)
             except KeyError as e:
                 session.rollback()
                 flash(f'Missing required field: {str(e)}', 'error')
-                caregivers = session.query(Caregiver).join(User).all()
-                jobs = session.query(Job).all()
+                caregivers = dropdown_options('caregivers', session)
+                jobs = dropdown_options('jobs', session)
                 return render_template('job_application_form.html', application=None, caregivers=caregivers, jobs=jobs)
             except SQLAlchemyError as e:
                 session.rollback()
@@ -666,24 +900,24 @@ def job_application_create(): #create a new job application
                     flash('Invalid caregiver or job ID. Please check your selection.', 'error')
                 else:
                     flash(f'Database error: {error_msg}', 'error')
-                caregivers = session.query(Caregiver).join(User).all()
-                jobs = session.query(Job).all()
+                caregivers = dropdown_options('caregivers', session)
+                jobs = dropdown_options('jobs', session)
                 return render_template('job_application_form.html', application=None, caregivers=caregivers, jobs=jobs)
             except Exception as e:
                 session.rollback()
                 flash(f'Error creating job application: {str(e)}', 'error')
-                caregivers = session.query(Caregiver).join(User).all()
-                jobs = session.query(Job).all()
+                caregivers = dropdown_options('caregivers', session)
+                jobs = dropdown_options('jobs', session)
                 return render_template('job_application_form.html', application=None, caregivers=caregivers, jobs=jobs)
         
-        caregivers = session.query(Caregiver).join(User).all()
-        jobs = session.query(Job).all()
+        caregivers = dropdown_options('caregivers', session)
+        jobs = dropdown_options('jobs', session)
         return render_template('job_application_form.html', application=None, caregivers=caregivers, jobs=jobs)
     finally:
         session.close()
 
 
-@app.route('/job-applications/<int:caregiver_user_id>/<int:job_id>/edit', methods=['GET', 'POST'])
+@routes.route('/job-applications/<int:caregiver_user_id>/<int:job_id>/edit', methods=['GET', 'POST'])
 def job_application_edit(caregiver_user_id, job_id):  #edit an existing job application
     session = get_session()
     try:
@@ -701,22 +935,18 @@ def job_application_edit(caregiver_user_id, job_id):  #edit an existing job appl
             flash('Job application updated successfully!', 'success')
             return redirect(url_for('job_application_list'))
         
-        caregivers = session.query(Caregiver).join(User).all()
-        jobs = session.query(Job).all()
+        caregivers = dropdown_options('caregivers', session)
+        jobs = dropdown_options('jobs', session)
         return render_template('job_application_form.html', application=application, caregivers=caregivers, jobs=jobs)
     finally:
         session.close()
 
 
-@app.route('/job-applications/<int:caregiver_user_id>/<int:job_id>/delete', methods=['POST'])
+@routes.route('/job-applications/<int:caregiver_user_id>/<int:job_id>/delete', methods=['POST'])
 def job_application_delete(caregiver_user_id, job_id):
     session = get_session()
     try:
-        application = first_or_404(session.query(JobApplication).filter_by(
-            caregiver_user_id=caregiver_user_id,
-            job_id=job_id
-        ))
-        session.delete(application)
+        delete_or_404(session, JobApplication, caregiver_user_id=caregiver_user_id, job_id=job_id)
         session.commit()
         flash('Job application deleted successfully!', 'success')
     except Exception as e:
@@ -728,22 +958,23 @@ def job_application_delete(caregiver_user_id, job_id):
 
 
 #appointment routes
-@app.route('/appointments')
+@routes.route('/appointments')
+@conditional('appointment', 'caregiver', 'member', 'user')
+@query_budget(1)
 def appointment_list():
     """List all appointments with caregiver and member information"""
     session = get_session()
     try:
-        from sqlalchemy.orm import joinedload
-        appointments = session.query(Appointment)\
-            .options(joinedload(Appointment.caregiver).joinedload(Caregiver.user))\
-            .options(joinedload(Appointment.member).joinedload(Member.user))\
-            .all()
-        return render_template('appointment_list.html', appointments=appointments)
+        query, columns = list_queries.appointments(session)
+        if wants_stream():
+            return stream_list(session, 'appointment_list.html', 'appointments', query, columns)
+        page, rows_html = cached_rows('appointments', query, columns)
+        return render_template('appointment_list.html', appointments=page.items, page=page, rows_html=rows_html)
     finally:
         session.close()
 
 
-@app.route('/appointments/create', methods=['GET', 'POST'])
+@routes.route('/appointments/create', methods=['GET', 'POST'])
 def appointment_create(): #create a new appointment
     session = get_session()
     try:
@@ -756,8 +987,8 @@ def appointment_create(): #create a new appointment
                         appointment_date = datetime.strptime(appointment_date_str, '%Y-%m-%d').date()
                     except ValueError:
                         flash('Invalid date format. Please use YYYY-MM-DD format.', 'error')
-                        caregivers = session.query(Caregiver).join(User).all()
-                        members = session.query(Member).join(User).all()
+                        caregivers = dropdown_options('caregivers', session)
+                        members = dropdown_options('members', session)
                         return render_template('appointment_form.html', appointment=None, caregivers=caregivers, members=members)
                 
                 appointment_time = None
@@ -767,8 +998,8 @@ def appointment_create(): #create a new appointment
                         appointment_time = datetime.strptime(appointment_time_str, '%H:%M').time()
                     except ValueError:
                         flash('Invalid time format. Please use HH:MM format.', 'error')
-                        caregivers = session.query(Caregiver).join(User).all()
-                        members = session.query(Member).join(User).all()
+                        caregivers = dropdown_options('caregivers', session)
+                        members = dropdown_options('members', session)
                         return render_template('appointment_form.html', appointment=None, caregivers=caregivers, members=members)
                 
                 work_hours = None
@@ -779,15 +1010,15 @@ def appointment_create(): #create a new appointment
                             raise ValueError("Work hours must be greater than 0")
                     except ValueError as e:
                         flash(f'Invalid work hours: {str(e)}', 'error')
-                        caregivers = session.query(Caregiver).join(User).all()
-                        members = session.query(Member).join(User).all()
+                        caregivers = dropdown_options('caregivers', session)
+                        members = dropdown_options('members', session)
                         return render_template('appointment_form.html', appointment=None, caregivers=caregivers, members=members)
                 
                 status = request.form.get('status', 'pending')
-                if status not in ('pending', 'accepted', 'declined'):
+                if status not in APPOINTMENT_STATUSES:
                     flash('Invalid status. Must be one of: pending, accepted, declined', 'error')
-                    caregivers = session.query(Caregiver).join(User).all()
-                    members = session.query(Member).join(User).all()
+                    caregivers = dropdown_options('caregivers', session)
+                    members = dropdown_options('members', session)
                     return render_template('appointment_form.html', appointment=None, caregivers=caregivers, members=members)
                 
                 appointment = Appointment(
@@ -798,6 +1029,7 @@ def appointment_create(): #create a new appointment
                     work_hours=work_hours,
                     status=status
                 )
+                booking.check_appointment(session, appointment) #BookingConflict is a ValueError, reported below
                 session.add(appointment)
                 session.commit()
                 flash('Appointment created successfully!', 'success')
@@ -805,14 +1037,14 @@ def appointment_create(): #create a new appointment
             except ValueError as e:
                 session.rollback()
                 flash(f'Invalid input: {str(e)}', 'error')
-                caregivers = session.query(Caregiver).join(User).all()
-                members = session.query(Member).join(User).all()
+                caregivers = dropdown_options('caregivers', session)
+                members = dropdown_options('members', session)
                 return render_template('appointment_form.html', appointment=None, caregivers=caregivers, members=members)
             except KeyError as e:
                 session.rollback()
                 flash(f'Missing required field: {str(e)}', 'error')
-                caregivers = session.query(Caregiver).join(User).all()
-                members = session.query(Member).join(User).all()
+                caregivers = dropdown_options('caregivers', session)
+                members = dropdown_options('members', session)
                 return render_template('appointment_form.html', appointment=None, caregivers=caregivers, members=members)
             except SQLAlchemyError as e:
                 session.rollback()
@@ -823,24 +1055,24 @@ def appointment_create(): #create a new appointment
                     flash('Invalid caregiver or member ID. Please check your selection.', 'error')
                 else:
                     flash(f'Database error: {error_msg}', 'error')
-                caregivers = session.query(Caregiver).join(User).all()
-                members = session.query(Member).join(User).all()
+                caregivers = dropdown_options('caregivers', session)
+                members = dropdown_options('members', session)
                 return render_template('appointment_form.html', appointment=None, caregivers=caregivers, members=members)
             except Exception as e:
                 session.rollback()
                 flash(f'Error creating appointment: {str(e)}', 'error')
-                caregivers = session.query(Caregiver).join(User).all()
-                members = session.query(Member).join(User).all()
+                caregivers = dropdown_options('caregivers', session)
+                members = dropdown_options('members', session)
                 return render_template('appointment_form.html', appointment=None, caregivers=caregivers, members=members)
         
-        caregivers = session.query(Caregiver).join(User).all()
-        members = session.query(Member).join(User).all()
+        caregivers = dropdown_options('caregivers', session)
+        members = dropdown_options('members', session)
         return render_template('appointment_form.html', appointment=None, caregivers=caregivers, members=members)
     finally:
         session.close()
 
 
-@app.route('/appointments/<int:appointment_id>/edit', methods=['GET', 'POST'])
+@routes.route('/appointments/<int:appointment_id>/edit', methods=['GET', 'POST'])
 def appointment_edit(appointment_id):
     session = get_session()
     try:
@@ -855,23 +1087,35 @@ def appointment_edit(appointment_id):
             appointment.appointment_time = datetime.strptime(appointment_time_str, '%H:%M').time() if appointment_time_str else None
             appointment.work_hours = float(request.form['work_hours']) if request.form.get('work_hours') else None
             appointment.status = request.form.get('status', 'pending')
+            try:
+                booking.check_appointment(session, appointment)
+            except booking.BookingConflict as e:
+                #rejected values go back to the form on a detached copy; rolling back first keeps the dropdown
+                #queries from autoflushing them into the exclusion constraint (an IntegrityError instead of this message)
+                submitted = Appointment(**{column: getattr(appointment, column) for column in (
+                    'appointment_id', 'caregiver_user_id', 'member_user_id', 'appointment_date', 'appointment_time',
+                    'work_hours', 'status')})
+                session.rollback()
+                flash(f'Scheduling conflict: {e}', 'error')
+                caregivers = dropdown_options('caregivers', session)
+                members = dropdown_options('members', session)
+                return render_template('appointment_form.html', appointment=submitted, caregivers=caregivers, members=members)
             session.commit()
             flash('Appointment updated successfully!', 'success')
             return redirect(url_for('appointment_list'))
         
-        caregivers = session.query(Caregiver).join(User).all()
-        members = session.query(Member).join(User).all()
+        caregivers = dropdown_options('caregivers', session)
+        members = dropdown_options('members', session)
         return render_template('appointment_form.html', appointment=appointment, caregivers=caregivers, members=members)
     finally:
         session.close()
 
 
-@app.route('/appointments/<int:appointment_id>/delete', methods=['POST'])
+@routes.route('/appointments/<int:appointment_id>/delete', methods=['POST'])
 def appointment_delete(appointment_id):
     session = get_session()
     try:
-        appointment = first_or_404(session.query(Appointment).filter_by(appointment_id=appointment_id))
-        session.delete(appointment)
+        delete_or_404(session, Appointment, appointment_id=appointment_id)
         session.commit()
         flash('Appointment deleted successfully!', 'success')
     except Exception as e:
@@ -881,7 +1125,132 @@ def appointment_delete(appointment_id):
         session.close()
     return redirect(url_for('appointment_list'))
 
-@app.errorhandler(Exception)
+#analytics routes
+@routes.route('/analytics')
+@query_budget(3)
+def analytics_dashboard(): #platform totals from the rollup tables, independent of table size
+    session = get_session()
+    try:
+        summary = analytics.platform_summary(session)
+        earners = analytics.top_earners(session, average_pay=summary['average_pay'])
+        jobs = analytics.busiest_jobs(session)
+        return render_template('analytics.html', summary=summary, earners=earners, jobs=jobs)
+    finally:
+        session.close()
+
+#export routes
+@routes.route('/export/<entity>')
+def export_entity(entity): #stream a whole table as CSV or NDJSON for reporting jobs
+    if entity not in export.EXPORTS:
+        abort(404)
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return jsonify(error=f"format must be one of: {', '.join(export.FORMATS)}"), 400
+    session = get_session()
+    try:
+        return export.export_response(session, entity, fmt) #the response generator closes the session
+    except ValueError as e:
+        session.close()
+        return jsonify(error=str(e)), 400
+
+#batch write API
+def batch_insert(name):
+    session = get_session()
+    try:
+        records = batch_api.read_records()
+        atomic = request.args.get('atomic') in ('1', 'true', 'yes')
+        report, status = batch_api.insert_batch(session, name, records, atomic=atomic)
+        return jsonify(report), status
+    except batch_api.BatchError as e:
+        return jsonify(error=str(e)), e.status
+    except SQLAlchemyError as e:
+        session.rollback()
+        return jsonify(error=str(e.orig) if hasattr(e, 'orig') else str(e)), 500
+    finally:
+        session.close()
+
+
+@routes.route('/api/appointments:batch', methods=['POST'])
+def appointment_batch(): #insert many appointments from a JSON list in one transaction
+    return batch_insert('appointments')
+
+
+@routes.route('/api/job-applications:batch', methods=['POST'])
+def job_application_batch(): #insert many job applications from a JSON list in one transaction
+    return batch_insert('job-applications')
+
+
+@routes.route('/api/<entity>:delete', methods=['POST'])
+def bulk_delete(entity): #delete many rows by id in one statement; their children go by ON DELETE CASCADE
+    if entity not in batch_api.DELETES:
+        return jsonify(error=f"entity must be one of: {', '.join(batch_api.DELETES)}"), 404
+    session = get_session()
+    try:
+        report, status = batch_api.delete_batch(session, entity, batch_api.read_ids())
+        return jsonify(report), status
+    except batch_api.BatchError as e:
+        return jsonify(error=str(e)), e.status
+    except SQLAlchemyError as e:
+        session.rollback()
+        return jsonify(error=str(e.orig) if hasattr(e, 'orig') else str(e)), 500
+    finally:
+        session.close()
+
+#health check
+@routes.route('/healthz')
+def healthz(): #liveness plus one SELECT 1 through this worker's pool
+    try:
+        pool = db.check_connection()
+    except Exception as e:
+        logger.warning("health check failed for %s: %s", db.masked_url(), e)
+        return jsonify(status='error', database=str(e)), 503
+    return jsonify(status='ok', pid=os.getpid(), pool=pool)
+
+#admin routes
+@routes.route('/admin/options-cache')
+def options_cache_stats(): #hit/miss counters for the dropdown options cache
+    return jsonify(options_cache.stats())
+
+
+@routes.route('/admin/fragment-cache')
+def fragment_cache_stats(): #hit/miss/eviction counters for the rendered list-table cache
+    return jsonify(fragment_cache.stats())
+
+
+@routes.route('/admin/replicas')
+def replica_stats(): #health, lag and read counts of the read replicas
+    return jsonify(db.replica_status())
+
+
+@routes.route('/admin/maintenance')
+def maintenance_status(): #checkpoints of the chunked rate adjustment and purge runs
+    return jsonify(maintenance.status())
+
+
+@routes.route('/admin/maintenance/<operation>', methods=['POST'])
+def maintenance_run(operation): #dry-run counts, or the next chunks of a run; POST again until stopped is "finished"
+    if operation not in maintenance.OPERATIONS:
+        abort(404)
+    values = request.get_json(silent=True) or request.form
+    try:
+        params = maintenance.parse_params(operation, values)
+        name = values.get('name') or None
+        restart = str(values.get('restart', '')).lower() in ('1', 'true', 'yes')
+        if str(values.get('dry_run', '')).lower() in ('1', 'true', 'yes'):
+            return jsonify(maintenance.dry_run(operation, params, name, restart=restart))
+        chunk_size = int(values.get('chunk_size') or MAINTENANCE_CHUNK_SIZE)
+        max_chunks = min(int(values.get('max_chunks') or MAINTENANCE_REQUEST_CHUNKS), MAINTENANCE_REQUEST_CHUNKS)
+        return jsonify(maintenance.run(operation, params, name=name, chunk_size=chunk_size,
+                                       max_chunks=max_chunks, restart=restart))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+
+@routes.route('/admin/match-index')
+def match_index_stats(): #partition sizes of the caregiver match index
+    return jsonify(caregiver_index.stats())
+
+@routes.errorhandler(Exception)
 def handle_error(e):
     """Handle all exceptions and display helpful error messages"""
     error_type = type(e).__name__
@@ -899,5 +1268,7 @@ def handle_error(e):
                          error_message=error_message), 500
 
 
+app = create_app() #for `flask run` and `gunicorn app:app`; importing it opens no connections
+
 if __name__ == '__main__':
     app.run(debug=True, port=5001)
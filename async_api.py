@@ -0,0 +1,157 @@
+"""Read-only JSON API on asyncio (aiohttp + SQLAlchemy asyncio + asyncpg)
+
+Serves list and detail views for caregivers, jobs and appointments without
+blocking a worker on each query, so one process keeps many DB-bound requests
+in flight. Shares models.py, the loader strategies in list_queries.py and the
+keyset cursors in pagination.py with the Flask app.
+
+Usage:
+    python async_api.py [--host 127.0.0.1] [--port 5002]
+    gunicorn async_api:app_factory --worker-class aiohttp.GunicornWebWorker
+"""
+import argparse
+import json
+from functools import partial
+
+from aiohttp import web
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, joinedload
+
+import list_queries
+from config import DATABASE_URL, ASYNC_DATABASE_URL
+from models import Caregiver, Member, Job, Appointment
+from pagination import page_size, decode_cursors, keyset_query, build_page
+
+#list_queries builds legacy Query objects from a session; this one is never bound or
+#executed, it only turns them into SELECT statements for the AsyncSession to run
+_statements = Session()
+
+ASYNC_DRIVERS = {
+    'postgres': 'postgresql+asyncpg',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+ENGINE = web.AppKey('engine', object)
+SESSIONS = web.AppKey('sessions', object)
+
+dumps = partial(json.dumps, default=str) #dates as ISO strings, NUMERIC as exact decimal strings
+
+
+def async_database_url(url):
+    """DATABASE_URL with its sync driver swapped for the asyncio one"""
+    scheme, sep, rest = url.partition('://')
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+#--- serializers: explicit fields only, so password and other columns never leak
+
+def caregiver_json(caregiver):
+    return {
+        'caregiver_user_id': caregiver.caregiver_user_id,
+        'given_name': caregiver.user.given_name,
+        'surname': caregiver.user.surname,
+        'city': caregiver.user.city,
+        'gender': caregiver.gender,
+        'caregiving_type': caregiver.caregiving_type,
+        'hourly_rate': caregiver.hourly_rate,
+    }
+
+
+def job_json(job):
+    return {
+        'job_id': job.job_id,
+        'member_user_id': job.member_user_id,
+        'member_name': f'{job.member.user.given_name} {job.member.user.surname}',
+        'required_caregiving_type': job.required_caregiving_type,
+        'other_requirements': job.other_requirements,
+        'date_posted': job.date_posted,
+    }
+
+
+def appointment_json(appointment):
+    return {
+        'appointment_id': appointment.appointment_id,
+        'caregiver_user_id': appointment.caregiver_user_id,
+        'caregiver_name': f'{appointment.caregiver.user.given_name} {appointment.caregiver.user.surname}',
+        'member_user_id': appointment.member_user_id,
+        'member_name': f'{appointment.member.user.given_name} {appointment.member.user.surname}',
+        'appointment_date': appointment.appointment_date,
+        'appointment_time': appointment.appointment_time,
+        'work_hours': appointment.work_hours,
+        'status': appointment.status,
+    }
+
+
+#resource -> (list_queries function, model, detail loader options, serializer)
+RESOURCES = {
+    'caregivers': (list_queries.caregivers, Caregiver, [joinedload(Caregiver.user)], caregiver_json),
+    'jobs': (list_queries.jobs, Job, [joinedload(Job.member).joinedload(Member.user)], job_json),
+    'appointments': (list_queries.appointments, Appointment,
+                     [joinedload(Appointment.caregiver).joinedload(Caregiver.user),
+                      joinedload(Appointment.member).joinedload(Member.user)], appointment_json),
+}
+
+
+async def list_view(request):
+    list_query, _model, _options, serialize = RESOURCES[request.match_info['resource']]
+    query, columns = list_query(_statements)
+    size = page_size(request.query.get('size'))
+    after = request.query.get('after') or None
+    before = None if after else (request.query.get('before') or None)
+    after, before, after_key, before_key = decode_cursors(after, before, columns)
+    statement = keyset_query(query, columns, size, after_key=after_key, before_key=before_key).statement
+    async with request.app[SESSIONS]() as session:
+        rows = (await session.scalars(statement)).all()
+    page = build_page(rows, columns, size, after, before)
+    return web.json_response({'items': [serialize(item) for item in page.items], 'size': page.size,
+                              'next': page.next_cursor, 'prev': page.prev_cursor}, dumps=dumps)
+
+
+async def detail_view(request):
+    _list_query, model, options, serialize = RESOURCES[request.match_info['resource']]
+    try:
+        key = int(request.match_info['id'])
+    except ValueError:
+        raise web.HTTPNotFound()
+    async with request.app[SESSIONS]() as session:
+        item = await session.get(model, key, options=options)
+        if item is None:
+            return web.json_response({'error': 'not found'}, status=404)
+        return web.json_response(serialize(item), dumps=dumps)
+
+
+async def _open_engine(app):
+    app[ENGINE] = create_async_engine(ASYNC_DATABASE_URL or async_database_url(DATABASE_URL), pool_pre_ping=True)
+    app[SESSIONS] = async_sessionmaker(app[ENGINE], expire_on_commit=False)
+
+
+async def _close_engine(app):
+    await app[ENGINE].dispose()
+
+
+def create_app():
+    app = web.Application()
+    resources = '{resource:' + '|'.join(RESOURCES) + '}'
+    app.router.add_get(f'/api/{resources}', list_view)
+    app.router.add_get(f'/api/{resources}/{{id}}', detail_view)
+    app.on_startup.append(_open_engine)
+    app.on_cleanup.append(_close_engine)
+    return app
+
+
+async def app_factory(): #entry point for gunicorn's aiohttp.GunicornWebWorker
+    return create_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5002)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
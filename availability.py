@@ -0,0 +1,191 @@
+"""Weekly caregiver availability as 672-bit masks
+
+A caregiver's week is 7 days x 96 fifteen-minute slots. Bit day * 96 + slot is
+set when the caregiver is free (day 0 = Monday, slot 0 = 00:00-00:15). In
+Python the mask is an int, so "free for this whole window" is one AND and a
+compare instead of a walk over time ranges. In the database it is stored as
+84 little-endian bytes (bytea), so byte k holds slots 8k..8k+7.
+"""
+from datetime import date, datetime, time, timedelta
+
+from booking import load_slots
+from matching import caregiver_index
+from models import CaregiverAvailability
+from validation import CAREGIVING_TYPES, choice_value, date_value, time_value, text_value
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+WEEK_BYTES = len(DAYS) * SLOTS_PER_DAY // 8
+DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+
+#--- encoding
+
+def to_bytes(mask):
+    return mask.to_bytes(WEEK_BYTES, 'little')
+
+
+def from_bytes(data):
+    return int.from_bytes(data or b'', 'little')
+
+
+def day_bits(mask, day):
+    """The 96-bit mask of one weekday"""
+    return (mask >> (day * SLOTS_PER_DAY)) & DAY_MASK
+
+
+def _slot(value, round_up=False):
+    minutes = value.hour * 60 + value.minute + (value.second > 0)
+    return -(-minutes // SLOT_MINUTES) if round_up else minutes // SLOT_MINUTES
+
+
+def window_bits(start, end, inside=False):
+    """Slots covering [start, end) within one day; end 00:00 means midnight at the end of the day
+
+    Partial slots at either edge are included, as a search window or a booking
+    needs them. inside=True keeps only whole slots instead, for free time:
+    09:10-12:00 free does not make 09:00-09:10 free.
+    """
+    first = _slot(start, round_up=inside)
+    last = SLOTS_PER_DAY if end == time(0) else _slot(end, round_up=not inside)
+    if last <= first:
+        if inside and window_bits(start, end): #raises for a reversed window
+            raise ValueError(f'{start:%H:%M}-{end:%H:%M} holds no whole {SLOT_MINUTES}-minute slot')
+        raise ValueError('end time must be after start time')
+    return ((1 << (last - first)) - 1) << first
+
+
+def _format_slot(slot):
+    return '24:00' if slot == SLOTS_PER_DAY else f'{slot * SLOT_MINUTES // 60:02d}:{slot * SLOT_MINUTES % 60:02d}'
+
+
+def ranges_of(bits):
+    """'09:00-12:00, 14:00-18:00' for a 96-bit day mask"""
+    ranges, slot = [], 0
+    while slot < SLOTS_PER_DAY:
+        if bits >> slot & 1:
+            start = slot
+            while slot < SLOTS_PER_DAY and bits >> slot & 1:
+                slot += 1
+            ranges.append(f'{_format_slot(start)}-{_format_slot(slot)}')
+        slot += 1
+    return ', '.join(ranges)
+
+
+def parse_ranges(text):
+    """The inverse of ranges_of: '09:00-12:00, 14:00-18:00' -> 96-bit day mask
+
+    Times off the slot grid are rounded inwards ('09:10-12:05' is 09:15-12:00), so
+    a caregiver is never shown as free for time they did not give.
+    """
+    bits = 0
+    for part in (text or '').split(','):
+        if not part.strip():
+            continue
+        try:
+            start, end = (value.strip() for value in part.split('-'))
+        except ValueError:
+            raise ValueError(f'{part.strip()!r} is not a HH:MM-HH:MM range')
+        end = '00:00' if end == '24:00' else end
+        bits |= window_bits(time_value({'start': start}, 'start', required=True),
+                            time_value({'end': end}, 'end', required=True), inside=True)
+    return bits
+
+
+def week_from_days(days):
+    """{day name: day mask} -> weekly mask"""
+    mask = 0
+    for day, name in enumerate(DAYS):
+        mask |= (days.get(name, 0) & DAY_MASK) << (day * SLOTS_PER_DAY)
+    return mask
+
+
+#--- appointments
+
+def busy_bits(slots, on_date):
+    """96-bit mask of the slots on on_date covered by any of the booking Slots"""
+    day_start = datetime.combine(on_date, time(0))
+    bits = 0
+    for slot in slots:
+        start = max(slot.start, day_start)
+        end = min(slot.end, day_start + timedelta(days=1))
+        if end <= start:
+            continue
+        first = int((start - day_start).total_seconds() // 60) // SLOT_MINUTES
+        last = -(-int((end - day_start).total_seconds() // 60) // SLOT_MINUTES)
+        bits |= ((1 << (last - first)) - 1) << first
+    return bits
+
+
+#--- persistence
+
+def get_weekly(session, caregiver_user_id):
+    row = session.get(CaregiverAvailability, caregiver_user_id)
+    return from_bytes(row.weekly) if row else 0
+
+
+def set_weekly(session, caregiver_user_id, mask):
+    row = session.get(CaregiverAvailability, caregiver_user_id)
+    if row is None:
+        row = CaregiverAvailability(caregiver_user_id=caregiver_user_id)
+        session.add(row)
+    row.weekly = to_bytes(mask)
+    row.updated_at = datetime.now()
+    return row
+
+
+#--- search
+
+def next_weekday(name, today=None):
+    """The next date (today included) that falls on the named weekday"""
+    today = today or date.today()
+    return today + timedelta(days=(DAYS.index(name) - today.weekday()) % 7)
+
+
+def parse_search(args):
+    """caregiving_type, city, date (or day=tuesday), start, end from a query string; raises ValueError"""
+    day = (args.get('day') or '').strip().lower()
+    if day and day not in DAYS:
+        raise ValueError(f"day must be one of: {', '.join(DAYS)}")
+    on_date = date_value(args, 'date', default=next_weekday(day) if day else None)
+    if on_date is None:
+        raise ValueError('date or day is required')
+    start = time_value(args, 'start', required=True)
+    end = time_value({'end': '00:00' if args.get('end') == '24:00' else args.get('end')}, 'end', required=True)
+    window_bits(start, end) #validates the window
+    return {
+        'caregiving_type': choice_value(args, 'caregiving_type', CAREGIVING_TYPES, required=True),
+        'city': text_value(args, 'city', required=True),
+        'on_date': on_date,
+        'start': start,
+        'end': end,
+    }
+
+
+def find_available(session, caregiving_type, city, on_date, start, end):
+    """Caregivers of a type in a city who are free for all of [start, end) on on_date
+
+    Candidates come from the in-memory caregiver index, their weekly masks from
+    one query and their appointments that day from another; everything else is
+    bit arithmetic. Pending and accepted appointments both take time away.
+    """
+    want = window_bits(start, end)
+    day = on_date.weekday()
+    candidates = {e.caregiver_user_id: e for e in caregiver_index.candidates(session, caregiving_type, city)}
+    if not candidates:
+        return []
+    weekly = session.query(CaregiverAvailability.caregiver_user_id, CaregiverAvailability.weekly)\
+        .filter(CaregiverAvailability.caregiver_user_id.in_(candidates))
+    open_ids = [cid for cid, data in weekly if day_bits(from_bytes(data), day) & want == want]
+    if not open_ids:
+        return []
+    day_start = datetime.combine(on_date, time(0))
+    booked = load_slots(session, open_ids, day_start, day_start + timedelta(days=1))
+    free = []
+    for cid in open_ids:
+        index = booked.get(cid)
+        busy = busy_bits(index.overlapping(day_start, day_start + timedelta(days=1)), on_date) if index else 0
+        if busy & want == 0:
+            free.append(candidates[cid])
+    return sorted(free, key=lambda e: (e.hourly_rate or 0, e.caregiver_user_id))
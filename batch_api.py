@@ -0,0 +1,172 @@
+from collections import namedtuple
+
+from flask import request
+from sqlalchemy import insert, delete, select, tuple_
+
+import booking
+from changes import mark_changed
+from config import BATCH_MAX_RECORDS
+from models import User, Caregiver, Member, Address, Job, JobApplication, Appointment
+from validation import validate_appointment, validate_job_application
+
+#fields: columns accepted from the client (server-assigned ids are dropped)
+#foreign_keys: (column on the new row, referenced parent column)
+BatchSpec = namedtuple('BatchSpec', 'model validator fields foreign_keys')
+
+BATCHES = {
+    'appointments': BatchSpec(
+        Appointment, validate_appointment,
+        ('caregiver_user_id', 'member_user_id', 'appointment_date', 'appointment_time', 'work_hours', 'status'),
+        [(Appointment.caregiver_user_id, Caregiver.caregiver_user_id),
+         (Appointment.member_user_id, Member.member_user_id)]),
+    'job-applications': BatchSpec(
+        JobApplication, validate_job_application,
+        ('caregiver_user_id', 'job_id', 'date_applied'),
+        [(JobApplication.caregiver_user_id, Caregiver.caregiver_user_id),
+         (JobApplication.job_id, Job.job_id)]),
+}
+
+#entities that can be deleted by id in bulk: their single-column primary key
+DELETES = {
+    'users': User.user_id,
+    'caregivers': Caregiver.caregiver_user_id,
+    'members': Member.member_user_id,
+    'addresses': Address.member_user_id,
+    'jobs': Job.job_id,
+    'appointments': Appointment.appointment_id,
+}
+
+
+class BatchError(ValueError):
+    """The request as a whole is unusable (not a JSON list, too many records)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def read_records():
+    """The JSON body: either a list of records or {"records": [...]}"""
+    body = request.get_json(silent=True)
+    if isinstance(body, dict):
+        body = body.get('records')
+    if not isinstance(body, list):
+        raise BatchError('expected a JSON list of records or {"records": [...]}')
+    if len(body) > BATCH_MAX_RECORDS:
+        raise BatchError(f'at most {BATCH_MAX_RECORDS} records per batch, got {len(body)}', status=413)
+    return body
+
+
+def read_ids():
+    """The JSON body: either a list of integer ids or {"ids": [...]}"""
+    body = request.get_json(silent=True)
+    if isinstance(body, dict):
+        body = body.get('ids')
+    if not isinstance(body, list):
+        raise BatchError('expected a JSON list of ids or {"ids": [...]}')
+    if len(body) > BATCH_MAX_RECORDS:
+        raise BatchError(f'at most {BATCH_MAX_RECORDS} ids per batch, got {len(body)}', status=413)
+    if not all(isinstance(id_, int) and not isinstance(id_, bool) for id_ in body):
+        raise BatchError('ids must be integers')
+    return body
+
+
+def validate_batch(session, spec, records):
+    """Validate every record in one pass: per-row field checks, then one query per foreign key
+
+    Returns (rows, errors) where rows is a list of (index, values) ready to insert
+    and errors is a list of {"index", "error"} for the rows that were dropped.
+    """
+    rows, errors = [], []
+    for index, record in enumerate(records):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError('record must be a JSON object')
+            values = spec.validator(record)
+            rows.append((index, {field: values[field] for field in spec.fields}))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+
+    for column, parent in spec.foreign_keys:
+        ids = {values[column.key] for _index, values in rows if values[column.key] is not None}
+        existing = set(session.scalars(select(parent).where(parent.in_(ids)))) if ids else set()
+        kept = []
+        for index, values in rows:
+            value = values[column.key]
+            if value is None:
+                errors.append({'index': index, 'error': f'{column.key} is required'})
+            elif value not in existing:
+                errors.append({'index': index, 'error': f'{column.key}={value} does not exist'})
+            else:
+                kept.append((index, values))
+        rows = kept
+
+    if spec.model is JobApplication: #composite primary key: reject repeats within the batch and of existing rows
+        pairs = {(v['caregiver_user_id'], v['job_id']) for _index, v in rows}
+        key = tuple_(JobApplication.caregiver_user_id, JobApplication.job_id)
+        taken = set(session.execute(select(JobApplication.caregiver_user_id, JobApplication.job_id)
+                                    .where(key.in_(pairs))).all()) if pairs else set()
+        kept = []
+        for index, values in rows:
+            pair = (values['caregiver_user_id'], values['job_id'])
+            if pair in taken:
+                errors.append({'index': index, 'error': 'caregiver has already applied to this job'})
+            else:
+                taken.add(pair)
+                kept.append((index, values))
+        rows = kept
+
+    if spec.model is Appointment: #accepted appointments may not overlap, in the database or within the batch
+        conflicts = booking.check_batch(session, [values for _index, values in rows])
+        for position, conflict in conflicts.items():
+            errors.append({'index': rows[position][0], 'error': str(conflict)})
+        rows = [row for position, row in enumerate(rows) if position not in conflicts]
+
+    errors.sort(key=lambda e: e['index'])
+    return rows, errors
+
+
+def insert_batch(session, name, records, atomic=False):
+    """Validate and insert records in one transaction; returns (report, HTTP status)
+
+    Valid rows are inserted with a single executemany-style INSERT, which
+    SQLAlchemy 2.0 sends as multi-row VALUES pages (insertmanyvalues). With
+    atomic=True any invalid row rejects the whole batch.
+    """
+    spec = BATCHES[name]
+    rows, errors = validate_batch(session, spec, records)
+    report = {'received': len(records), 'inserted': 0, 'errors': errors}
+    if not rows or (atomic and errors):
+        session.rollback()
+        return report, 422 if errors else 200
+
+    statement = insert(spec.model)
+    pk = spec.model.__table__.primary_key.columns
+    params = [values for _index, values in rows]
+    if spec.model is Appointment:
+        ids = list(session.scalars(statement.returning(Appointment.appointment_id, sort_by_parameter_order=True), params))
+        report['ids'] = [{'index': index, 'appointment_id': id_} for (index, _values), id_ in zip(rows, ids)]
+        keys = {(id_,) for id_ in ids}
+    else:
+        session.execute(statement, params)
+        keys = {tuple(values[c.key] for c in pk) for values in params}
+    mark_changed(session, spec.model.__table__.name, keys=keys) #bulk INSERT bypasses the unit of work
+    session.commit()
+    report['inserted'] = len(rows)
+    return report, 207 if errors else 201
+
+
+def delete_batch(session, name, ids):
+    """Delete every listed row with one DELETE; returns (report, HTTP status)
+
+    Children (a caregiver's appointments and applications, a member's jobs and
+    address) are removed by ON DELETE CASCADE in the database, not loaded by the
+    ORM. Ids that matched no row are reported as missing.
+    """
+    key = DELETES[name]
+    statement = delete(key.class_).where(key.in_(set(ids))).returning(key)\
+        .execution_options(synchronize_session=False)
+    deleted = set(session.scalars(statement))
+    mark_changed(session, key.class_.__table__.name, deleted=True, keys={(id_,) for id_ in deleted})
+    session.commit()
+    return {'requested': len(set(ids)), 'deleted': len(deleted), 'missing': sorted(set(ids) - deleted)}, 200
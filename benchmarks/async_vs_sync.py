@@ -0,0 +1,126 @@
+"""Concurrent-request throughput of the async JSON API vs the sync Flask routes
+
+Start one worker of each first, against the same database. The Flask one runs
+with its list-page caches off (no fragment cache, no table-version lookup for
+ETags), so both sides do the same database work for every request:
+    FRAGMENT_CACHE_BYTES=0 CONDITIONAL_GET=0 gunicorn -w 1 -b 127.0.0.1:5001 app:app
+    gunicorn -w 1 -b 127.0.0.1:5002 async_api:app_factory --worker-class aiohttp.GunicornWebWorker
+
+Then:
+    python benchmarks/async_vs_sync.py [--requests 500] [--concurrency 1 8 32 64]
+
+Each resource is fetched as its first list page (the same rows either way: HTML
+from Flask, JSON from async_api) at every concurrency level; the report gives
+requests/second and latency percentiles per worker. The run refuses to start
+against a Flask worker that still caches unless --allow-caches is given.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import aiohttp
+
+PATHS = {
+    'caregivers': ('/caregivers?size={size}', '/api/caregivers?size={size}'),
+    'jobs': ('/jobs?size={size}', '/api/jobs?size={size}'),
+    'appointments': ('/appointments?size={size}', '/api/appointments?size={size}'),
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(url, requests, concurrency):
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(url)
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                async with client.get(url) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+            except (aiohttp.ClientError, asyncio.TimeoutError): #refused or dropped connections under load
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        started = time.perf_counter()
+        #a worker that dies anyway is one error, not the end of the run; the others drain the queue
+        outcomes = await asyncio.gather(*(worker(client) for _ in range(concurrency)), return_exceptions=True)
+        elapsed = time.perf_counter() - started
+    errors += sum(isinstance(outcome, Exception) for outcome in outcomes)
+    if not latencies: #every request failed: report the errors rather than crash on empty percentiles
+        return {'rps': 0.0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'mean_ms': None, 'errors': errors}
+    return {
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+        'errors': errors,
+    }
+
+
+async def sync_caches(base, path):
+    """Why the Flask worker would not do the same work as async_api, or None when its caches are off"""
+    async with aiohttp.ClientSession() as client:
+        async with client.get(base + '/admin/fragment-cache') as response:
+            stats = await response.json()
+        async with client.get(base + path) as response:
+            await response.read()
+            etag = response.headers.get('ETag')
+    if stats.get('max_bytes'):
+        return f"the fragment cache is on ({stats['max_bytes']} bytes); start it with FRAGMENT_CACHE_BYTES=0"
+    if etag:
+        return "list pages carry ETags (a table-version lookup per request); start it with CONDITIONAL_GET=0"
+    return None
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sync-url', default='http://127.0.0.1:5001')
+    parser.add_argument('--async-url', default='http://127.0.0.1:5002')
+    parser.add_argument('--requests', type=int, default=500, help='requests per resource and concurrency level')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--size', type=int, default=50, help='page size requested from both servers')
+    parser.add_argument('--resources', nargs='+', choices=list(PATHS), default=list(PATHS))
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    parser.add_argument('--allow-caches', action='store_true',
+                        help='run even if the Flask worker caches list pages (measures the cached path instead)')
+    args = parser.parse_args()
+
+    if not args.allow_caches:
+        reason = await sync_caches(args.sync_url, PATHS[args.resources[0]][0].format(size=args.size))
+        if reason:
+            raise SystemExit(f"error: {args.sync_url}: {reason}, or pass --allow-caches")
+
+    results = []
+    print(f"{'resource':<14}{'conc':>5}  {'server':<6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for resource in args.resources:
+        for concurrency in args.concurrency:
+            for server, base, path in (('sync', args.sync_url, PATHS[resource][0]),
+                                       ('async', args.async_url, PATHS[resource][1])):
+                stats = await run(base + path.format(size=args.size), args.requests, concurrency)
+                results.append({'resource': resource, 'concurrency': concurrency, 'server': server, **stats})
+                print(f"{resource:<14}{concurrency:>5}  {server:<6}{stats['rps']:>9}{stats['p50_ms']!s:>9}"
+                      f"{stats['p95_ms']!s:>9}{stats['p99_ms']!s:>9}{stats['errors']:>8}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,685 @@
+"""Route-level load tests and report microbenchmarks with regression checks
+
+Usage:
+    python benchmarks/suite.py [--iterations 200] [--only 'caregivers.*' ...] [--output results.json]
+    python benchmarks/suite.py --reseed --scale 10000 100000 --output results.json
+    python benchmarks/suite.py --baseline baseline.json --output results.json    run, then compare
+    python benchmarks/suite.py --compare baseline.json results.json              compare two saved runs
+    python benchmarks/suite.py --list
+
+Every route in app.py (lists, forms, create/edit/delete, searches, exports,
+batch inserts, admin pages) and every report in queries.py is a scenario.
+Routes run in-process through the Flask test client, so the numbers are the
+per-request cost of the app plus the database, without HTTP or worker
+scheduling; async_vs_sync.py covers concurrency.
+
+Each scenario runs in its own fresh process and records p50/p95/p99 latency,
+requests per second, SQL statements per request (X-DB-Queries, or counted on
+the engine for reports) and the process's peak RSS.
+
+Writes touch only rows the suite creates itself (emails @bench.invalid, jobs
+marked BENCH_MARKER, appointments from BENCH_DAY on), and those are deleted
+after each scenario. --reseed TRUNCATEs every table and loads
+generate_data.py's dataset at each --scale; never point it at real data.
+"""
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from datetime import date, time as time_of_day, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func, select, text  # noqa: E402
+
+import db  # noqa: E402
+import generate_data  # noqa: E402
+from models import User, Caregiver, CaregiverAvailability, Member, Address, Job, JobApplication, Appointment  # noqa: E402
+from queries import REPORTS  # noqa: E402
+
+BENCH_DOMAIN = '@bench.invalid'
+BENCH_MARKER = 'benchmark fixture'
+BENCH_DAY = date(2099, 1, 1)  # appointments the suite books start here, far from generated data
+BATCH_RECORDS = 100
+
+#metric -> True when larger is worse
+METRICS = {
+    'p50_ms': True,
+    'p95_ms': True,
+    'p99_ms': True,
+    'rps': False,
+    'statements': True,
+    'peak_rss_mb': True,
+}
+MIN_LATENCY_DELTA_MS = 0.5  # ignore latency changes smaller than this, whatever the percentage
+
+Scenario = namedtuple('Scenario', 'name kind request')
+Sample = namedtuple('Sample', 'user caregiver member job application appointment city')
+
+SCENARIOS = {}
+
+
+def scenario(name, kind='read'):
+    """Register request(bench, i) -> (method, path, client kwargs) for one iteration
+
+    kind is 'read' or 'write'; anything request() does before returning (such as
+    creating the row a delete will remove) is setup and not timed.
+    """
+    def register(request):
+        SCENARIOS[name] = Scenario(name, kind, request)
+        return request
+    return register
+
+
+class Bench:
+    """Sample ids from the loaded data plus throwaway rows for the write scenarios"""
+
+    def __init__(self, session, sample):
+        self.session = session
+        self.sample = sample
+        self.serial = 0
+
+    def _next(self):
+        self.serial += 1
+        return f'{os.getpid()}-{self.serial}'
+
+    def _add(self, obj):
+        self.session.add(obj)
+        self.session.commit()
+        return obj
+
+    def user(self):
+        tag = self._next()
+        return self._add(User(email=f'user{tag}{BENCH_DOMAIN}', given_name='Bench', surname=tag,
+                              city=self.sample.city, password='bench'))
+
+    def caregiver(self):
+        user_id = self.user().user_id
+        return self._add(Caregiver(caregiver_user_id=user_id, gender='F', caregiving_type='Babysitter',
+                                   hourly_rate=12))
+
+    def member(self):
+        user_id = self.user().user_id
+        return self._add(Member(member_user_id=user_id, house_rules='No pets please.'))
+
+    def address(self):
+        member_user_id = self.member().member_user_id
+        return self._add(Address(member_user_id=member_user_id, house_number='1', street='Turan',
+                                 town=self.sample.city))
+
+    def job(self, member_user_id=None):
+        return self._add(Job(member_user_id=member_user_id or self.sample.member, required_caregiving_type='Babysitter',
+                             other_requirements=BENCH_MARKER, date_posted=BENCH_DAY))
+
+    def application(self):
+        job_id = self.job().job_id
+        return self._add(JobApplication(caregiver_user_id=self.sample.caregiver, job_id=job_id, date_applied=BENCH_DAY))
+
+    def appointment_day(self, i):
+        return BENCH_DAY + timedelta(days=i)
+
+    def appointment(self, i, caregiver_user_id=None):
+        return self._add(Appointment(caregiver_user_id=caregiver_user_id or self.sample.caregiver,
+                                     member_user_id=self.sample.member,
+                                     appointment_date=self.appointment_day(i), appointment_time=time_of_day(9),
+                                     work_hours=2, status='pending'))
+
+    def cleanup(self):
+        """Delete everything the write scenarios created, children first"""
+        bench_users = select(User.user_id).where(User.email.like(f'%{BENCH_DOMAIN}'))
+        self.session.query(Appointment).filter(
+            (Appointment.appointment_date >= BENCH_DAY)
+            | Appointment.caregiver_user_id.in_(bench_users) | Appointment.member_user_id.in_(bench_users))\
+            .delete(synchronize_session=False)
+        bench_jobs = select(Job.job_id).where(Job.other_requirements == BENCH_MARKER)
+        self.session.query(JobApplication).filter(JobApplication.job_id.in_(bench_jobs))\
+            .delete(synchronize_session=False)
+        self.session.query(Job).filter(Job.other_requirements == BENCH_MARKER).delete(synchronize_session=False)
+        for model, key in ((JobApplication, JobApplication.caregiver_user_id), (Job, Job.member_user_id),
+                           (Address, Address.member_user_id),
+                           (CaregiverAvailability, CaregiverAvailability.caregiver_user_id),
+                           (Caregiver, Caregiver.caregiver_user_id),
+                           (Member, Member.member_user_id)):
+            self.session.query(model).filter(key.in_(bench_users)).delete(synchronize_session=False)
+        self.session.query(User).filter(User.email.like(f'%{BENCH_DOMAIN}')).delete(synchronize_session=False)
+        self.session.commit()
+
+
+def load_sample(session):
+    """Ids of real rows the read scenarios look at; the busiest caregiver makes conflict pages non-trivial"""
+    caregiver = session.query(Appointment.caregiver_user_id).group_by(Appointment.caregiver_user_id)\
+        .order_by(func.count().desc()).limit(1).scalar() or session.query(func.min(Caregiver.caregiver_user_id)).scalar()
+    member = session.query(func.min(Member.member_user_id)).scalar()
+    application = session.query(JobApplication.caregiver_user_id, JobApplication.job_id).limit(1).first()
+    city = session.query(User.city).filter(User.city.isnot(None)).group_by(User.city)\
+        .order_by(func.count().desc()).limit(1).scalar()
+    sample = Sample(
+        user=session.query(func.min(User.user_id)).scalar(),
+        caregiver=caregiver,
+        member=member,
+        job=session.query(func.min(Job.job_id)).scalar(),
+        application=tuple(application) if application else None,
+        appointment=session.query(func.min(Appointment.appointment_id)).scalar(),
+        city=city or 'Astana',
+    )
+    if None in (sample.user, sample.caregiver, sample.member, sample.job, sample.application, sample.appointment):
+        raise SystemExit("the database needs at least one row per table; load data or pass --reseed")
+    return sample
+
+
+def _form_user(tag):
+    return {'email': f'edit{tag}{BENCH_DOMAIN}', 'given_name': 'Bench', 'surname': str(tag), 'city': 'Astana',
+            'phone_number': f'+7701{tag:07d}', 'profile_description': '', 'password': 'bench'}
+
+
+#--- read scenarios: every list page (first page and ?all=1), form page, search and report page
+
+LISTS = {
+    'users': '/users', 'caregivers': '/caregivers', 'members': '/members', 'addresses': '/addresses',
+    'jobs': '/jobs', 'job-applications': '/job-applications', 'appointments': '/appointments',
+}
+for _name, _path in LISTS.items():
+    scenario(f'{_name}.list')(lambda bench, i, path=_path: ('GET', path, {}))
+    scenario(f'{_name}.list-all')(lambda bench, i, path=_path: ('GET', path + '?all=1', {}))
+    scenario(f'{_name}.create-form')(lambda bench, i, path=_path: ('GET', path + '/create', {}))
+
+
+@scenario('index')
+def _index(bench, i):
+    return 'GET', '/', {}
+
+
+@scenario('users.edit-form')
+def _user_edit_form(bench, i):
+    return 'GET', f'/users/{bench.sample.user}/edit', {}
+
+
+@scenario('caregivers.edit-form')
+def _caregiver_edit_form(bench, i):
+    return 'GET', f'/caregivers/{bench.sample.caregiver}/edit', {}
+
+
+@scenario('caregivers.conflicts')
+def _caregiver_conflicts(bench, i):
+    return 'GET', f'/caregivers/{bench.sample.caregiver}/conflicts', {}
+
+
+@scenario('caregivers.availability')
+def _caregiver_availability(bench, i):
+    return 'GET', f'/caregivers/{bench.sample.caregiver}/availability', {}
+
+
+@scenario('availability.search')
+def _availability_search(bench, i):
+    return 'GET', f'/availability?caregiving_type=Babysitter&city={bench.sample.city}&day=monday&start=09:00&end=12:00', {}
+
+
+@scenario('availability.api')
+def _availability_api(bench, i):
+    return 'GET', f'/api/availability?caregiving_type=Babysitter&city={bench.sample.city}&day=monday&start=09:00&end=12:00', {}
+
+
+@scenario('members.edit-form')
+def _member_edit_form(bench, i):
+    return 'GET', f'/members/{bench.sample.member}/edit', {}
+
+
+@scenario('members.search')
+def _member_search(bench, i):
+    return 'GET', '/members/search?q=pets&mode=fulltext', {}
+
+
+@scenario('addresses.edit-form')
+def _address_edit_form(bench, i):
+    return 'GET', f'/addresses/{bench.sample.member}/edit', {}
+
+
+@scenario('jobs.edit-form')
+def _job_edit_form(bench, i):
+    return 'GET', f'/jobs/{bench.sample.job}/edit', {}
+
+
+@scenario('jobs.search')
+def _job_search(bench, i):
+    return 'GET', '/jobs/search?q=soft-spoken&mode=fulltext', {}
+
+
+@scenario('jobs.matches')
+def _job_matches(bench, i):
+    return 'GET', f'/jobs/{bench.sample.job}/matches', {}
+
+
+@scenario('job-applications.view')
+def _job_application_view(bench, i):
+    return 'GET', '/job-applications/view', {}
+
+
+@scenario('job-applications.edit-form')
+def _job_application_edit_form(bench, i):
+    caregiver_user_id, job_id = bench.sample.application
+    return 'GET', f'/job-applications/{caregiver_user_id}/{job_id}/edit', {}
+
+
+@scenario('appointments.edit-form')
+def _appointment_edit_form(bench, i):
+    return 'GET', f'/appointments/{bench.sample.appointment}/edit', {}
+
+
+@scenario('analytics')
+def _analytics(bench, i):
+    return 'GET', '/analytics', {}
+
+
+for _entity in ('users', 'caregivers', 'jobs', 'appointments'):
+    scenario(f'export.{_entity}')(lambda bench, i, entity=_entity: ('GET', f'/export/{entity}?format=ndjson', {}))
+
+for _path in ('/healthz', '/admin/options-cache', '/admin/fragment-cache', '/admin/match-index', '/admin/replicas',
+              '/admin/maintenance'):
+    scenario(_path.strip('/').replace('/', '.'))(lambda bench, i, path=_path: ('GET', path, {}))
+
+
+#--- write scenarios: each iteration works on rows made by Bench, never on the sample rows
+
+@scenario('users.create', 'write')
+def _user_create(bench, i):
+    return 'POST', '/users/create', {'data': _form_user(bench.serial * 1000 + i)}
+
+
+@scenario('users.edit', 'write')
+def _user_edit(bench, i):
+    if not hasattr(bench, 'edit_user'):
+        bench.edit_user = bench.user().user_id
+    return 'POST', f'/users/{bench.edit_user}/edit', {'data': _form_user(i)}
+
+
+@scenario('users.delete', 'write')
+def _user_delete(bench, i):
+    return 'POST', f'/users/{bench.user().user_id}/delete', {}
+
+
+@scenario('caregivers.create', 'write')
+def _caregiver_create(bench, i):
+    return 'POST', '/caregivers/create', {'data': {
+        'caregiver_user_id': bench.user().user_id, 'gender': 'F', 'caregiving_type': 'Babysitter', 'hourly_rate': '12.5'}}
+
+
+@scenario('caregivers.edit', 'write')
+def _caregiver_edit(bench, i):
+    if not hasattr(bench, 'edit_caregiver'):
+        bench.edit_caregiver = bench.caregiver().caregiver_user_id
+    return 'POST', f'/caregivers/{bench.edit_caregiver}/edit', {'data': {
+        'gender': 'F', 'caregiving_type': 'Babysitter', 'hourly_rate': str(10 + i % 10)}}
+
+
+@scenario('caregivers.delete', 'write')
+def _caregiver_delete(bench, i):
+    return 'POST', f'/caregivers/{bench.caregiver().caregiver_user_id}/delete', {}
+
+
+@scenario('caregivers.bulk-delete', 'write')
+def _caregiver_bulk_delete(bench, i):
+    #each caregiver has an appointment, so the timed DELETE includes the ON DELETE CASCADE to appointment
+    ids = []
+    for _ in range(10):
+        caregiver_user_id = bench.caregiver().caregiver_user_id
+        bench.appointment(i, caregiver_user_id=caregiver_user_id)
+        ids.append(caregiver_user_id)
+    return 'POST', '/api/caregivers:delete', {'json': ids}
+
+
+@scenario('caregivers.set-availability', 'write')
+def _caregiver_set_availability(bench, i):
+    if not hasattr(bench, 'edit_caregiver'):
+        bench.edit_caregiver = bench.caregiver().caregiver_user_id
+    return 'POST', f'/caregivers/{bench.edit_caregiver}/availability', {'data': {
+        'monday': '09:00-12:00, 14:00-18:00', 'wednesday': f'{8 + i % 4:02d}:00-17:00'}}
+
+
+@scenario('members.create', 'write')
+def _member_create(bench, i):
+    return 'POST', '/members/create', {'data': {'member_user_id': bench.user().user_id, 'house_rules': 'No pets please.'}}
+
+
+@scenario('members.edit', 'write')
+def _member_edit(bench, i):
+    if not hasattr(bench, 'edit_member'):
+        bench.edit_member = bench.member().member_user_id
+    return 'POST', f'/members/{bench.edit_member}/edit', {'data': {'house_rules': f'Quiet hours after {i % 12}pm.'}}
+
+
+@scenario('members.delete', 'write')
+def _member_delete(bench, i):
+    return 'POST', f'/members/{bench.member().member_user_id}/delete', {}
+
+
+@scenario('addresses.create', 'write')
+def _address_create(bench, i):
+    return 'POST', '/addresses/create', {'data': {
+        'member_user_id': bench.member().member_user_id, 'house_number': '1', 'street': 'Turan', 'town': 'Astana'}}
+
+
+@scenario('addresses.edit', 'write')
+def _address_edit(bench, i):
+    if not hasattr(bench, 'edit_address'):
+        bench.edit_address = bench.address().member_user_id
+    return 'POST', f'/addresses/{bench.edit_address}/edit', {'data': {
+        'house_number': str(i), 'street': 'Turan', 'town': 'Astana'}}
+
+
+@scenario('addresses.delete', 'write')
+def _address_delete(bench, i):
+    return 'POST', f'/addresses/{bench.address().member_user_id}/delete', {}
+
+
+@scenario('jobs.create', 'write')
+def _job_create(bench, i):
+    return 'POST', '/jobs/create', {'data': {
+        'member_user_id': bench.sample.member, 'required_caregiving_type': 'Babysitter',
+        'other_requirements': BENCH_MARKER, 'date_posted': BENCH_DAY.isoformat()}}
+
+
+@scenario('jobs.edit', 'write')
+def _job_edit(bench, i):
+    if not hasattr(bench, 'edit_job'):
+        bench.edit_job = bench.job().job_id
+    return 'POST', f'/jobs/{bench.edit_job}/edit', {'data': {
+        'member_user_id': bench.sample.member, 'required_caregiving_type': ('Babysitter', 'Playmate')[i % 2],
+        'other_requirements': BENCH_MARKER, 'date_posted': BENCH_DAY.isoformat()}}
+
+
+@scenario('jobs.delete', 'write')
+def _job_delete(bench, i):
+    return 'POST', f'/jobs/{bench.job().job_id}/delete', {}
+
+
+@scenario('job-applications.create', 'write')
+def _job_application_create(bench, i):
+    return 'POST', '/job-applications/create', {'data': {
+        'caregiver_user_id': bench.sample.caregiver, 'job_id': bench.job().job_id, 'date_applied': BENCH_DAY.isoformat()}}
+
+
+@scenario('job-applications.edit', 'write')
+def _job_application_edit(bench, i):
+    if not hasattr(bench, 'edit_application'):
+        application = bench.application()
+        bench.edit_application = (application.caregiver_user_id, application.job_id)
+    caregiver_user_id, job_id = bench.edit_application
+    return 'POST', f'/job-applications/{caregiver_user_id}/{job_id}/edit', {'data': {
+        'caregiver_user_id': caregiver_user_id, 'job_id': job_id,
+        'date_applied': (BENCH_DAY + timedelta(days=i % 30)).isoformat()}}
+
+
+@scenario('job-applications.delete', 'write')
+def _job_application_delete(bench, i):
+    application = bench.application()
+    return 'POST', f'/job-applications/{application.caregiver_user_id}/{application.job_id}/delete', {}
+
+
+@scenario('job-applications.batch', 'write')
+def _job_application_batch(bench, i):
+    caregiver_user_id = bench.sample.caregiver
+    records = [{'caregiver_user_id': caregiver_user_id, 'job_id': bench.job().job_id, 'date_applied': BENCH_DAY.isoformat()}
+               for _ in range(10)]
+    return 'POST', '/api/job-applications:batch', {'json': records}
+
+
+@scenario('appointments.create', 'write')
+def _appointment_create(bench, i):
+    return 'POST', '/appointments/create', {'data': {
+        'caregiver_user_id': bench.sample.caregiver, 'member_user_id': bench.sample.member,
+        'appointment_date': bench.appointment_day(i).isoformat(), 'appointment_time': '09:00',
+        'work_hours': '2', 'status': 'accepted'}}
+
+
+@scenario('appointments.edit', 'write')
+def _appointment_edit(bench, i):
+    if not hasattr(bench, 'edit_appointment'):
+        bench.edit_appointment = bench.appointment(0).appointment_id
+    return 'POST', f'/appointments/{bench.edit_appointment}/edit', {'data': {
+        'caregiver_user_id': bench.sample.caregiver, 'member_user_id': bench.sample.member,
+        'appointment_date': BENCH_DAY.isoformat(), 'appointment_time': f'{9 + i % 4:02d}:00',
+        'work_hours': '2', 'status': 'pending'}}
+
+
+@scenario('appointments.delete', 'write')
+def _appointment_delete(bench, i):
+    return 'POST', f'/appointments/{bench.appointment(i).appointment_id}/delete', {}
+
+
+@scenario('appointments.batch', 'write')
+def _appointment_batch(bench, i):
+    first = BENCH_DAY + timedelta(days=1000 + i * BATCH_RECORDS)
+    records = [{'caregiver_user_id': bench.sample.caregiver, 'member_user_id': bench.sample.member,
+                'appointment_date': (first + timedelta(days=n)).isoformat(), 'appointment_time': '09:00',
+                'work_hours': 2, 'status': 'accepted'} for n in range(BATCH_RECORDS)]
+    return 'POST', '/api/appointments:batch', {'json': records}
+
+
+for _key in REPORTS:
+    SCENARIOS[f'report:{_key}'] = Scenario(f'report:{_key}', 'report', None)
+
+
+#--- measurement
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(latencies, statements, elapsed, errors):
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'rps': round(len(latencies) / elapsed, 1),
+        'statements': round(statistics.mean(statements), 2),
+        'max_statements': max(statements),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'errors': errors,
+    }
+
+
+def run_route(scenario_def, sample, iterations, warmup):
+    import app as appmod #imported in the child, so each scenario starts with cold caches
+    client = appmod.app.test_client()
+    session = db.Session()
+    bench = Bench(session, sample)
+    latencies, statements, errors = [], [], 0
+    try:
+        elapsed = 0.0
+        for i in range(warmup + iterations):
+            method, path, kwargs = scenario_def.request(bench, i)
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()
+            took = time.perf_counter() - started
+            if i < warmup:
+                continue
+            elapsed += took
+            latencies.append(took)
+            statements.append(int(response.headers.get('X-DB-Queries', 0)))
+            if response.status_code >= 400:
+                errors += 1
+    finally:
+        if scenario_def.kind == 'write':
+            bench.cleanup()
+        session.close()
+    return summarize(latencies, statements, elapsed, errors)
+
+
+def run_report(name, iterations, warmup):
+    sql = REPORTS[name.split(':', 1)[1]]
+    statement = text(sql) if isinstance(sql, str) else sql
+    engine = db.get_engine()
+    executed = []
+    event.listen(engine, 'after_cursor_execute', lambda *args: executed.append(1))
+    latencies, statements, errors = [], [], 0
+    elapsed = 0.0
+    with engine.connect() as connection:
+        for i in range(warmup + iterations):
+            before = len(executed)
+            started = time.perf_counter()
+            try:
+                connection.execute(statement).fetchall()
+            except Exception:
+                connection.rollback()
+                errors += 1
+            took = time.perf_counter() - started
+            if i < warmup:
+                continue
+            elapsed += took
+            latencies.append(took)
+            statements.append(len(executed) - before)
+    return summarize(latencies, statements, elapsed, errors)
+
+
+def _child(name, sample, iterations, warmup, queue):
+    try:
+        scenario_def = SCENARIOS[name]
+        if scenario_def.kind == 'report':
+            queue.put(run_report(name, iterations, warmup))
+        else:
+            queue.put(run_route(scenario_def, sample, iterations, warmup))
+    except Exception as e:
+        queue.put({'error': f'{type(e).__name__}: {e}'.splitlines()[0]})
+
+
+def run_scenario(name, sample, iterations, warmup):
+    """Run one scenario in a fresh process so its peak RSS is its own
+
+    Children come from a forkserver rather than a fork of this process: a plain
+    fork inherits the high-water mark of a parent that just ran reseed() and
+    load_sample(), so ru_maxrss would follow the dataset size, not the scenario.
+    """
+    context = multiprocessing.get_context('forkserver')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(name, sample, iterations, warmup, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(names, iterations, warmup, label):
+    session = db.Session()
+    try:
+        sample = load_sample(session)
+        counts = generate_data.table_counts(db.get_engine())
+    finally:
+        session.close()
+    db.get_engine().dispose() #each scenario's process opens its own connections
+    print(f"[{label}] {sum(counts.values())} rows: " + ', '.join(f'{k}={v}' for k, v in counts.items()), file=sys.stderr)
+    print(f"{'scenario':<34}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'stmts':>7}{'rss MB':>8}{'errors':>7}")
+    scenarios = {}
+    for name in names:
+        result = run_scenario(name, sample, iterations, warmup)
+        scenarios[name] = result
+        if 'error' in result:
+            print(f"{name:<34} ERROR {result['error']}")
+            continue
+        print(f"{name:<34}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}{result['rps']:>9}"
+              f"{result['statements']:>7}{result['peak_rss_mb']:>8}{result['errors']:>7}")
+    return {'meta': {'rows': counts, 'iterations': iterations, 'warmup': warmup}, 'scenarios': scenarios}
+
+
+def compare(baseline, current, threshold):
+    """Print metric changes beyond threshold; returns the number of regressions"""
+    regressions = 0
+    for label, run in current['runs'].items():
+        before_run = baseline['runs'].get(label)
+        if before_run is None:
+            print(f"[{label}] not in the baseline, skipped")
+            continue
+        for name, result in run['scenarios'].items():
+            before = before_run['scenarios'].get(name)
+            if before is None or 'error' in before or 'error' in result:
+                continue
+            for metric, larger_is_worse in METRICS.items():
+                old, new = before.get(metric), result.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                worse = change > threshold if larger_is_worse else change < -threshold
+                better = change < -threshold if larger_is_worse else change > threshold
+                if metric.endswith('_ms') and abs(new - old) < MIN_LATENCY_DELTA_MS:
+                    continue
+                if metric == 'statements' and new != old: #statement counts are exact: any increase counts
+                    worse, better = new > old, new < old
+                if worse or better:
+                    regressions += worse
+                    print(f"[{label}] {name:<34}{metric:<13}{old:>10} -> {new:<10}({change:+.0%}) "
+                          f"{'REGRESSION' if worse else 'improved'}")
+    print(f"{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', nargs='+', help='scenario names or glob patterns (see --list)')
+    parser.add_argument('--skip-writes', action='store_true', help='leave out scenarios that write')
+    parser.add_argument('--iterations', type=int, default=200, help='timed requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10, help='untimed requests before measuring')
+    parser.add_argument('--reseed', action='store_true', help='TRUNCATE all tables and load each --scale first')
+    parser.add_argument('--scale', type=int, nargs='+', default=[10000], help='dataset sizes in rows, with --reseed')
+    parser.add_argument('--seed', type=int, default=0, help='generate_data.py seed, with --reseed')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare this run against an earlier --output file')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'RESULTS'), help='compare two saved runs and exit')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative change that counts (default 0.10)')
+    parser.add_argument('--list', action='store_true', help='print scenario names and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, scenario_def in SCENARIOS.items():
+            print(f"{name:<34}{scenario_def.kind}")
+        return 0
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        return 1 if compare(baseline, current, args.threshold) else 0
+
+    names = [name for name in SCENARIOS
+             if not args.only or any(fnmatch.fnmatch(name, pattern) for pattern in args.only)]
+    if args.skip_writes:
+        names = [name for name in names if SCENARIOS[name].kind != 'write']
+
+    results = {'meta': {'revision': git_revision(), 'python': platform.python_version(),
+                        'database': db.masked_url(), 'started': time.strftime('%Y-%m-%dT%H:%M:%S')},
+               'runs': {}}
+    for scale in (args.scale if args.reseed else [None]):
+        label = f'scale-{scale}' if scale else 'current'
+        if scale:
+            generate_data.reseed(db.get_engine(), scale, args.seed)
+        results['runs'][label] = run_suite(names, args.iterations, args.warmup, label)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            return 1 if compare(json.load(f), results, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import bisect
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+from models import Appointment
+
+#work_hours is NUMERIC(5,2), so no appointment can start more than this long before it ends
+MAX_SPAN = timedelta(hours=1000)
+BLOCKING_STATUS = 'accepted' #only accepted appointments block a caregiver's time
+IGNORED_STATUS = 'declined' #declined appointments never conflict with anything
+
+Slot = namedtuple('Slot', 'start end appointment_id status')
+
+
+class BookingConflict(ValueError):
+    """An appointment overlaps one the caregiver has already accepted"""
+
+    def __init__(self, slot, other):
+        self.slot = slot
+        self.other = other
+        which = f"#{other.appointment_id}" if other.appointment_id is not None else "earlier in this batch"
+        super().__init__(
+            f"caregiver already has an accepted appointment {which} "
+            f"from {other.start:%Y-%m-%d %H:%M} to {other.end:%Y-%m-%d %H:%M}")
+
+
+def appointment_slot(appointment_date, appointment_time, work_hours, appointment_id=None, status=None):
+    """(start, end) of an appointment as naive datetimes, or None when it is not fully scheduled
+
+    Matches the appointment_slot() SQL function used by the exclusion constraint.
+    """
+    if appointment_date is None or appointment_time is None or not work_hours:
+        return None
+    start = datetime.combine(appointment_date, appointment_time)
+    return Slot(start, start + timedelta(hours=float(work_hours)), appointment_id, status)
+
+
+def _start(slot):
+    return slot.start
+
+
+def slot_of(appointment):
+    return appointment_slot(appointment.appointment_date, appointment.appointment_time, appointment.work_hours,
+                            appointment.appointment_id, appointment.status)
+
+
+class IntervalIndex:
+    """One caregiver's appointments sorted by start, with a running maximum of end times
+
+    Because max_end is non-decreasing, the first slot that can still be running
+    at a given instant is found by bisect; a lookup costs O(log n + overlaps)
+    rather than a scan of the caregiver's whole history.
+    """
+
+    def __init__(self, slots=()):
+        self._slots = sorted(slots, key=_start)
+        self._dirty = True
+
+    def add(self, slot):
+        bisect.insort(self._slots, slot, key=_start)
+        self._dirty = True
+
+    def _rebuild(self):
+        self._starts = [s.start for s in self._slots]
+        self._max_end = []
+        running = None
+        for s in self._slots:
+            running = s.end if running is None or s.end > running else running
+            self._max_end.append(running)
+        self._dirty = False
+
+    def overlapping(self, start, end):
+        """Slots with slot.start < end and slot.end > start"""
+        if self._dirty:
+            self._rebuild()
+        stop = bisect.bisect_left(self._starts, end)
+        first = bisect.bisect_right(self._max_end, start, 0, stop)
+        return [s for s in self._slots[first:stop] if s.end > start]
+
+    def overlapping_pairs(self):
+        """Every pair of overlapping slots, by a sweep over start times"""
+        pairs, active = [], []
+        for slot in self._slots:
+            active = [a for a in active if a.end > slot.start]
+            pairs.extend((a, slot) for a in active)
+            active.append(slot)
+        return pairs
+
+    def __len__(self):
+        return len(self._slots)
+
+
+def load_slots(session, caregiver_ids, start=None, end=None, statuses=None):
+    """Appointments of the given caregivers that could overlap [start, end), one indexed query"""
+    query = session.query(Appointment.caregiver_user_id, Appointment.appointment_date, Appointment.appointment_time,
+                          Appointment.work_hours, Appointment.appointment_id, Appointment.status)\
+        .filter(Appointment.caregiver_user_id.in_(caregiver_ids))\
+        .filter(Appointment.appointment_time.isnot(None), Appointment.work_hours > 0)
+    if statuses is not None:
+        query = query.filter(Appointment.status.in_(statuses))
+    else:
+        query = query.filter(Appointment.status != IGNORED_STATUS)
+    if start is not None:
+        query = query.filter(Appointment.appointment_date >= (start - MAX_SPAN).date())
+    if end is not None:
+        query = query.filter(Appointment.appointment_date <= end.date())
+    by_caregiver = defaultdict(list)
+    for caregiver_user_id, *fields in query:
+        by_caregiver[caregiver_user_id].append(appointment_slot(*fields))
+    return {caregiver_user_id: IntervalIndex(slots) for caregiver_user_id, slots in by_caregiver.items()}
+
+
+def check_appointment(session, appointment):
+    """Raise BookingConflict if appointment overlaps an accepted one of the same caregiver"""
+    slot = slot_of(appointment)
+    if slot is None or appointment.status == IGNORED_STATUS:
+        return
+    with session.no_autoflush: #an edited row must not reach the exclusion constraint before we look
+        index = load_slots(session, [appointment.caregiver_user_id], slot.start, slot.end,
+                           statuses=[BLOCKING_STATUS]).get(appointment.caregiver_user_id)
+    for other in (index.overlapping(slot.start, slot.end) if index else []):
+        if other.appointment_id != appointment.appointment_id:
+            raise BookingConflict(slot, other)
+
+
+def check_batch(session, rows):
+    """Bulk version of check_appointment for rows of appointment column values
+
+    Loads every affected caregiver's accepted appointments in one query and
+    returns {position: BookingConflict}. Accepted rows that pass are added to
+    the index, so two accepted rows in the same batch also conflict.
+    """
+    slots = [appointment_slot(r['appointment_date'], r['appointment_time'], r['work_hours'], status=r['status'])
+             for r in rows]
+    scheduled = [s for s in slots if s is not None]
+    if not scheduled:
+        return {}
+    caregiver_ids = {r['caregiver_user_id'] for r, s in zip(rows, slots) if s is not None}
+    indexes = load_slots(session, caregiver_ids, min(s.start for s in scheduled), max(s.end for s in scheduled),
+                         statuses=[BLOCKING_STATUS])
+    conflicts = {}
+    for position, (row, slot) in enumerate(zip(rows, slots)):
+        if slot is None or row['status'] == IGNORED_STATUS:
+            continue
+        index = indexes.setdefault(row['caregiver_user_id'], IntervalIndex())
+        found = index.overlapping(slot.start, slot.end)
+        if found:
+            conflicts[position] = BookingConflict(slot, found[0])
+        elif row['status'] == BLOCKING_STATUS:
+            index.add(slot)
+    return conflicts
+
+
+def caregiver_conflicts(session, caregiver_user_id, since=None):
+    """Overlapping pairs among a caregiver's non-declined appointments from since onwards"""
+    start = datetime.combine(since, datetime.min.time()) if since else None
+    index = load_slots(session, [caregiver_user_id], start).get(caregiver_user_id, IntervalIndex())
+    pairs = index.overlapping_pairs()
+    if start is not None: #the query reaches back MAX_SPAN for long appointments; keep pairs that matter from since
+        pairs = [(a, b) for a, b in pairs if b.end > start]
+    return pairs, len(index)
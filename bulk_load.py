@@ -0,0 +1,265 @@
+"""Bulk-load CSV or NDJSON files into Postgres with COPY FROM STDIN
+
+Usage:
+    python bulk_load.py ENTITY FILE [FILE ...] [--batch-size N] [--rejects rejects.ndjson]
+    python bulk_load.py --dir DIR      load DIR/<entity>.csv|.ndjson for every entity in FK order
+
+Rows are validated with the same rules the routes enforce (validation.py). Foreign
+keys are resolved and checked one batch at a time: a row may reference a user by
+id or by email (email, caregiver_email, member_email), and rows pointing at
+missing parents are rejected instead of aborting the COPY. Unique keys (ids,
+user emails, job_application's (caregiver, job)) are checked the same way: rows
+that already exist or repeat an earlier row of the file are rejected. Each file
+loads in a single transaction; any other constraint the database enforces, such
+as appointment_no_overlap, still fails the whole file.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+from sqlalchemy import create_engine
+
+from config import DATABASE_URL, BULK_LOAD_BATCH_SIZE
+from validation import VALIDATORS
+
+#column: (parent table, parent key column, optional email field resolved through "user".email)
+ForeignKey = namedtuple('ForeignKey', 'column table key email_field')
+#unique: column tuples the database keeps unique, checked before COPY so a duplicate is one rejected row
+Entity = namedtuple('Entity', 'table columns serial foreign_keys unique')
+
+ENTITIES = {
+    'user': Entity('"user"', ['user_id', 'email', 'given_name', 'surname', 'city', 'phone_number',
+                              'profile_description', 'password'], 'user_id', [],
+                  [('user_id',), ('email',)]),
+    'caregiver': Entity('caregiver', ['caregiver_user_id', 'photo', 'gender', 'caregiving_type', 'hourly_rate'], None,
+                        [ForeignKey('caregiver_user_id', '"user"', 'user_id', 'email')], [('caregiver_user_id',)]),
+    'member': Entity('member', ['member_user_id', 'house_rules', 'dependent_description'], None,
+                     [ForeignKey('member_user_id', '"user"', 'user_id', 'email')], [('member_user_id',)]),
+    'address': Entity('address', ['member_user_id', 'house_number', 'street', 'town'], None,
+                      [ForeignKey('member_user_id', 'member', 'member_user_id', 'member_email')], [('member_user_id',)]),
+    'job': Entity('job', ['job_id', 'member_user_id', 'required_caregiving_type', 'person_age', 'preferred_time_start',
+                          'preferred_time_end', 'service_frequency', 'other_requirements', 'date_posted'], 'job_id',
+                  [ForeignKey('member_user_id', 'member', 'member_user_id', 'member_email')], [('job_id',)]),
+    'job_application': Entity('job_application', ['caregiver_user_id', 'job_id', 'date_applied'], None,
+                              [ForeignKey('caregiver_user_id', 'caregiver', 'caregiver_user_id', 'caregiver_email'),
+                               ForeignKey('job_id', 'job', 'job_id', None)], [('caregiver_user_id', 'job_id')]),
+    'appointment': Entity('appointment', ['appointment_id', 'caregiver_user_id', 'member_user_id', 'appointment_date',
+                                          'appointment_time', 'work_hours', 'status'], 'appointment_id',
+                          [ForeignKey('caregiver_user_id', 'caregiver', 'caregiver_user_id', 'caregiver_email'),
+                           ForeignKey('member_user_id', 'member', 'member_user_id', 'member_email')],
+                          [('appointment_id',)]),
+}
+LOAD_ORDER = ['user', 'caregiver', 'member', 'address', 'job', 'job_application', 'appointment']
+
+Rejected = namedtuple('Rejected', 'line message')
+
+
+def read_records(path):
+    """Yield (line number, dict) from a .csv or .ndjson/.jsonl file"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.ndjson', '.jsonl')):
+            for number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield number, json.loads(line)
+        else:
+            for number, row in enumerate(csv.DictReader(f), start=2): #line 1 is the header
+                yield number, row
+
+
+def batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def resolve_foreign_keys(cursor, entity, rows):
+    """Fill ids from emails and drop rows whose parents do not exist; one query per key per batch"""
+    rejected = []
+    for fk in entity.foreign_keys:
+        if fk.email_field:
+            emails = {record.get(fk.email_field) for _line, record, _values in rows
+                      if _values[fk.column] is None and record.get(fk.email_field)}
+            if emails:
+                cursor.execute('SELECT email, user_id FROM "user" WHERE email = ANY(%s)', (list(emails),))
+                by_email = dict(cursor.fetchall())
+                for _line, record, values in rows:
+                    if values[fk.column] is None:
+                        values[fk.column] = by_email.get(record.get(fk.email_field))
+
+        ids = {values[fk.column] for _line, _record, values in rows if values[fk.column] is not None}
+        existing = set()
+        if ids:
+            cursor.execute(f'SELECT {fk.key} FROM {fk.table} WHERE {fk.key} = ANY(%s)', (list(ids),))
+            existing = {row[0] for row in cursor.fetchall()}
+        kept = []
+        for line, record, values in rows:
+            if values[fk.column] is None:
+                rejected.append(Rejected(line, f"{fk.column} is required"))
+            elif values[fk.column] not in existing:
+                rejected.append(Rejected(line, f"{fk.column}={values[fk.column]} does not exist in {fk.table.strip(chr(34))}"))
+            else:
+                kept.append((line, record, values))
+        rows = kept
+    return rows, rejected
+
+
+def reject_duplicates(cursor, entity, rows):
+    """Drop rows whose unique keys exist already or repeat an earlier row; one query per key per batch
+
+    Rows COPYed by earlier batches of the same file are visible to the query, since
+    the file loads in one transaction, so only repeats within a batch need tracking.
+    """
+    rejected = []
+    for key in entity.unique:
+        keyed = [(line, record, values, tuple(values[c] for c in key)) for line, record, values in rows]
+        wanted = {k for _line, _record, _values, k in keyed if None not in k}
+        existing = set()
+        if wanted:
+            columns = ', '.join(key)
+            if len(key) == 1:
+                cursor.execute(f'SELECT {columns} FROM {entity.table} WHERE {columns} = ANY(%s)',
+                               ([k[0] for k in wanted],))
+            else:
+                arrays = ', '.join(['%s'] * len(key))
+                cursor.execute(f'SELECT {columns} FROM {entity.table} WHERE ({columns}) IN (SELECT * FROM unnest({arrays}))',
+                               [list(column) for column in zip(*wanted)])
+            existing = {tuple(row) for row in cursor.fetchall()}
+        kept, seen = [], set()
+        for line, record, values, k in keyed:
+            described = ', '.join(f'{c}={v}' for c, v in zip(key, k))
+            if None in k: #a serial id the sequence will assign
+                kept.append((line, record, values))
+            elif k in existing:
+                rejected.append(Rejected(line, f"{described} already exists in {entity.table.strip(chr(34))}"))
+            elif k in seen:
+                rejected.append(Rejected(line, f"{described} repeats an earlier row"))
+            else:
+                seen.add(k)
+                kept.append((line, record, values))
+        rows = kept
+    return rows, rejected
+
+
+def copy_rows(cursor, entity, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for _line, _record, values in rows:
+        writer.writerow(['' if values[c] is None else values[c] for c in columns])
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {entity.table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def reset_sequence(cursor, entity):
+    """Keep the serial sequence ahead of explicitly loaded ids"""
+    if entity.serial:
+        table = entity.table.strip('"')
+        cursor.execute(f"SELECT setval(pg_get_serial_sequence(%s, %s), coalesce(max({entity.serial}), 1)) "
+                       f"FROM {entity.table}", (f'"{table}"' if table == 'user' else table, entity.serial))
+
+
+def load_file(engine, name, path, batch_size=BULK_LOAD_BATCH_SIZE, rejects=None):
+    """Load one file; returns (rows loaded, rows rejected, seconds)"""
+    entity = ENTITIES[name]
+    validate = VALIDATORS[name]
+    loaded = rejected_count = 0
+    started = time.perf_counter()
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for batch in batches(read_records(path), batch_size):
+            rows, rejected = [], []
+            for line, record in batch:
+                try:
+                    rows.append((line, record, validate(record)))
+                except ValueError as e:
+                    rejected.append(Rejected(line, str(e)))
+            rows, fk_rejected = resolve_foreign_keys(cursor, entity, rows)
+            rejected += fk_rejected
+            rows, duplicates = reject_duplicates(cursor, entity, rows)
+            rejected += duplicates
+
+            if rows:
+                #the serial column is only sent when the file provides it, otherwise the sequence fills it in
+                columns = [c for c in entity.columns
+                           if c != entity.serial or any(values[c] is not None for _l, _r, values in rows)]
+                if entity.serial in columns and any(values[entity.serial] is None for _l, _r, values in rows):
+                    for line, _record, _values in rows:
+                        rejected.append(Rejected(line, f"{entity.serial} must be given for every row or none in a batch"))
+                    rows = []
+                else:
+                    copy_rows(cursor, entity, columns, rows)
+                    if entity.serial in columns: #a later batch without ids takes them from the sequence
+                        reset_sequence(cursor, entity)
+            loaded += len(rows)
+            rejected_count += len(rejected)
+            for reject in rejected:
+                if rejects is not None:
+                    rejects.write(json.dumps({'entity': name, 'file': path, 'line': reject.line, 'error': reject.message}) + '\n')
+
+            elapsed = time.perf_counter() - started
+            print(f"  {name}: {loaded} rows loaded, {rejected_count} rejected ({loaded / elapsed:,.0f} rows/s)",
+                  file=sys.stderr)
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    return loaded, rejected_count, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('entity', nargs='?', choices=LOAD_ORDER)
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--dir', help='load <entity>.csv / <entity>.ndjson files from this directory')
+    parser.add_argument('--batch-size', type=int, default=BULK_LOAD_BATCH_SIZE)
+    parser.add_argument('--rejects', help='write rejected rows (line + error) to this NDJSON file')
+    args = parser.parse_args()
+
+    jobs = []
+    if args.dir:
+        for name in LOAD_ORDER:
+            for ext in ('.csv', '.ndjson', '.jsonl'):
+                path = os.path.join(args.dir, name + ext)
+                if os.path.exists(path):
+                    jobs.append((name, path))
+    elif args.entity and args.files:
+        jobs = [(args.entity, path) for path in args.files]
+    else:
+        parser.error('give ENTITY FILE... or --dir DIR')
+
+    engine = create_engine(DATABASE_URL)
+    rejects = open(args.rejects, 'w') if args.rejects else None
+    total_loaded = total_rejected = 0
+    total_seconds = 0.0
+    try:
+        for name, path in jobs:
+            print(f"Loading {path} into {name}", file=sys.stderr)
+            loaded, rejected, seconds = load_file(engine, name, path, args.batch_size, rejects)
+            total_loaded += loaded
+            total_rejected += rejected
+            total_seconds += seconds
+            print(f"{name}: {loaded} loaded, {rejected} rejected in {seconds:.2f}s "
+                  f"({loaded / seconds if seconds else 0:,.0f} rows/s)")
+    finally:
+        if rejects:
+            rejects.close()
+    print(f"Total: {total_loaded} loaded, {total_rejected} rejected in {total_seconds:.2f}s "
+          f"({total_loaded / total_seconds if total_seconds else 0:,.0f} rows/s)")
+    return 1 if total_rejected else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
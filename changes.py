@@ -0,0 +1,82 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import Base
+
+_listeners = []
+
+
+def on_commit(callback):
+    """Register callback(tables, keys) to run after a session commits changes
+
+    tables is a frozenset of table names; keys maps each table to the frozenset
+    of changed primary-key tuples, or None when the rows are not known.
+    """
+    _listeners.append(callback)
+    return callback
+
+
+def _dependents(table_names):
+    #tables whose rows go away with ON DELETE CASCADE when a parent row is deleted
+    found = set(table_names)
+    pending = list(table_names)
+    while pending:
+        parent = pending.pop()
+        for table in Base.metadata.sorted_tables:
+            if table.name in found:
+                continue
+            if any(fk.column.table.name == parent for fk in table.foreign_keys):
+                found.add(table.name)
+                pending.append(table.name)
+    return found
+
+
+def mark_changed(session, *table_names, deleted=False, keys=None):
+    """Record tables touched outside the unit of work (bulk UPDATE/DELETE, raw SQL)
+
+    keys is the set of primary-key tuples that changed; leave it as None when
+    the affected rows are not known, and listeners will treat the whole table
+    as changed.
+    """
+    changed = session.info.setdefault('changed_tables', set())
+    changed_keys = session.info.setdefault('changed_keys', {})
+    for name in table_names:
+        changed.add(name)
+        if keys is None:
+            changed_keys[name] = None
+        elif changed_keys.get(name, set()) is not None:
+            changed_keys.setdefault(name, set()).update(keys)
+    if deleted:
+        cascaded = _dependents(table_names) - set(table_names)
+        changed.update(cascaded)
+        changed_keys.update({name: None for name in cascaded})
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty):
+        keys = {tuple(obj.__mapper__.primary_key_from_instance(obj))}
+        identity = inspect(obj).identity #still the pre-flush key here; an edit of the primary key moves the row
+        if identity is not None:
+            keys.add(tuple(identity))
+        mark_changed(session, obj.__table__.name, keys=keys)
+    for obj in session.deleted:
+        key = tuple(obj.__mapper__.primary_key_from_instance(obj))
+        mark_changed(session, obj.__table__.name, deleted=True, keys={key})
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify(session):
+    tables = session.info.pop('changed_tables', None)
+    keys = session.info.pop('changed_keys', {})
+    if not tables:
+        return
+    keys = {name: (None if k is None else frozenset(k)) for name, k in keys.items()}
+    for callback in _listeners:
+        callback(frozenset(tables), keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard(session):
+    session.info.pop('changed_tables', None)
+    session.info.pop('changed_keys', None)
@@ -76,3 +76,7 @@ CREATE TABLE appointment (
     FOREIGN KEY (caregiver_user_id) REFERENCES caregiver(caregiver_user_id),
     FOREIGN KEY (member_user_id) REFERENCES member(member_user_id)
 );
+
+
+-- Secondary indexes and later schema changes are versioned in migrations/.
+-- After loading this file (and sample_data.sql), run: python migrate.py
@@ -0,0 +1,228 @@
+"""Per-process engines and sessions for the primary and its read replicas
+
+Sessions made with Session(replica=True) send read-only statements to one of
+REPLICA_URLS (round-robin over the replicas that passed their last health and
+lag check) and everything else to the primary. Once a session writes, its
+later reads stay on the primary too, so it always reads its own writes.
+
+To try it locally, any second Postgres holding the same schema will do as a
+"replica" (a real one is a pg_basebackup -R standby):
+    REPLICA_URLS=postgresql://localhost:5433/caregiver_platform python app.py
+/admin/replicas then shows each replica's health, lag and read count.
+"""
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session as _Session, sessionmaker
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.sql.selectable import CompoundSelect, TextualSelect
+
+from config import (DATABASE_URL, POOL_SIZE, MAX_OVERFLOW, POOL_RECYCLE, POOL_TIMEOUT,
+                    REPLICA_URLS, REPLICA_MAX_LAG, REPLICA_CHECK_INTERVAL)
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_engine = None
+_sessionmaker = None
+_engine_hooks = []
+_replicas = None
+_round_robin = itertools.count()
+
+#seconds behind the primary; 0 while the standby has replayed everything it received, so an idle
+#primary does not look like lag
+_LAG_SQL = """
+SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0) END
+"""
+_LOCKING = re.compile(r"\bfor\s+(update|share|no\s+key\s+update|key\s+share)\b|advisory", re.IGNORECASE)
+_WRITES = re.compile(r"\b(insert|update|delete|merge|refresh|truncate)\b", re.IGNORECASE)
+
+
+def masked_url(url=DATABASE_URL):
+    """DATABASE_URL with the password replaced, safe to log"""
+    if not url:
+        return 'not set'
+    parts = urlsplit(url)
+    if parts.password:
+        return url.replace(f':{parts.password}@', ':****@', 1)
+    return url
+
+
+def on_engine(callback):
+    """Register callback(engine) to run once for every engine the process creates
+
+    Engines that already exist (say, created before the module registering the
+    hook was imported) get it right away.
+    """
+    _engine_hooks.append(callback)
+    for engine in ([_engine] if _engine is not None else []) + [replica.engine for replica in _replicas or ()]:
+        callback(engine)
+    return callback
+
+
+def engine_options(url=DATABASE_URL):
+    options = {'pool_pre_ping': True}
+    if not url.startswith('sqlite'): #SQLite uses a single-connection pool without these knobs
+        options.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                       pool_recycle=POOL_RECYCLE, pool_timeout=POOL_TIMEOUT)
+    return options
+
+
+def _create_engine(url, **extra):
+    engine = create_engine(url, **engine_options(url), **extra)
+    for hook in _engine_hooks:
+        hook(engine)
+    return engine
+
+
+def get_engine():
+    """This process's engine, created on first use rather than at import"""
+    global _engine, _sessionmaker
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                engine = _create_engine(DATABASE_URL)
+                _sessionmaker = sessionmaker(bind=engine, class_=RoutingSession)
+                _engine = engine
+                logger.info("database engine created for %s", masked_url())
+    return _engine
+
+
+class Replica:
+    """One read replica: its engine plus the result of the last health and lag check"""
+
+    def __init__(self, url):
+        self.url = url
+        extra = {} if url.startswith('sqlite') else {'connect_args': {'connect_timeout': 2}}
+        self.engine = _create_engine(url, **extra)
+        self.healthy = True
+        self.lag = None
+        self.error = None
+        self.checked = 0.0
+        self.reads = 0
+        event.listen(self.engine, 'handle_error', self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect: #stop routing here until the next check finds it back
+            self.healthy = False
+            self.error = str(context.original_exception).splitlines()[0]
+
+    def check(self):
+        sql = _LAG_SQL if self.engine.dialect.name == 'postgresql' else 'SELECT 0'
+        try:
+            #a raw DBAPI connection, so the check is not counted against the request that triggered it
+            conn = self.engine.raw_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(sql)
+                self.lag = float(cursor.fetchone()[0] or 0)
+            finally:
+                conn.close()
+            self.healthy, self.error = True, None
+        except Exception as e:
+            if self.healthy:
+                logger.warning("replica %s failed its health check: %s", masked_url(self.url), e)
+            self.healthy, self.error = False, str(e).splitlines()[0]
+
+    def usable(self):
+        return self.healthy and not (REPLICA_MAX_LAG and self.lag is not None and self.lag > REPLICA_MAX_LAG)
+
+    def status(self):
+        return {'url': masked_url(self.url), 'healthy': self.healthy, 'lag_seconds': self.lag,
+                'usable': self.usable(), 'reads': self.reads, 'error': self.error}
+
+
+def get_replicas():
+    global _replicas
+    if _replicas is None:
+        with _lock:
+            if _replicas is None:
+                _replicas = [Replica(url) for url in REPLICA_URLS]
+    return _replicas
+
+
+def choose_replica():
+    """Next usable replica's engine in round-robin order, or None to read from the primary"""
+    replicas = get_replicas()
+    if not replicas:
+        return None
+    now = time.monotonic()
+    for replica in replicas:
+        if now - replica.checked >= REPLICA_CHECK_INTERVAL:
+            replica.checked = now #claim the check so concurrent requests do not repeat it
+            replica.check()
+    for _ in range(len(replicas)):
+        replica = replicas[next(_round_robin) % len(replicas)]
+        if replica.usable():
+            replica.reads += 1
+            return replica.engine
+    return None
+
+
+def replica_status():
+    return [replica.status() for replica in get_replicas()]
+
+
+def is_read_only(clause):
+    """True for SELECTs that take no locks; anything else must run on the primary"""
+    if isinstance(clause, Select):
+        return clause._for_update_arg is None
+    if isinstance(clause, (CompoundSelect, TextualSelect)):
+        return True
+    if isinstance(clause, TextClause):
+        sql = clause.text.lstrip().lower()
+        if sql.startswith('select'):
+            return not _LOCKING.search(sql)
+        return sql.startswith('with') and not _LOCKING.search(sql) and not _WRITES.search(sql)
+    return False
+
+
+class RoutingSession(_Session):
+    """Session that may send reads to a replica; see Session(replica=True)"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get('replica') and not self._flushing and clause is not None and is_read_only(clause):
+            if 'replica_engine' not in self.info: #one replica per session, so its reads are mutually consistent
+                self.info['replica_engine'] = choose_replica()
+            if self.info['replica_engine'] is not None:
+                return self.info['replica_engine']
+        elif self.info.get('replica'):
+            self.info['replica'] = False #a write: every later read in this session goes to the primary
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+def Session(replica=False):
+    """A session on the primary; replica=True lets its reads go to a replica until it writes"""
+    get_engine()
+    session = _sessionmaker()
+    if replica and REPLICA_URLS:
+        session.info['replica'] = True
+    return session
+
+
+def _after_fork_in_child():
+    #a child forked from a process that already had an engine (gunicorn --preload) must not reuse the
+    #parent's pooled sockets; close=False leaves them open for the parent and gives the child an empty pool
+    if _engine is not None:
+        _engine.dispose(close=False)
+    for replica in _replicas or ():
+        replica.engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def check_connection():
+    """Run SELECT 1; returns the pool status line, raises on failure"""
+    with get_engine().connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return _engine.pool.status()
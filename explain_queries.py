@@ -0,0 +1,134 @@
+"""EXPLAIN every report in queries.py and the ORM queries issued by app.py
+
+Usage: python explain_queries.py [--analyze] [--output plans.json] [--compare before.json]
+
+Prints, per query, the estimated cost and any relation read with a sequential
+scan. Save a run with --output before applying migrations and pass it to
+--compare afterwards to see which seq scans the new indexes removed.
+"""
+import argparse
+import json
+import sys
+from datetime import date
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+import list_queries
+from config import DATABASE_URL, PAGE_SIZE
+from models import Caregiver, Member, Address, Job, JobApplication, Appointment
+from options_cache import OPTION_LISTS
+from pagination import keyset_query
+from queries import REPORTS
+
+SAMPLE_ID = 1
+
+
+def orm_queries(session):
+    """(name, Query) for every ORM statement shape app.py runs against a populated table"""
+    found = []
+    for name in ('users', 'caregivers', 'members', 'addresses', 'jobs', 'job_applications', 'appointments'):
+        query, columns = getattr(list_queries, name)(session)
+        found.append((f'list:{name}:first-page', keyset_query(query, columns, PAGE_SIZE)))
+        deep_key = [SAMPLE_ID] * len(columns)
+        if name == 'appointments':
+            deep_key = [date(2025, 1, 1), SAMPLE_ID]
+        found.append((f'list:{name}:deep-page', keyset_query(query, columns, PAGE_SIZE, after_key=deep_key)))
+    for name, (build_query, _label, _tables) in OPTION_LISTS.items():
+        found.append((f'options:{name}', build_query(session)))
+    #child lookups the ORM runs when cascading a delete
+    found += [
+        ('cascade:caregiver->job_application', session.query(JobApplication).filter(JobApplication.caregiver_user_id == SAMPLE_ID)),
+        ('cascade:caregiver->appointment', session.query(Appointment).filter(Appointment.caregiver_user_id == SAMPLE_ID)),
+        ('cascade:member->address', session.query(Address).filter(Address.member_user_id == SAMPLE_ID)),
+        ('cascade:member->job', session.query(Job).filter(Job.member_user_id == SAMPLE_ID)),
+        ('cascade:member->appointment', session.query(Appointment).filter(Appointment.member_user_id == SAMPLE_ID)),
+        ('cascade:job->job_application', session.query(JobApplication).filter(JobApplication.job_id == SAMPLE_ID)),
+        ('lookup:caregiver', session.query(Caregiver).filter_by(caregiver_user_id=SAMPLE_ID)),
+        ('lookup:member', session.query(Member).filter_by(member_user_id=SAMPLE_ID)),
+    ]
+    return found
+
+
+def compile_sql(query):
+    statement = getattr(query, 'statement', query) #ORM Query or Core/text clause
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+
+
+def seq_scans(plan):
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        found += seq_scans(child)
+    return found
+
+
+def explain(session, sql, analyze):
+    options = 'ANALYZE, BUFFERS, FORMAT JSON' if analyze else 'FORMAT JSON'
+    if analyze:
+        session.begin_nested() #ANALYZE executes the statement; keep it inside a rolled-back savepoint
+    try:
+        plan = session.execute(text(f"EXPLAIN ({options}) {sql}")).scalar()
+    finally:
+        if analyze:
+            session.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    top = plan[0]['Plan']
+    result = {'cost': top['Total Cost'], 'seq_scans': sorted(set(seq_scans(top)))}
+    if analyze:
+        result['time_ms'] = plan[0].get('Execution Time')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--analyze', action='store_true', help='run EXPLAIN ANALYZE (executes each query)')
+    parser.add_argument('--output', help='write plans to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier --output run')
+    args = parser.parse_args()
+
+    engine = create_engine(DATABASE_URL)
+    session = sessionmaker(bind=engine)()
+    results = {}
+    try:
+        statements = [(f'report:{key}', sql if isinstance(sql, str) else compile_sql(sql))
+                      for key, sql in REPORTS.items()]
+        statements += [(name, compile_sql(query)) for name, query in orm_queries(session)]
+        for name, sql in statements:
+            try:
+                results[name] = explain(session, sql, args.analyze)
+            except Exception as e:
+                session.rollback()
+                results[name] = {'error': str(e).splitlines()[0]}
+    finally:
+        session.close()
+
+    before = {}
+    if args.compare:
+        with open(args.compare) as f:
+            before = json.load(f)
+
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"{name:45} ERROR {result['error']}")
+            continue
+        scans = ', '.join(result['seq_scans']) or '-'
+        line = f"{name:45} cost={result['cost']:>12.2f}  seq scans: {scans}"
+        if name in before and 'cost' in before[name]:
+            old = before[name]
+            removed = sorted(set(old['seq_scans']) - set(result['seq_scans']))
+            line += f"  (was cost={old['cost']:.2f}"
+            line += f", removed seq scans: {', '.join(removed)})" if removed else ")"
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import zlib
+from collections import namedtuple
+
+from flask import Response, request
+from sqlalchemy import select
+
+from config import EXPORT_BATCH_SIZE
+from models import User, Caregiver, Member, Address, Job, JobApplication, Appointment
+from validation import APPOINTMENT_STATUSES, date_value, choice_value
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+#url name -> table, column for ?since/?until, column for ?status
+Export = namedtuple('Export', 'table date_column status_column')
+
+EXPORTS = {
+    'users': Export(User.__table__, None, None),
+    'caregivers': Export(Caregiver.__table__, None, None),
+    'members': Export(Member.__table__, None, None),
+    'addresses': Export(Address.__table__, None, None),
+    'jobs': Export(Job.__table__, 'date_posted', None),
+    'job-applications': Export(JobApplication.__table__, 'date_applied', None),
+    'appointments': Export(Appointment.__table__, 'appointment_date', 'status'),
+}
+EXCLUDED_COLUMNS = {'password'}
+
+
+def export_statement(export, since=None, until=None, status=None):
+    """Core SELECT over the exported columns in primary-key order"""
+    table = export.table
+    columns = [c for c in table.c if c.key not in EXCLUDED_COLUMNS]
+    statement = select(*columns).order_by(*table.primary_key.columns)
+    if since is not None:
+        statement = statement.where(table.c[export.date_column] >= since)
+    if until is not None:
+        statement = statement.where(table.c[export.date_column] <= until)
+    if status is not None:
+        statement = statement.where(table.c[export.status_column] == status)
+    return statement
+
+
+def parse_filters(export):
+    """?since, ?until (YYYY-MM-DD, inclusive) and ?status; raises ValueError on bad input"""
+    args = request.args
+    if export.date_column is None and (args.get('since') or args.get('until')):
+        raise ValueError('this export has no date column to filter on')
+    if export.status_column is None and args.get('status'):
+        raise ValueError('this export has no status column to filter on')
+    return {
+        'since': date_value(args, 'since'),
+        'until': date_value(args, 'until'),
+        'status': choice_value(args, 'status', APPOINTMENT_STATUSES) if export.status_column else None,
+    }
+
+
+def _encode_batch(fmt, keys, rows):
+    if fmt == 'ndjson':
+        return ''.join(json.dumps(dict(zip(keys, row)), default=str) + '\n' for row in rows)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def iter_export(session, statement, fmt, compress=False, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the encoded export one server-side cursor batch at a time
+
+    Rows come back as plain tuples from a Core select, so no ORM objects are
+    built; like streaming.iter_rows the session is closed when the generator
+    finishes or the client disconnects.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None #31 = gzip container
+
+    def emit(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else data
+
+    try:
+        result = session.execute(statement, execution_options={'stream_results': True, 'yield_per': batch_size})
+        keys = list(result.keys())
+        if fmt == 'csv':
+            yield emit(_encode_batch(fmt, None, [keys]))
+        for rows in result.partitions():
+            yield emit(_encode_batch(fmt, keys, rows))
+        if compressor:
+            yield compressor.flush()
+    finally:
+        session.close()
+
+
+def wants_gzip():
+    return request.args.get('gzip') in ('1', 'true', 'yes') or (
+        request.args.get('gzip') is None and 'gzip' in request.accept_encodings)
+
+
+def export_response(session, name, fmt):
+    export = EXPORTS[name]
+    statement = export_statement(export, **parse_filters(export))
+    compress = wants_gzip()
+    response = Response(iter_export(session, statement, fmt, compress), mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{name}.{fmt}"'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import g, render_template, request
+from markupsafe import Markup
+
+from changes import on_commit
+from config import FRAGMENT_CACHE_BYTES, FRAGMENT_CACHE_TTL, REPLICA_MAX_LAG
+from models import Base
+from pagination import Page, paginate, decode_cursors, _key_of
+from versions import version_key
+
+#rows template, its context variable, the table the page is keyed on, and for every other table
+#it shows: the row attributes holding that table's primary key
+Fragment = namedtuple('Fragment', 'template variable table refs')
+
+FRAGMENTS = {
+    'users': Fragment('rows/user_rows.html', 'users', 'user', {}),
+    'caregivers': Fragment('rows/caregiver_rows.html', 'caregivers', 'caregiver',
+                           {'user': ('caregiver_user_id',)}),
+    'members': Fragment('rows/member_rows.html', 'members', 'member', {'user': ('member_user_id',)}),
+    'addresses': Fragment('rows/address_rows.html', 'addresses', 'address',
+                          {'member': ('member_user_id',), 'user': ('member_user_id',)}),
+    'jobs': Fragment('rows/job_rows.html', 'jobs', 'job',
+                     {'member': ('member_user_id',), 'user': ('member_user_id',)}),
+    'job_applications': Fragment('rows/job_application_rows.html', 'applications', 'job_application',
+                                 {'caregiver': ('caregiver_user_id',), 'user': ('caregiver_user_id',),
+                                  'job': ('job_id',)}),
+    'appointments': Fragment('rows/appointment_rows.html', 'appointments', 'appointment',
+                             {'caregiver': ('caregiver_user_id',), 'member': ('member_user_id',),
+                              'user': ('caregiver_user_id', 'member_user_id')}),
+}
+
+
+class Entry:
+    """One cached page: its HTML plus what it needs to decide whether a commit touched it
+
+    bounds is the (low, high) primary-key range of the page's own table, inclusive,
+    None on either side meaning open-ended. It is only known when the page is keyset
+    paginated on that primary key; otherwise bounds is None and any change to the
+    table drops the page. refs holds the keys of the rows shown from joined tables.
+    """
+
+    def __init__(self, value, size, table, bounds, refs, expires):
+        self.value = value
+        self.size = size
+        self.table = table
+        self.bounds = bounds
+        self.refs = refs
+        self.expires = expires
+
+    def tables(self):
+        return {self.table} | set(self.refs)
+
+    def _in_bounds(self, key):
+        low, high = self.bounds
+        return (low is None or key >= low) and (high is None or key <= high)
+
+    def affected_by(self, table, keys):
+        if keys is None:
+            return True
+        if table == self.table:
+            return self.bounds is None or any(self._in_bounds(key) for key in keys)
+        return not self.refs[table].isdisjoint(keys)
+
+
+class FragmentCache:
+    """Process-local LRU of rendered list-table bodies, bounded by total bytes
+
+    Entries are dropped by the commit hook when a change can reach the page: a
+    changed key inside its range, a changed row it shows from another table, or
+    an unknown change to any of its tables. The TTL bounds staleness for writes
+    made by other worker processes; when the table versions are known the key
+    includes them, so those writes miss immediately.
+    """
+
+    def __init__(self, max_bytes=FRAGMENT_CACHE_BYTES, ttl=FRAGMENT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_table = {}
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def put(self, key, value, size, table, bounds, refs, generation, ttl=None):
+        if not self.max_bytes or size > self.max_bytes: #FRAGMENT_CACHE_BYTES=0 turns the cache off
+            return
+        entry = Entry(value, size, table, bounds, refs, time.monotonic() + (ttl or self.ttl))
+        with self._lock:
+            if generation != self._generation: #a commit landed while we rendered: the HTML may predate it
+                return
+            if key in self._entries:
+                self._drop(key)
+            while self._entries and self._bytes + size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = entry
+            self._bytes += size
+            for name in entry.tables():
+                self._by_table.setdefault(name, set()).add(key)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for name in entry.tables():
+            self._by_table[name].discard(key)
+
+    def invalidate(self, tables=None, keys=None):
+        with self._lock:
+            self._generation += 1
+            if tables is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._by_table.clear()
+                self._bytes = 0
+                return
+            for name in tables:
+                changed = keys.get(name) if keys else None
+                for key in list(self._by_table.get(name, ())):
+                    if self._entries[key].affected_by(name, changed):
+                        self._drop(key)
+                        self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+            }
+
+
+fragment_cache = FragmentCache()
+on_commit(fragment_cache.invalidate)
+
+
+def _primary_keyed(table, columns):
+    return [col.key for col in columns] == [col.key for col in Base.metadata.tables[table].primary_key.columns]
+
+
+def _page_bounds(page, columns, after_key, before_key):
+    """Inclusive key range a new, changed or deleted row must fall in to alter this page"""
+    first = tuple(_key_of(page.items[0], columns)) if page.items else None
+    last = tuple(_key_of(page.items[-1], columns)) if page.items else None
+    if before_key is not None:
+        return (first if page.has_prev else None), tuple(before_key)
+    low = tuple(after_key) if after_key is not None else None
+    return low, (last if page.has_next else None)
+
+
+def cached_rows(name, query, columns):
+    """(page, rows_html) for one list page, rendering the rows template only on a miss
+
+    A hit skips both the query and the render; the Page it returns has no items,
+    only the size and cursors the pagination controls need.
+    """
+    fragment = FRAGMENTS[name]
+    versions = g.get('table_versions')
+    key = (name, tuple(sorted(request.args.items(multi=True))), version_key(versions) if versions else None)
+    cached = fragment_cache.get(key)
+    if cached is not None:
+        return cached
+
+    generation = fragment_cache.generation()
+    page = paginate(query, columns)
+    rows_html = Markup(render_template(fragment.template, **{fragment.variable: page.items}))
+
+    bounds = None
+    if _primary_keyed(fragment.table, columns):
+        after = request.args.get('after') or None
+        before = None if after else (request.args.get('before') or None)
+        _after, _before, after_key, before_key = decode_cursors(after, before, columns)
+        bounds = _page_bounds(page, columns, after_key, before_key)
+    refs = {table: {(getattr(item, attr),) for item in page.items for attr in attrs}
+            for table, attrs in fragment.refs.items()}
+
+    #rows read from a replica may predate a commit the invalidation already saw; keep them no longer than the lag ceiling
+    ttl = None
+    if query.session.info.get('replica_engine') is not None and REPLICA_MAX_LAG:
+        ttl = min(REPLICA_MAX_LAG, fragment_cache.ttl)
+    value = (Page([], page.size, next_cursor=page.next_cursor, prev_cursor=page.prev_cursor), rows_html)
+    fragment_cache.put(key, value, len(rows_html.encode()), fragment.table, bounds, refs, generation, ttl)
+    return page, rows_html
@@ -0,0 +1,375 @@
+"""Generate a deterministic synthetic dataset at any scale and load it with COPY
+
+Usage:
+    python generate_data.py --rows 100000 --load              COPY straight into DATABASE_URL
+    python generate_data.py --rows 100000 --out fixtures/     write <entity>.csv for bulk_load.py --dir
+    python generate_data.py --users 5000 --seed 7 --load
+
+The same --seed and scale always produce the same rows. Every CHECK and FK in
+database_schema.sql holds, as does the no-overlap rule on accepted appointments
+(migrations/0005): each caregiver's appointments sit in distinct day/shift slots.
+Distributions are skewed like the real platform: most users live in Astana or
+Almaty, a few popular caregivers take most appointments and applications, and
+appointments are a pending/accepted/declined mix.
+
+--load continues after the highest existing user_id, job_id and appointment_id,
+so it can add to a database that already holds data; --out files assume an
+empty database.
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import date, time as time_of_day, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import analytics
+import matviews
+from bulk_load import ENTITIES, LOAD_ORDER, batches, copy_rows, reset_sequence
+from config import DATABASE_URL, BULK_LOAD_BATCH_SIZE
+from models import Base
+from validation import CAREGIVING_TYPES, GENDERS, APPOINTMENT_STATUSES
+
+#rows generated per user, so --rows can be turned into a user count
+CAREGIVER_SHARE = 0.4  # the remaining users are members, each with one address
+JOBS_PER_MEMBER = 1.5
+APPLICATIONS_PER_JOB = 3  # mean of an exponential draw, capped by the caregivers of the job's type
+APPOINTMENTS_PER_MEMBER = 2
+ROWS_PER_USER = 1 + CAREGIVER_SHARE + 2 * (1 - CAREGIVER_SHARE) \
+    + (1 - CAREGIVER_SHARE) * (JOBS_PER_MEMBER * (1 + APPLICATIONS_PER_JOB) + APPOINTMENTS_PER_MEMBER)
+
+CITIES = ('Astana', 'Almaty', 'Shymkent', 'Karaganda', 'Aktobe')
+CITY_WEIGHTS = (45, 40, 7, 5, 3)
+TYPE_WEIGHTS = (45, 35, 20)  # CAREGIVING_TYPES order
+GENDER_WEIGHTS = (70, 25, 5)  # GENDERS order
+STATUS_WEIGHTS = (30, 50, 20)  # APPOINTMENT_STATUSES order
+POPULARITY_EXPONENT = 1.1  # Zipf-like: caregiver of rank r is picked with weight 1 / r**s
+
+FIRST_DAY = date(2024, 1, 1)
+DAYS = 730
+DAY_STRIDE = 17  # coprime with DAYS, so a caregiver's first DAYS slots land on distinct days
+SHIFTS = (time_of_day(8), time_of_day(12), time_of_day(16))
+WORK_HOURS = tuple(Decimal(h) for h in ('1', '1.5', '2', '2.5', '3', '3.5', '4'))  # never past the next shift
+
+GIVEN_NAMES = ('Alice', 'Bob', 'Carol', 'David', 'Emma', 'Frank', 'Grace', 'Henry', 'Isabella', 'Jack',
+               'Arman', 'Amina', 'Kairat', 'Madina', 'Nurlan', 'Sara', 'Aigerim', 'Daniyar', 'Dana', 'Yerlan',
+               'Aruzhan', 'Timur', 'Zhanar', 'Askar', 'Laura', 'Bekzat', 'Aliya', 'Miras', 'Kamila', 'Ruslan')
+SURNAMES = ('Johnson', 'Smith', 'Davis', 'Wilson', 'Brown', 'Miller', 'Lee', 'Taylor', 'Moore', 'Anderson',
+            'Armanov', 'Aminova', 'Nurzhanov', 'Abdullayeva', 'Kazakhov', 'Novak', 'Seitkali', 'Omarov',
+            'Bekova', 'Tulegenov', 'Zhaksybekova', 'Iskakov', 'Sadykova', 'Mukanov', 'Ermekova')
+STREETS = ('Kabanbay Batyr', 'Turan', 'Mangilik El', 'Abay', 'Dostyk', 'Al-Farabi', 'Tole Bi', 'Satpayev',
+           'Kenesary', 'Republic')
+CAREGIVER_PROFILES = {
+    'Babysitter': ('Certified babysitter with first aid training.', 'Friendly babysitter who loves children.'),
+    'Elderly Care': ('Professional elderly caregiver with CPR certification.', 'Senior care specialist.'),
+    'Playmate': ('Creative playmate for children.', 'Playmate and tutor for children with special needs.'),
+}
+MEMBER_PROFILES = ('Looking for a reliable caregiver.', 'Working parent seeking after-school care.',
+                   'Need help caring for an elderly parent.')
+HOUSE_RULES = ('No pets please.', 'No smoking.', 'Shoes off at the door.', 'Quiet hours after 9pm.', None)
+DEPENDENTS = {
+    'Babysitter': 'child aged {age}',
+    'Elderly Care': 'parent aged {age}',
+    'Playmate': 'child aged {age} who loves games',
+}
+AGES = {'Babysitter': (1, 12), 'Elderly Care': (65, 95), 'Playmate': (3, 14)}
+FREQUENCIES = ('daily', 'weekly', 'twice a week', 'weekends', 'occasional')
+REQUIREMENTS = ('soft-spoken', 'non-smoker', 'speaks Kazakh', 'has a car', 'first aid certified', None)
+
+Plan = namedtuple('Plan', 'users caregivers members jobs appointments')
+Offsets = namedtuple('Offsets', 'user job appointment')
+
+
+def plan_for(users=None, rows=None):
+    """Row counts for a dataset of the given user count, or of roughly `rows` rows in total"""
+    if users is None:
+        users = max(10, round(rows / ROWS_PER_USER))
+    caregivers = max(1, round(users * CAREGIVER_SHARE))
+    members = users - caregivers
+    return Plan(users, caregivers, members, round(members * JOBS_PER_MEMBER),
+                round(members * APPOINTMENTS_PER_MEMBER))
+
+
+class Dataset:
+    """Rows for one seed and plan; each entity draws from its own seeded stream
+
+    Caregivers take the first plan.caregivers user ids and members the rest, so
+    ids never need to be kept in memory. Per-user facts that later entities
+    depend on (city, caregiving type, popularity) are drawn once up front.
+    """
+
+    def __init__(self, plan, seed=0, offsets=Offsets(0, 0, 0)):
+        self.plan = plan
+        self.seed = seed
+        self.offsets = offsets
+        rng = self._rng('profile')
+        self.cities = bytearray(rng.choices(range(len(CITIES)), CITY_WEIGHTS, k=plan.users))
+        self.types = bytearray(rng.choices(range(len(CAREGIVING_TYPES)), TYPE_WEIGHTS, k=plan.caregivers))
+        self.job_types = bytearray(rng.choices(range(len(CAREGIVING_TYPES)), TYPE_WEIGHTS, k=plan.jobs))
+        self.job_dates = array('H', (rng.randrange(DAYS) for _ in range(plan.jobs)))
+
+        #popularity order is a shuffle, so busy caregivers are spread over the id range
+        ranked = list(range(plan.caregivers))
+        rng.shuffle(ranked)
+        self.popular = self._weighted(ranked)
+        self.popular_by_type = [self._weighted([c for c in ranked if self.types[c] == t])
+                                for t in range(len(CAREGIVING_TYPES))]
+
+    def _rng(self, name):
+        return random.Random(f'{self.seed}:{name}')
+
+    @staticmethod
+    def _weighted(ranked):
+        return ranked, list(accumulate(1 / (rank + 1) ** POPULARITY_EXPONENT for rank in range(len(ranked))))
+
+    @staticmethod
+    def _pick(rng, weighted):
+        ranked, cumulative = weighted
+        return ranked[bisect_left(cumulative, rng.random() * cumulative[-1])]
+
+    def caregiver_id(self, index):
+        return self.offsets.user + 1 + index
+
+    def member_id(self, index):
+        return self.offsets.user + self.plan.caregivers + 1 + index
+
+    def users(self):
+        rng = self._rng('user')
+        for index in range(self.plan.users):
+            user_id = self.offsets.user + 1 + index
+            given, surname = rng.choice(GIVEN_NAMES), rng.choice(SURNAMES)
+            if index < self.plan.caregivers:
+                description = rng.choice(CAREGIVER_PROFILES[CAREGIVING_TYPES[self.types[index]]])
+            else:
+                description = rng.choice(MEMBER_PROFILES)
+            yield {
+                'user_id': user_id,
+                'email': f'{given}.{surname}.{user_id}@example.com'.lower(),
+                'given_name': given,
+                'surname': surname,
+                'city': CITIES[self.cities[index]],
+                'phone_number': f'+7701{rng.randrange(10 ** 7):07d}',
+                'profile_description': description,
+                'password': 'pass123',
+            }
+
+    def caregivers(self):
+        rng = self._rng('caregiver')
+        for index in range(self.plan.caregivers):
+            user_id = self.caregiver_id(index)
+            yield {
+                'caregiver_user_id': user_id,
+                'photo': f'caregiver{user_id}.jpg' if rng.random() < 0.8 else None,
+                'gender': rng.choices(GENDERS, GENDER_WEIGHTS)[0],
+                'caregiving_type': CAREGIVING_TYPES[self.types[index]],
+                'hourly_rate': Decimal(rng.randrange(500, 3000)) / 100,
+            }
+
+    def members(self):
+        rng = self._rng('member')
+        for index in range(self.plan.members):
+            kind = rng.choice(CAREGIVING_TYPES)
+            yield {
+                'member_user_id': self.member_id(index),
+                'house_rules': rng.choice(HOUSE_RULES),
+                'dependent_description': DEPENDENTS[kind].format(age=rng.randint(*AGES[kind])),
+            }
+
+    def addresses(self):
+        rng = self._rng('address')
+        for index in range(self.plan.members):
+            yield {
+                'member_user_id': self.member_id(index),
+                'house_number': str(rng.randint(1, 200)),
+                'street': rng.choice(STREETS),
+                'town': CITIES[self.cities[self.plan.caregivers + index]],
+            }
+
+    def jobs(self):
+        rng = self._rng('job')
+        for index in range(self.plan.jobs):
+            kind = CAREGIVING_TYPES[self.job_types[index]]
+            start = rng.randint(8, 16)
+            yield {
+                'job_id': self.offsets.job + 1 + index,
+                'member_user_id': self.member_id(rng.randrange(self.plan.members)),
+                'required_caregiving_type': kind,
+                'person_age': rng.randint(*AGES[kind]),
+                'preferred_time_start': time_of_day(start),
+                'preferred_time_end': time_of_day(min(start + rng.randint(2, 6), 23)),
+                'service_frequency': rng.choice(FREQUENCIES),
+                'other_requirements': rng.choice(REQUIREMENTS),
+                'date_posted': FIRST_DAY + timedelta(days=self.job_dates[index]),
+            }
+
+    def job_applications(self):
+        #applicants offer the job's caregiving type, and popular caregivers apply more often
+        rng = self._rng('job_application')
+        for index in range(self.plan.jobs):
+            weighted = self.popular_by_type[self.job_types[index]]
+            wanted = min(len(weighted[0]), round(rng.expovariate(1 / APPLICATIONS_PER_JOB)))
+            applicants = set()
+            for _attempt in range(wanted * 4):
+                if len(applicants) == wanted:
+                    break
+                applicants.add(self._pick(rng, weighted))
+            posted = FIRST_DAY + timedelta(days=self.job_dates[index])
+            for caregiver in sorted(applicants):
+                yield {
+                    'caregiver_user_id': self.caregiver_id(caregiver),
+                    'job_id': self.offsets.job + 1 + index,
+                    'date_applied': posted + timedelta(days=rng.randint(0, 14)),
+                }
+
+    def appointments(self):
+        #slot n of a caregiver is a (day, shift) no other slot of theirs uses, so no two overlap
+        rng = self._rng('appointment')
+        capacity = DAYS * len(SHIFTS)
+        booked = array('I', bytes(4 * self.plan.caregivers))
+        for index in range(self.plan.appointments):
+            caregiver = self._pick(rng, self.popular)
+            while booked[caregiver] >= capacity:
+                caregiver = rng.randrange(self.plan.caregivers)
+            slot = booked[caregiver]
+            booked[caregiver] += 1
+            day = (caregiver * 31 + slot * DAY_STRIDE) % DAYS
+            yield {
+                'appointment_id': self.offsets.appointment + 1 + index,
+                'caregiver_user_id': self.caregiver_id(caregiver),
+                'member_user_id': self.member_id(rng.randrange(self.plan.members)),
+                'appointment_date': FIRST_DAY + timedelta(days=day),
+                'appointment_time': SHIFTS[slot // DAYS],
+                'work_hours': rng.choice(WORK_HOURS),
+                'status': rng.choices(APPOINTMENT_STATUSES, STATUS_WEIGHTS)[0],
+            }
+
+    def rows(self, name):
+        return {
+            'user': self.users, 'caregiver': self.caregivers, 'member': self.members,
+            'address': self.addresses, 'job': self.jobs, 'job_application': self.job_applications,
+            'appointment': self.appointments,
+        }[name]()
+
+
+def existing_offsets(engine):
+    """Highest ids already in the database, so generated ids continue after them"""
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('SELECT (SELECT coalesce(max(user_id), 0) FROM "user"), '
+                       '(SELECT coalesce(max(job_id), 0) FROM job), '
+                       '(SELECT coalesce(max(appointment_id), 0) FROM appointment)')
+        return Offsets(*cursor.fetchone())
+    finally:
+        connection.close()
+
+
+def write_csv(dataset, directory):
+    os.makedirs(directory, exist_ok=True)
+    for name in LOAD_ORDER:
+        columns = ENTITIES[name].columns
+        path = os.path.join(directory, name + '.csv')
+        count = 0
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for values in dataset.rows(name):
+                writer.writerow(['' if values[c] is None else values[c] for c in columns])
+                count += 1
+        print(f"{name}: {count} rows -> {path}")
+
+
+def load(dataset, engine, batch_size):
+    """COPY every entity in FK order, one transaction each; returns total rows"""
+    total = 0
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for name in LOAD_ORDER:
+            entity = ENTITIES[name]
+            loaded = 0
+            started = time.perf_counter()
+            for batch in batches(dataset.rows(name), batch_size):
+                copy_rows(cursor, entity, entity.columns, [(None, None, values) for values in batch])
+                loaded += len(batch)
+                elapsed = time.perf_counter() - started
+                print(f"  {name}: {loaded} rows ({loaded / elapsed:,.0f} rows/s)", file=sys.stderr)
+            reset_sequence(cursor, entity)
+            connection.commit()
+            seconds = time.perf_counter() - started
+            print(f"{name}: {loaded} loaded in {seconds:.2f}s ({loaded / seconds if seconds else 0:,.0f} rows/s)")
+            total += loaded
+        for name in LOAD_ORDER: #fresh planner statistics before anyone measures against the new data
+            cursor.execute(f'ANALYZE {ENTITIES[name].table}')
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    return total
+
+
+def table_counts(engine):
+    """{entity: row count} for every table the generator fills"""
+    with engine.connect() as connection:
+        return {name: connection.execute(text(f"SELECT count(*) FROM {ENTITIES[name].table}")).scalar()
+                for name in LOAD_ORDER}
+
+
+def reseed(engine, rows, seed=0):
+    """TRUNCATE every table, load a dataset of about `rows` rows and rebuild what is derived from it"""
+    tables = ', '.join(f'"{table.name}"' for table in reversed(Base.metadata.sorted_tables))
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    load(Dataset(plan_for(rows=rows), seed), engine, BULK_LOAD_BATCH_SIZE * 10)
+    session = sessionmaker(bind=engine)()
+    try: #rollups and the materialized view would otherwise describe the old data
+        analytics.rebuild(session)
+        matviews.refresh(session, 'job_application_mv', force=True)
+    except Exception as e:
+        session.rollback()
+        print(f"warning: derived tables not rebuilt: {str(e).splitlines()[0]}", file=sys.stderr)
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    scale = parser.add_mutually_exclusive_group()
+    scale.add_argument('--rows', type=int, default=10000, help='approximate total rows across all tables')
+    scale.add_argument('--users', type=int, help='number of users; the other tables scale with it')
+    parser.add_argument('--seed', type=int, default=0)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--load', action='store_true', help='COPY into DATABASE_URL')
+    target.add_argument('--out', help='write <entity>.csv files to this directory instead')
+    parser.add_argument('--batch-size', type=int, default=BULK_LOAD_BATCH_SIZE * 10)
+    args = parser.parse_args()
+
+    plan = plan_for(users=args.users, rows=args.rows)
+    print(f"Plan (seed {args.seed}): {plan.users} users, {plan.caregivers} caregivers, {plan.members} members, "
+          f"{plan.jobs} jobs, ~{round(plan.jobs * APPLICATIONS_PER_JOB)} applications, "
+          f"{plan.appointments} appointments", file=sys.stderr)
+
+    started = time.perf_counter()
+    if args.out:
+        write_csv(Dataset(plan, args.seed), args.out)
+    else:
+        engine = create_engine(DATABASE_URL)
+        offsets = existing_offsets(engine)
+        total = load(Dataset(plan, args.seed, offsets), engine, args.batch_size)
+        print(f"Total: {total} rows in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from functools import wraps
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from config import QUERY_BUDGET_STRICT, N_PLUS_ONE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+request_logger = logging.getLogger('caregiver.requests')
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A view ran more SQL statements than it declared (usually an N+1 lazy load)"""
+
+
+class RequestStats:
+    """SQL activity attributed to the current Flask request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.by_sql = Counter()
+
+
+def normalize_sql(statement):
+    #strip literals and bound values so the same query shape with different ids counts as one
+    sql = _LITERALS.sub('?', statement)
+    sql = sql.replace('%s', '?')
+    sql = re.sub(r"%\([^)]+\)s", '?', sql)
+    sql = _IN_LISTS.sub('IN (?)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def current_stats():
+    if not has_request_context():
+        return None
+    stats = g.get('db_stats')
+    if stats is None:
+        stats = g.db_stats = RequestStats()
+    return stats
+
+
+def instrument_engine(engine):
+    """Attribute every statement run on engine to the request that issued it"""
+
+    #the start time lives on the statement's execution context: after_cursor_execute never fires for a
+    #failed statement, so anything kept on the pooled connection would outlive it
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_query_start', None)
+        elapsed = time.perf_counter() - started if started is not None else 0.0
+        stats = current_stats()
+        if stats is None:
+            return
+        stats.statements += 1
+        stats.db_time += elapsed
+        if cursor.rowcount and cursor.rowcount > 0 and cursor.description is not None:
+            stats.rows += cursor.rowcount #server-side cursors report -1 and are not counted
+        stats.by_sql[normalize_sql(statement)] += 1
+
+
+def init_app(app):
+    """Report per-request SQL counts via headers and a structured log line"""
+
+    @app.before_request
+    def _start_request():
+        g.db_stats = RequestStats()
+
+    @app.after_request
+    def _report_request(response):
+        stats = current_stats()
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.db_time * 1000
+        response.headers['X-DB-Queries'] = str(stats.statements)
+        response.headers['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{stats.statements} queries", app;dur={total_ms:.1f}'
+        )
+
+        repeated = {sql: n for sql, n in stats.by_sql.items() if n > N_PLUS_ONE_THRESHOLD}
+        for sql, n in repeated.items():
+            logger.warning("possible N+1 in %s: %d executions of %s", request.endpoint, n, sql[:200])
+
+        request_logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            'db_queries': stats.statements,
+            'db_time_ms': round(db_ms, 2),
+            'db_rows': stats.rows,
+            'repeated_queries': len(repeated),
+        }))
+        return response
+
+
+def query_budget(max_statements):
+    """Declare how many SQL statements a view may run, independent of row count
+
+    Over-budget views log a warning, or raise QueryBudgetExceeded when
+    QUERY_BUDGET_STRICT is set (use that when exercising routes in tests).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            stats = current_stats()
+            start = stats.statements
+            response = view(*args, **kwargs)
+            used = stats.statements - start
+            if used > max_statements:
+                message = f"{view.__name__} ran {used} SQL statements (budget {max_statements})"
+                if QUERY_BUDGET_STRICT:
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,56 @@
+from sqlalchemy.orm import contains_eager, joinedload
+
+from models import User, Caregiver, Member, Address, Job, JobApplication, Appointment
+
+#Each list view declares the loader strategy for everything its template touches,
+#so rendering a page never falls back to per-row lazy loads. Every function returns
+#(query, keyset columns); the columns are unique and define the page order.
+
+
+def users(session):
+    return session.query(User), [User.user_id]
+
+
+def caregivers(session):
+    query = session.query(Caregiver)\
+        .join(Caregiver.user)\
+        .options(contains_eager(Caregiver.user))
+    return query, [Caregiver.caregiver_user_id]
+
+
+def members(session):
+    query = session.query(Member)\
+        .join(Member.user)\
+        .options(contains_eager(Member.user))
+    return query, [Member.member_user_id]
+
+
+def addresses(session):
+    query = session.query(Address)\
+        .join(Address.member).join(Member.user)\
+        .options(contains_eager(Address.member).contains_eager(Member.user))
+    return query, [Address.member_user_id]
+
+
+def jobs(session):
+    query = session.query(Job)\
+        .join(Job.member).join(Member.user)\
+        .options(contains_eager(Job.member).contains_eager(Member.user))
+    return query, [Job.job_id]
+
+
+def job_applications(session):
+    query = session.query(JobApplication)\
+        .join(JobApplication.caregiver).join(Caregiver.user)\
+        .join(JobApplication.job)\
+        .options(contains_eager(JobApplication.caregiver).contains_eager(Caregiver.user))\
+        .options(contains_eager(JobApplication.job))
+    return query, [JobApplication.caregiver_user_id, JobApplication.job_id]
+
+
+def appointments(session):
+    #caregiver and member both point at "user", so joinedload's anonymous aliases are simpler than contains_eager here
+    query = session.query(Appointment)\
+        .options(joinedload(Appointment.caregiver).joinedload(Caregiver.user))\
+        .options(joinedload(Appointment.member).joinedload(Member.user))
+    return query, [Appointment.appointment_date, Appointment.appointment_id] #id breaks ties between same-day appointments
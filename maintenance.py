@@ -0,0 +1,359 @@
+"""Chunked bulk maintenance: caregiver rate adjustments and address-based purges
+
+Usage:
+    python maintenance.py rates [--below 10] [--add 0.3] [--percent 10] [options]
+    python maintenance.py purge-street STREET [options]
+    python maintenance.py status
+    options: [--dry-run] [--chunk-size N] [--pause SECONDS] [--max-chunks N] [--name NAME] [--restart]
+
+The batch forms of queries.py sections 3.2 and 4.2. Rows are visited in
+primary-key order, --chunk-size at a time, and each chunk commits on its own, so
+row locks are held for one chunk and WAL is written in small steps instead of one
+burst. A chunk and its checkpoint (the last key done, kept in
+maintenance_checkpoints, migrations/0008) commit together: an interrupted run
+resumes after its last chunk and never applies one twice, which matters for a
+rate increase. A finished run is not repeated unless --restart is given.
+
+Between chunks the job sleeps --pause seconds and waits while a read replica is
+more than MAINTENANCE_MAX_LAG seconds behind. --dry-run only counts the rows the
+run (or the rest of it) would touch.
+"""
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import (Table, Column, Text, BigInteger, Integer, DateTime, MetaData,
+                        select, insert, update, delete, func, case, or_)
+
+import db
+from changes import mark_changed
+from config import MAINTENANCE_CHUNK_SIZE, MAINTENANCE_PAUSE, MAINTENANCE_MAX_LAG
+from models import User, Caregiver, Address, Job, JobApplication, Appointment
+
+#created by migrations/0008_maintenance_checkpoints.sql, not by create_all()
+maintenance_metadata = MetaData()
+
+checkpoints = Table(
+    'maintenance_checkpoints', maintenance_metadata,
+    Column('name', Text, primary_key=True),
+    Column('operation', Text, nullable=False),
+    Column('params', Text, nullable=False),
+    Column('last_key', BigInteger),
+    Column('chunks_done', Integer, nullable=False),
+    Column('counts', Text, nullable=False),
+    Column('started_at', DateTime(timezone=True), nullable=False),
+    Column('updated_at', DateTime(timezone=True), nullable=False),
+    Column('finished_at', DateTime(timezone=True)),
+)
+
+
+def _next_keys(session, column, after, limit, *criteria):
+    query = select(column).where(*criteria).order_by(column).limit(limit)
+    if after is not None:
+        query = query.where(column > after)
+    return session.scalars(query).all()
+
+
+def _count(session, model, *criteria):
+    return session.scalar(select(func.count()).select_from(model).where(*criteria))
+
+
+def _rate_chunk(session, after, limit, below, add, percent):
+    ids = _next_keys(session, Caregiver.caregiver_user_id, after, limit)
+    if ids:
+        rate = Caregiver.hourly_rate
+        session.execute(update(Caregiver).where(Caregiver.caregiver_user_id.in_(ids))
+                        .values(hourly_rate=case((rate < below, rate + add), else_=rate * (1 + percent / 100)))
+                        .execution_options(synchronize_session=False))
+        mark_changed(session, 'caregiver', keys={(id_,) for id_ in ids}) #bulk UPDATE bypasses the unit of work
+    return ids, {'caregiver': len(ids)}
+
+
+def _rate_count(session, after, below, add, percent):
+    criteria = [] if after is None else [Caregiver.caregiver_user_id > after]
+    return {'caregiver': _count(session, Caregiver, *criteria)}
+
+
+def _street_statements(members):
+    #children first: every child would go by ON DELETE CASCADE (appointment since migration 0009), but each is counted
+    jobs = select(Job.job_id).where(Job.member_user_id.in_(members))
+    return [
+        ('appointment', Appointment,
+         or_(Appointment.member_user_id.in_(members), Appointment.caregiver_user_id.in_(members))),
+        ('job_application', JobApplication, JobApplication.job_id.in_(jobs)),
+        ('job', Job, Job.member_user_id.in_(members)),
+        ('user', User, User.user_id.in_(members)), #member and address rows go with the user
+    ]
+
+
+def _street_chunk(session, after, limit, street):
+    ids = _next_keys(session, Address.member_user_id, after, limit, Address.street == street)
+    counts = {}
+    if ids:
+        for table, model, criterion in _street_statements(ids):
+            statement = delete(model).where(criterion).execution_options(synchronize_session=False)
+            counts[table] = session.execute(statement).rowcount
+        mark_changed(session, 'user', deleted=True, keys={(id_,) for id_ in ids})
+    return ids, counts
+
+
+def _street_count(session, after, street):
+    members = select(Address.member_user_id).where(Address.street == street)
+    if after is not None:
+        members = members.where(Address.member_user_id > after)
+    return {table: _count(session, model, criterion) for table, model, criterion in _street_statements(members)}
+
+
+#params: name -> (parser, default or None when required); count(session, after, **params) -> {table: rows};
+#chunk(session, after, limit, **params) -> (keys done in order, {table: rows})
+Operation = namedtuple('Operation', 'params count chunk')
+
+OPERATIONS = {
+    'rates': Operation({'below': (Decimal, Decimal('10')), 'add': (Decimal, Decimal('0.3')),
+                        'percent': (Decimal, Decimal('10'))}, _rate_count, _rate_chunk),
+    'purge-street': Operation({'street': (str, None)}, _street_count, _street_chunk),
+}
+
+
+def parse_params(operation, values):
+    """Typed parameters for an operation from a mapping of strings (CLI args, a form or JSON body)"""
+    params = {}
+    for key, (parse, default) in OPERATIONS[operation].params.items():
+        raw = values.get(key)
+        if raw is None or raw == '':
+            if default is None:
+                raise ValueError(f"{key} is required")
+            params[key] = default
+            continue
+        try:
+            params[key] = parse(str(raw))
+        except ArithmeticError: #decimal.InvalidOperation
+            raise ValueError(f"{key}: not a number: {raw!r}")
+    return params
+
+
+def _encode(params):
+    return json.dumps({key: str(value) for key, value in params.items()}, sort_keys=True)
+
+
+def run_name(operation, params):
+    return operation + ':' + ','.join(f'{key}={value}' for key, value in sorted(params.items()))
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _checkpoint(session, name, lock=False):
+    query = select(checkpoints).where(checkpoints.c.name == name)
+    return session.execute(query.with_for_update() if lock else query).first()
+
+
+def start(session, name, operation, params, restart=False):
+    """Create the checkpoint for a run, or reset it with restart; refuses to resume with other parameters"""
+    encoded = _encode(params)
+    row = _checkpoint(session, name, lock=True)
+    now = _now()
+    fresh = {'operation': operation, 'params': encoded, 'last_key': None, 'chunks_done': 0, 'counts': '{}',
+             'started_at': now, 'updated_at': now, 'finished_at': None}
+    if row is None:
+        session.execute(insert(checkpoints).values(name=name, **fresh))
+    elif restart:
+        session.execute(update(checkpoints).where(checkpoints.c.name == name).values(**fresh))
+    elif (row.operation, row.params) != (operation, encoded):
+        session.rollback()
+        raise ValueError(f"run {name!r} was started as {row.operation} {row.params}; restart it to change that")
+    session.commit()
+
+
+def throttle(pause, max_lag=MAINTENANCE_MAX_LAG, timeout=60):
+    """Sleep between chunks, then wait while a healthy replica is more than max_lag seconds behind
+
+    Returns False if a replica is still behind after timeout seconds; the run then
+    stops and can be resumed from its checkpoint later.
+    """
+    if pause:
+        time.sleep(pause)
+    if not max_lag:
+        return True
+    deadline = time.monotonic() + timeout
+    for replica in db.get_replicas():
+        replica.check()
+        while replica.healthy and replica.lag is not None and replica.lag > max_lag:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(min(1.0, max_lag))
+            replica.check()
+    return True
+
+
+def run(operation, params, name=None, chunk_size=MAINTENANCE_CHUNK_SIZE, pause=MAINTENANCE_PAUSE,
+        max_chunks=None, restart=False, on_chunk=None):
+    """Run or resume an operation chunk by chunk, one transaction per chunk
+
+    Stops when the operation runs out of rows, after max_chunks chunks, or when
+    replica lag does not recover. Returns the run's status() plus 'stopped':
+    finished, max_chunks or replica_lag.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk size must be at least 1")
+    spec = OPERATIONS[operation]
+    name = name or run_name(operation, params)
+    session = db.Session()
+    try:
+        start(session, name, operation, params, restart)
+    finally:
+        session.close()
+
+    chunks, stopped = 0, 'max_chunks'
+    while max_chunks is None or chunks < max_chunks:
+        if chunks and not throttle(pause):
+            stopped = 'replica_lag'
+            break
+        session = db.Session()
+        try:
+            row = _checkpoint(session, name, lock=True) #a second runner of the same job waits here
+            if row.finished_at is not None:
+                session.rollback()
+                stopped = 'finished'
+                break
+            ids, counts = spec.chunk(session, row.last_key, chunk_size, **params)
+            totals = json.loads(row.counts)
+            for table, rows in counts.items():
+                totals[table] = totals.get(table, 0) + rows
+            values = {'chunks_done': row.chunks_done + (1 if ids else 0),
+                      'counts': json.dumps(totals, sort_keys=True), 'updated_at': _now()}
+            if ids:
+                values['last_key'] = ids[-1]
+            if len(ids) < chunk_size:
+                values['finished_at'] = values['updated_at']
+            session.execute(update(checkpoints).where(checkpoints.c.name == name).values(**values))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        chunks += 1
+        if on_chunk is not None:
+            on_chunk(name, ids, counts)
+        if 'finished_at' in values:
+            stopped = 'finished'
+            break
+
+    result = status(name)[0]
+    result['stopped'] = stopped
+    return result
+
+
+def dry_run(operation, params, name=None, restart=False):
+    """Rows the run would touch, counted from its checkpoint when it is partly done
+
+    A finished run touches nothing (run() stops at once), so its counts are empty
+    and 'finished' is set, unless restart asks what a fresh run would touch.
+    """
+    name = name or run_name(operation, params)
+    session = db.Session()
+    try:
+        row = _checkpoint(session, name)
+        same = row is not None and not restart and (row.operation, row.params) == (operation, _encode(params))
+        finished = same and row.finished_at is not None
+        after = row.last_key if same and not finished else None
+        counts = {} if finished else OPERATIONS[operation].count(session, after, **params)
+    finally:
+        session.close()
+    return {'name': name, 'operation': operation, 'params': json.loads(_encode(params)), 'dry_run': True,
+            'finished': finished, 'resume_after': after, 'counts': counts}
+
+
+def _status(row):
+    def stamp(value):
+        return value.isoformat() if value is not None else None
+    return {
+        'name': row.name,
+        'operation': row.operation,
+        'params': json.loads(row.params),
+        'last_key': row.last_key,
+        'chunks_done': row.chunks_done,
+        'counts': json.loads(row.counts),
+        'started_at': stamp(row.started_at),
+        'updated_at': stamp(row.updated_at),
+        'finished_at': stamp(row.finished_at),
+    }
+
+
+def status(name=None):
+    """Checkpoints of every run (or just one), oldest first"""
+    query = select(checkpoints).order_by(checkpoints.c.started_at)
+    if name is not None:
+        query = query.where(checkpoints.c.name == name)
+    with db.get_engine().connect() as connection:
+        return [_status(row) for row in connection.execute(query)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help='show the checkpoint of every run')
+    rates = commands.add_parser('rates', help='section 3.2: +ADD below BELOW, +PERCENT%% otherwise')
+    rates.add_argument('--below', default='10', help='hourly rate under which the flat increase applies')
+    rates.add_argument('--add', default='0.3', help='flat increase for rates under --below')
+    rates.add_argument('--percent', default='10', help='percentage increase for every other rate')
+    purge = commands.add_parser('purge-street', help='section 4.2: delete every member living on STREET')
+    purge.add_argument('street')
+    for command in (rates, purge):
+        command.add_argument('--dry-run', action='store_true', help='only count the rows the run would touch')
+        command.add_argument('--chunk-size', type=int, default=MAINTENANCE_CHUNK_SIZE)
+        command.add_argument('--pause', type=float, default=MAINTENANCE_PAUSE, help='seconds to sleep between chunks')
+        command.add_argument('--max-chunks', type=int, help='stop after this many chunks; rerun to resume')
+        command.add_argument('--name', help='checkpoint name (default: the operation and its parameters)')
+        command.add_argument('--restart', action='store_true', help='discard the checkpoint and start over')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        for row in status():
+            state = f"finished {row['finished_at']}" if row['finished_at'] else f"at key {row['last_key']}"
+            print(f"{row['name']}: {row['chunks_done']} chunks, {row['counts']}, {state}")
+        return 0
+
+    try:
+        params = parse_params(args.command, vars(args))
+        if args.dry_run:
+            report = dry_run(args.command, params, args.name, restart=args.restart)
+            if report['finished']:
+                print(f"{report['name']}: already finished; pass --restart to count a fresh run")
+                return 0
+            start_at = f" after key {report['resume_after']}" if report['resume_after'] is not None else ''
+            print(f"{report['name']} would touch{start_at}: " +
+                  ', '.join(f'{table}={rows}' for table, rows in report['counts'].items()))
+            return 0
+
+        ran = []
+
+        def progress(name, ids, counts):
+            ran.append(len(ids))
+            if ids:
+                print(f"{name}: keys {ids[0]}..{ids[-1]}: " +
+                      ', '.join(f'{table}={rows}' for table, rows in counts.items()), file=sys.stderr)
+
+        result = run(args.command, params, name=args.name, chunk_size=args.chunk_size, pause=args.pause,
+                     max_chunks=args.max_chunks, restart=args.restart, on_chunk=progress)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if result['stopped'] == 'finished' and not ran:
+        print(f"{result['name']}: already finished {result['finished_at']}; pass --restart to run it again")
+    elif result['stopped'] == 'finished':
+        print(f"{result['name']}: finished, {result['chunks_done']} chunks, {result['counts']}")
+    else:
+        print(f"{result['name']}: stopped ({result['stopped']}) at key {result['last_key']}, "
+              f"{result['chunks_done']} chunks, {result['counts']}; rerun to resume")
+    return 0 if result['stopped'] != 'replica_lag' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
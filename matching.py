@@ -0,0 +1,156 @@
+import bisect
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import func
+
+from changes import on_commit
+from config import MATCH_INDEX_TTL, MATCH_LIMIT
+from models import User, Caregiver, Member, Address, Job, Appointment
+
+CaregiverEntry = namedtuple('CaregiverEntry', 'caregiver_user_id given_name surname caregiving_type city hourly_rate')
+Match = namedtuple('Match', 'caregiver load')
+
+
+def _city_key(city):
+    return (city or '').strip().lower()
+
+
+class CaregiverIndex:
+    """In-memory caregiver lookup partitioned by (caregiving_type, city)
+
+    Each partition keeps its caregivers sorted by hourly_rate, so a budget filter
+    is a bisect instead of a scan. The index is built lazily on first use, patched
+    per row when caregivers or their users are committed in this process, and
+    rebuilt after MATCH_INDEX_TTL seconds to pick up writes from other workers.
+    """
+
+    def __init__(self, ttl=MATCH_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._partitions = {}
+        self._built_at = None
+        self._stale_ids = set()
+        self._full_rebuild = True
+
+    #--- maintenance
+
+    def _load(self, session, ids=None):
+        query = session.query(Caregiver.caregiver_user_id, User.given_name, User.surname,
+                              Caregiver.caregiving_type, User.city, Caregiver.hourly_rate)\
+            .join(User, User.user_id == Caregiver.caregiver_user_id)
+        if ids is not None:
+            query = query.filter(Caregiver.caregiver_user_id.in_(ids))
+        return [CaregiverEntry(*row) for row in query]
+
+    def _partition_key(self, entry):
+        return entry.caregiving_type, _city_key(entry.city)
+
+    def _insert(self, entry):
+        partition = self._partitions.setdefault(self._partition_key(entry), [])
+        bisect.insort(partition, (entry.hourly_rate or 0, entry.caregiver_user_id))
+        self._by_id[entry.caregiver_user_id] = entry
+
+    def _remove(self, caregiver_user_id):
+        entry = self._by_id.pop(caregiver_user_id, None)
+        if entry is None:
+            return
+        partition = self._partitions.get(self._partition_key(entry), [])
+        position = bisect.bisect_left(partition, (entry.hourly_rate or 0, caregiver_user_id))
+        if position < len(partition) and partition[position][1] == caregiver_user_id:
+            del partition[position]
+
+    def _ensure_fresh(self, session):
+        with self._lock:
+            expired = self._built_at is None or time.monotonic() - self._built_at > self.ttl
+            if self._full_rebuild or expired:
+                entries = self._load(session)
+                self._by_id, self._partitions = {}, {}
+                for entry in entries:
+                    self._insert(entry)
+                self._built_at = time.monotonic()
+                self._full_rebuild = False
+                self._stale_ids.clear()
+            elif self._stale_ids:
+                ids, self._stale_ids = self._stale_ids, set()
+                for caregiver_user_id in ids:
+                    self._remove(caregiver_user_id)
+                for entry in self._load(session, ids):
+                    self._insert(entry)
+
+    def invalidate(self, tables=None, keys=None):
+        """Commit listener: queue changed caregivers for a targeted reload"""
+        if tables is not None and not tables & {'caregiver', 'user'}:
+            return
+        with self._lock:
+            for table in ('caregiver', 'user'):
+                if tables is not None and table not in tables:
+                    continue
+                changed = (keys or {}).get(table)
+                if changed is None:
+                    self._full_rebuild = True
+                    return
+                self._stale_ids.update(key[0] for key in changed)
+
+    #--- queries
+
+    def candidates(self, session, caregiving_type, city, max_rate=None):
+        self._ensure_fresh(session)
+        with self._lock:
+            partition = self._partitions.get((caregiving_type, _city_key(city)), [])
+            end = len(partition) if max_rate is None else bisect.bisect_right(partition, (max_rate, float('inf')))
+            return [self._by_id[caregiver_user_id] for _rate, caregiver_user_id in partition[:end]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'caregivers': len(self._by_id),
+                'partitions': {f"{t} / {c or '-'}": len(p) for (t, c), p in sorted(self._partitions.items())},
+                'age_seconds': None if self._built_at is None else round(time.monotonic() - self._built_at, 1),
+            }
+
+
+caregiver_index = CaregiverIndex()
+on_commit(caregiver_index.invalidate)
+
+
+def job_location(session, job_id):
+    """(job, city) where city is the member's address town, falling back to the user's city"""
+    row = session.query(Job, Address.town, User.city)\
+        .join(Member, Member.member_user_id == Job.member_user_id)\
+        .join(User, User.user_id == Member.member_user_id)\
+        .outerjoin(Address, Address.member_user_id == Member.member_user_id)\
+        .filter(Job.job_id == job_id)\
+        .first()
+    if row is None:
+        return None, None
+    job, town, city = row
+    return job, town or city
+
+
+def appointment_load(session, caregiver_ids):
+    """Upcoming pending/accepted appointments per caregiver, for the candidate set only"""
+    if not caregiver_ids:
+        return {}
+    rows = session.query(Appointment.caregiver_user_id, func.count())\
+        .filter(Appointment.caregiver_user_id.in_(caregiver_ids))\
+        .filter(Appointment.status.in_(('pending', 'accepted')))\
+        .filter(Appointment.appointment_date >= func.current_date())\
+        .group_by(Appointment.caregiver_user_id)
+    return dict(rows.all())
+
+
+def match_caregivers(session, job_id, max_rate=None, limit=MATCH_LIMIT):
+    """Rank caregivers for a job: least-loaded first, then cheapest
+
+    Returns (job, city, [Match]) or (None, None, []) when the job does not exist.
+    """
+    job, city = job_location(session, job_id)
+    if job is None:
+        return None, None, []
+    entries = caregiver_index.candidates(session, job.required_caregiving_type, city, max_rate)
+    load = appointment_load(session, [e.caregiver_user_id for e in entries])
+    ranked = sorted(entries, key=lambda e: (load.get(e.caregiver_user_id, 0), e.hourly_rate or 0, e.caregiver_user_id))
+    return job, city, [Match(e, load.get(e.caregiver_user_id, 0)) for e in ranked[:limit]]
@@ -0,0 +1,106 @@
+"""Materialized views and their outbox-driven refresh
+
+Usage:
+    python matviews.py [--force]        refresh job_application_mv now if it has pending changes
+    python matviews.py --watch SECONDS  keep running, refreshing once the oldest pending change
+                                        is MATVIEW_MAX_STALENESS old (run as a worker next to the app)
+
+Readers never refresh: /job-applications/view only reads the view and shows when
+it was last refreshed, so the six-way join it replaces never runs in a request.
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import Table, Column, Integer, String, Date, MetaData, create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
+
+from config import DATABASE_URL, MATVIEW_MAX_STALENESS
+
+#kept out of models.Base.metadata so create_all() never tries to build it as a table
+matview_metadata = MetaData()
+
+job_application_mv = Table(
+    'job_application_mv', matview_metadata,
+    Column('caregiver_user_id', Integer, primary_key=True),
+    Column('job_id', Integer, primary_key=True),
+    Column('member_name', String(100)),
+    Column('member_surname', String(100)),
+    Column('caregiver_name', String(100)),
+    Column('caregiver_surname', String(100)),
+    Column('required_caregiving_type', String(50)),
+    Column('date_applied', Date),
+)
+
+
+def pending_changes(session, view_name):
+    """(ids, seconds since the oldest unrefreshed change) from the outbox"""
+    row = session.execute(text("""
+        SELECT array_agg(id) AS ids, extract(epoch FROM clock_timestamp() - min(changed_at)) AS age
+        FROM matview_outbox WHERE view_name = :view
+    """), {'view': view_name}).one()
+    return row.ids or [], row.age
+
+
+def refresh(session, view_name, force=False, max_staleness=MATVIEW_MAX_STALENESS):
+    """REFRESH CONCURRENTLY if the oldest pending change is older than max_staleness
+
+    Only outbox rows seen before the refresh are cleared, so changes committed
+    while it runs stay pending for the next one. An advisory lock keeps workers
+    from refreshing the same view at once; losers just serve the current data.
+    Returns True if a refresh ran.
+    """
+    ids, age = pending_changes(session, view_name)
+    if not force and (not ids or age < max_staleness):
+        return False
+    locked = session.execute(text("SELECT pg_try_advisory_xact_lock(hashtext(:view))"), {'view': view_name}).scalar()
+    if not locked:
+        return False
+    session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view_name}"))
+    if ids:
+        session.execute(text("DELETE FROM matview_outbox WHERE id = ANY(:ids)"), {'ids': ids})
+    session.execute(text("UPDATE matview_refresh SET refreshed_at = now() WHERE view_name = :view"), {'view': view_name})
+    session.commit()
+    return True
+
+
+def last_refreshed(session, view_name):
+    return session.execute(text("SELECT refreshed_at FROM matview_refresh WHERE view_name = :view"),
+                           {'view': view_name}).scalar()
+
+
+def watch(session, view_name, interval, max_staleness=MATVIEW_MAX_STALENESS):
+    """Check every interval seconds and refresh once the oldest pending change is max_staleness old"""
+    while True:
+        try:
+            if refresh(session, view_name, max_staleness=max_staleness):
+                print(f"Refreshed {view_name}", flush=True)
+        except SQLAlchemyError as e: #a failed check or refresh is retried on the next tick
+            print(f"error: {view_name} refresh failed: {str(e).splitlines()[0]}", file=sys.stderr, flush=True)
+        finally:
+            session.close() #no transaction left open between ticks
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh job_application_mv')
+    parser.add_argument('--force', action='store_true', help='refresh even if there are no pending changes')
+    parser.add_argument('--watch', type=float, metavar='SECONDS', help='keep running and check every SECONDS')
+    args = parser.parse_args()
+    session = sessionmaker(bind=create_engine(DATABASE_URL))()
+    try:
+        if args.watch:
+            watch(session, 'job_application_mv', args.watch)
+        else:
+            ran = refresh(session, 'job_application_mv', force=args.force, max_staleness=0)
+            print("Refreshed job_application_mv" if ran else "job_application_mv is up to date")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        session.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Apply versioned SQL migrations from migrations/ in filename order
+
+Usage: python migrate.py [--list]
+
+Each file runs in its own transaction unless its first line is
+"-- migrate: no-transaction" (needed for CREATE INDEX CONCURRENTLY); such files
+are split on ";" at line ends (outside $$-quoted DO bodies) and executed
+statement by statement in autocommit. A CREATE INDEX CONCURRENTLY that failed
+partway leaves an INVALID index that IF NOT EXISTS would skip on the rerun, so
+such a leftover is dropped before its CREATE runs again.
+"""
+import argparse
+import os
+import re
+import sys
+
+from sqlalchemy import create_engine, text
+
+from config import DATABASE_URL
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+NO_TRANSACTION = '-- migrate: no-transaction'
+CONCURRENT_INDEX = re.compile(r"\bCREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+
+def available_migrations():
+    return sorted(name for name in os.listdir(MIGRATIONS_DIR) if name.endswith('.sql'))
+
+
+def applied_migrations(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(255) PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        """))
+        return {row.version for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def split_statements(sql):
+    statements, current, quoted = [], [], False
+    for line in sql.splitlines():
+        if line.strip().startswith('--') and not current:
+            continue
+        current.append(line)
+        if line.count('$$') % 2: #a DO body's own statements end in ";" too
+            quoted = not quoted
+        if line.rstrip().endswith(';') and not quoted:
+            statements.append('\n'.join(current).strip())
+            current = []
+    if ''.join(current).strip():
+        statements.append('\n'.join(current).strip())
+    return statements
+
+
+def drop_invalid_index(conn, statement):
+    """Drop the INVALID index an interrupted run of this CREATE INDEX CONCURRENTLY left behind"""
+    match = CONCURRENT_INDEX.search(statement)
+    if match is None:
+        return False
+    index = match.group(1)
+    invalid = conn.exec_driver_sql(
+        f"SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass('{index}')").scalar()
+    if not invalid:
+        return False
+    print(f"  dropping invalid index {index} left by an interrupted build")
+    conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY {index}")
+    return True
+
+
+def apply_migration(engine, name):
+    with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+        sql = f.read()
+    if sql.startswith(NO_TRANSACTION):
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT', no_parameters=True) as conn:
+            for statement in split_statements(sql):
+                drop_invalid_index(conn, statement)
+                conn.exec_driver_sql(statement)
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {'v': name})
+    else:
+        with engine.begin() as conn:
+            conn.execution_options(no_parameters=True).exec_driver_sql(sql) #literal % (modulo, RAISE formats) reaches the server untouched
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {'v': name})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--list', action='store_true', help='show migration status without applying anything')
+    args = parser.parse_args()
+
+    engine = create_engine(DATABASE_URL)
+    done = applied_migrations(engine)
+    pending = [name for name in available_migrations() if name not in done]
+
+    if args.list:
+        for name in available_migrations():
+            print(f"{'applied' if name in done else 'pending'}  {name}")
+        return 0
+
+    if not pending:
+        print("Database is up to date")
+        return 0
+    for name in pending:
+        print(f"Applying {name} ...")
+        apply_migration(engine, name)
+    print(f"Applied {len(pending)} migration(s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+-- migrate: no-transaction
+-- Secondary indexes for the foreign keys and filter columns used by app.py and queries.py.
+-- Built CONCURRENTLY so they can be applied to a live database without blocking writes.
+-- A build that fails partway leaves an INVALID index; migrate.py drops it before the rerun
+-- (IF NOT EXISTS alone would keep it). Check with: SELECT indexrelid::regclass FROM pg_index WHERE NOT indisvalid;
+
+-- job.member_user_id: job_list/job form joins, member deletes cascading to job, report 5.4
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_job_member_user_id ON job (member_user_id);
+
+-- job_application's primary key leads with caregiver_user_id, so lookups by job (job deletes,
+-- applicant counts in report 6.1, the job_application_view join) need their own index
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_job_application_job_id ON job_application (job_id);
+
+-- appointment FKs have no index at all; caregiver deletes and per-caregiver schedules filter on them
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointment_caregiver_date ON appointment (caregiver_user_id, appointment_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointment_member_user_id ON appointment (member_user_id);
+
+-- keyset order of appointment_list: (appointment_date, appointment_id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointment_date_id ON appointment (appointment_date, appointment_id);
+
+-- status has three values, so a plain index on it is rarely chosen; every report in sections 5-7
+-- reads only accepted appointments, and the partial index covers their join key and hours
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointment_accepted ON appointment (caregiver_user_id) INCLUDE (work_hours, member_user_id) WHERE status = 'accepted';
+
+-- report 5.4's IN (SELECT member_user_id FROM job WHERE required_caregiving_type = ...) becomes index-only
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_job_required_type ON job (required_caregiving_type, member_user_id);
+
+-- report 5.3 joins caregiver filtered by caregiving_type
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_caregiver_caregiving_type ON caregiver (caregiving_type);
+
+-- address-based purges (section 4.2) look members up by street
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_address_street ON address (street);
+
+-- name lookups in section 3.1 / 4.1 (WHERE given_name = ... AND surname = ...)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_given_name_surname ON "user" (given_name, surname);
@@ -0,0 +1,14 @@
+-- Full-text and substring search over job.other_requirements and member.house_rules.
+-- The generated tsvector columns are maintained by Postgres on every write; the trigram
+-- indexes make ILIKE '%term%' (leading wildcard) indexable.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE job ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(other_requirements, ''))) STORED;
+CREATE INDEX IF NOT EXISTS idx_job_search_vector ON job USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_job_other_requirements_trgm ON job USING GIN (other_requirements gin_trgm_ops);
+
+ALTER TABLE member ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(house_rules, ''))) STORED;
+CREATE INDEX IF NOT EXISTS idx_member_search_vector ON member USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_member_house_rules_trgm ON member USING GIN (house_rules gin_trgm_ops);
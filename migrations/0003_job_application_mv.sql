@@ -0,0 +1,59 @@
+-- Materialized job_application_view with outbox-driven incremental refresh.
+-- Writers only append to matview_outbox (statement-level triggers, no shared row to contend on);
+-- matviews.py refreshes CONCURRENTLY once the oldest pending change exceeds the staleness bound.
+CREATE MATERIALIZED VIEW IF NOT EXISTS job_application_mv AS
+SELECT
+    ja.caregiver_user_id,
+    j.job_id,
+    u_m.given_name AS member_name,
+    u_m.surname AS member_surname,
+    u_c.given_name AS caregiver_name,
+    u_c.surname AS caregiver_surname,
+    j.required_caregiving_type,
+    ja.date_applied
+FROM job_application ja
+JOIN job j ON ja.job_id = j.job_id
+JOIN member m ON j.member_user_id = m.member_user_id
+JOIN "user" u_m ON m.member_user_id = u_m.user_id
+JOIN caregiver c ON ja.caregiver_user_id = c.caregiver_user_id
+JOIN "user" u_c ON c.caregiver_user_id = u_c.user_id
+WITH DATA;
+
+-- REFRESH ... CONCURRENTLY requires a unique index; it also serves the keyset order of /job-applications/view
+CREATE UNIQUE INDEX IF NOT EXISTS idx_job_application_mv_key ON job_application_mv (job_id, caregiver_user_id);
+
+CREATE TABLE IF NOT EXISTS matview_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    view_name VARCHAR(100) NOT NULL,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+CREATE INDEX IF NOT EXISTS idx_matview_outbox_view ON matview_outbox (view_name, id);
+
+CREATE TABLE IF NOT EXISTS matview_refresh (
+    view_name VARCHAR(100) PRIMARY KEY,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+INSERT INTO matview_refresh (view_name) VALUES ('job_application_mv') ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION job_application_mv_changed() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO matview_outbox (view_name) VALUES ('job_application_mv');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS job_application_mv_outbox ON job_application;
+CREATE TRIGGER job_application_mv_outbox
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON job_application
+    FOR EACH STATEMENT EXECUTE FUNCTION job_application_mv_changed();
+
+-- only the job and user columns the view projects; deletes cascade through job_application
+DROP TRIGGER IF EXISTS job_application_mv_outbox ON job;
+CREATE TRIGGER job_application_mv_outbox
+    AFTER UPDATE OF member_user_id, required_caregiving_type ON job
+    FOR EACH STATEMENT EXECUTE FUNCTION job_application_mv_changed();
+
+DROP TRIGGER IF EXISTS job_application_mv_outbox ON "user";
+CREATE TRIGGER job_application_mv_outbox
+    AFTER UPDATE OF given_name, surname ON "user"
+    FOR EACH STATEMENT EXECUTE FUNCTION job_application_mv_changed();
@@ -0,0 +1,171 @@
+-- Rollup tables for the analytics in queries.py sections 6 and 7, maintained by row triggers.
+-- Earnings follow the current hourly_rate (as the original reports do), so caregiver_stats keeps
+-- accepted hours and a copy of the rate; only the global total_cost has to be re-priced when a
+-- rate changes. caregiver_stats deliberately has no FK to caregiver: when a caregiver delete
+-- cascades to appointments, their triggers still need the rate to back out the cost.
+-- platform_stats is split into 16 slots (keyed by caregiver id) so concurrent writers do not all
+-- serialize on one hot row; readers sum the 16 rows.
+
+CREATE TABLE IF NOT EXISTS caregiver_stats (
+    caregiver_user_id INTEGER PRIMARY KEY,
+    hourly_rate NUMERIC(10, 2),
+    accepted_count BIGINT NOT NULL DEFAULT 0,
+    accepted_hours NUMERIC(14, 2) NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_caregiver_stats_earnings ON caregiver_stats ((hourly_rate * accepted_hours) DESC);
+
+CREATE TABLE IF NOT EXISTS job_stats (
+    job_id INTEGER PRIMARY KEY REFERENCES job(job_id) ON DELETE CASCADE,
+    applicant_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_job_stats_applicant_count ON job_stats (applicant_count DESC, job_id);
+
+CREATE TABLE IF NOT EXISTS platform_stats (
+    slot SMALLINT PRIMARY KEY,
+    accepted_count BIGINT NOT NULL DEFAULT 0,
+    accepted_hours NUMERIC(16, 2) NOT NULL DEFAULT 0,
+    total_cost NUMERIC(18, 2) NOT NULL DEFAULT 0,
+    job_count BIGINT NOT NULL DEFAULT 0,
+    application_count BIGINT NOT NULL DEFAULT 0
+);
+
+-- appointment: accepted count/hours per caregiver and globally
+CREATE OR REPLACE FUNCTION rollup_appointment() RETURNS trigger AS $$
+DECLARE
+    rate NUMERIC;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'accepted' THEN
+        UPDATE caregiver_stats
+           SET accepted_count = accepted_count - 1, accepted_hours = accepted_hours - OLD.work_hours
+         WHERE caregiver_user_id = OLD.caregiver_user_id
+        RETURNING hourly_rate INTO rate;
+        UPDATE platform_stats
+           SET accepted_count = accepted_count - 1,
+               accepted_hours = accepted_hours - OLD.work_hours,
+               total_cost = total_cost - coalesce(rate, 0) * OLD.work_hours
+         WHERE slot = OLD.caregiver_user_id % 16;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'accepted' THEN
+        INSERT INTO caregiver_stats (caregiver_user_id, hourly_rate, accepted_count, accepted_hours)
+        SELECT NEW.caregiver_user_id, c.hourly_rate, 1, NEW.work_hours
+          FROM caregiver c WHERE c.caregiver_user_id = NEW.caregiver_user_id
+        ON CONFLICT (caregiver_user_id) DO UPDATE
+           SET accepted_count = caregiver_stats.accepted_count + 1,
+               accepted_hours = caregiver_stats.accepted_hours + EXCLUDED.accepted_hours
+        RETURNING hourly_rate INTO rate;
+        UPDATE platform_stats
+           SET accepted_count = accepted_count + 1,
+               accepted_hours = accepted_hours + NEW.work_hours,
+               total_cost = total_cost + coalesce(rate, 0) * NEW.work_hours
+         WHERE slot = NEW.caregiver_user_id % 16;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rollup_appointment ON appointment;
+CREATE TRIGGER rollup_appointment
+    AFTER INSERT OR DELETE OR UPDATE OF status, work_hours, caregiver_user_id ON appointment
+    FOR EACH ROW EXECUTE FUNCTION rollup_appointment();
+
+-- caregiver: keep the rate copy current; a rate change re-prices every accepted hour already booked
+CREATE OR REPLACE FUNCTION rollup_caregiver_rate() RETURNS trigger AS $$
+DECLARE
+    hours NUMERIC;
+BEGIN
+    INSERT INTO caregiver_stats (caregiver_user_id, hourly_rate) VALUES (NEW.caregiver_user_id, NEW.hourly_rate)
+    ON CONFLICT (caregiver_user_id) DO UPDATE SET hourly_rate = EXCLUDED.hourly_rate
+    RETURNING accepted_hours INTO hours;
+    IF TG_OP = 'UPDATE' AND hours <> 0 THEN
+        UPDATE platform_stats
+           SET total_cost = total_cost + (coalesce(NEW.hourly_rate, 0) - coalesce(OLD.hourly_rate, 0)) * hours
+         WHERE slot = NEW.caregiver_user_id % 16;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rollup_caregiver_rate ON caregiver;
+CREATE TRIGGER rollup_caregiver_rate
+    AFTER INSERT OR UPDATE OF hourly_rate ON caregiver
+    FOR EACH ROW EXECUTE FUNCTION rollup_caregiver_rate();
+
+-- job / job_application: applicant counts per job and global counts
+CREATE OR REPLACE FUNCTION rollup_job() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO job_stats (job_id) VALUES (NEW.job_id) ON CONFLICT DO NOTHING;
+        UPDATE platform_stats SET job_count = job_count + 1 WHERE slot = NEW.job_id % 16;
+    ELSE
+        UPDATE platform_stats SET job_count = job_count - 1 WHERE slot = OLD.job_id % 16;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rollup_job ON job;
+CREATE TRIGGER rollup_job
+    AFTER INSERT OR DELETE ON job
+    FOR EACH ROW EXECUTE FUNCTION rollup_job();
+
+CREATE OR REPLACE FUNCTION rollup_job_application() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        -- the job_stats row is already gone when the delete cascades from job
+        UPDATE job_stats SET applicant_count = applicant_count - 1 WHERE job_id = OLD.job_id;
+        UPDATE platform_stats SET application_count = application_count - 1 WHERE slot = OLD.job_id % 16;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO job_stats (job_id, applicant_count) VALUES (NEW.job_id, 1)
+        ON CONFLICT (job_id) DO UPDATE SET applicant_count = job_stats.applicant_count + 1;
+        UPDATE platform_stats SET application_count = application_count + 1 WHERE slot = NEW.job_id % 16;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rollup_job_application ON job_application;
+CREATE TRIGGER rollup_job_application
+    AFTER INSERT OR DELETE OR UPDATE OF job_id ON job_application
+    FOR EACH ROW EXECUTE FUNCTION rollup_job_application();
+
+-- full recompute, used for the initial backfill and by `python analytics.py --rebuild`
+CREATE OR REPLACE FUNCTION rebuild_analytics_rollups() RETURNS void AS $$
+BEGIN
+    LOCK TABLE appointment, job, job_application, caregiver IN SHARE MODE;
+    TRUNCATE caregiver_stats, job_stats, platform_stats;
+
+    INSERT INTO platform_stats (slot) SELECT generate_series(0, 15);
+
+    INSERT INTO caregiver_stats (caregiver_user_id, hourly_rate, accepted_count, accepted_hours)
+    SELECT c.caregiver_user_id, c.hourly_rate, coalesce(a.n, 0), coalesce(a.hours, 0)
+      FROM caregiver c
+      LEFT JOIN (SELECT caregiver_user_id, count(*) AS n, sum(work_hours) AS hours
+                   FROM appointment WHERE status = 'accepted'
+                  GROUP BY caregiver_user_id) a ON a.caregiver_user_id = c.caregiver_user_id;
+
+    INSERT INTO job_stats (job_id, applicant_count)
+    SELECT j.job_id, count(ja.caregiver_user_id)
+      FROM job j LEFT JOIN job_application ja ON ja.job_id = j.job_id
+     GROUP BY j.job_id;
+
+    UPDATE platform_stats p
+       SET accepted_count = s.accepted_count, accepted_hours = s.accepted_hours, total_cost = s.total_cost
+      FROM (SELECT a.caregiver_user_id % 16 AS slot, count(*) AS accepted_count,
+                   sum(a.work_hours) AS accepted_hours, sum(coalesce(c.hourly_rate, 0) * a.work_hours) AS total_cost
+              FROM appointment a JOIN caregiver c ON c.caregiver_user_id = a.caregiver_user_id
+             WHERE a.status = 'accepted'
+             GROUP BY 1) s
+     WHERE p.slot = s.slot;
+
+    UPDATE platform_stats p SET job_count = s.n
+      FROM (SELECT job_id % 16 AS slot, count(*) AS n FROM job GROUP BY 1) s
+     WHERE p.slot = s.slot;
+
+    UPDATE platform_stats p SET application_count = s.n
+      FROM (SELECT job_id % 16 AS slot, count(*) AS n FROM job_application GROUP BY 1) s
+     WHERE p.slot = s.slot;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_analytics_rollups();
@@ -0,0 +1,36 @@
+-- No caregiver may hold two accepted appointments whose time ranges overlap.
+-- appointment_date/appointment_time are naive DATE/TIME columns, so the range is a tsrange
+-- (not tstzrange); appointment_slot() mirrors booking.appointment_slot() in Python.
+-- The GiST exclusion constraint is the race-free backstop; app.py and the batch API check first
+-- (booking.py) so users get a readable message instead of a constraint violation.
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+CREATE OR REPLACE FUNCTION appointment_slot(d DATE, t TIME, hours NUMERIC) RETURNS tsrange
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT tsrange(d + t, d + t + hours * interval '1 hour', '[)')
+$$;
+
+-- refuse to continue while existing data breaks the rule; /caregivers/<id>/conflicts lists the pairs
+DO $$
+DECLARE
+    clashes INTEGER;
+BEGIN
+    SELECT count(*) INTO clashes
+    FROM appointment a
+    JOIN appointment b ON b.caregiver_user_id = a.caregiver_user_id AND b.appointment_id > a.appointment_id
+    WHERE a.status = 'accepted' AND b.status = 'accepted'
+      AND a.appointment_date IS NOT NULL AND a.appointment_time IS NOT NULL AND a.work_hours > 0
+      AND b.appointment_date IS NOT NULL AND b.appointment_time IS NOT NULL AND b.work_hours > 0
+      AND appointment_slot(a.appointment_date, a.appointment_time, a.work_hours)
+          && appointment_slot(b.appointment_date, b.appointment_time, b.work_hours);
+    IF clashes > 0 THEN
+        RAISE EXCEPTION '% pairs of overlapping accepted appointments must be resolved first', clashes;
+    END IF;
+END
+$$;
+
+ALTER TABLE appointment ADD CONSTRAINT appointment_no_overlap EXCLUDE USING gist (
+    caregiver_user_id WITH =,
+    appointment_slot(appointment_date, appointment_time, work_hours) WITH &&
+) WHERE (status = 'accepted' AND appointment_date IS NOT NULL AND appointment_time IS NOT NULL AND work_hours > 0);
@@ -0,0 +1,9 @@
+-- Weekly availability per caregiver: 7 days x 96 fifteen-minute slots packed into 84 bytes.
+-- Bit day * 96 + slot (day 0 = Monday) is set when the caregiver is free; availability.py reads
+-- and writes the mask, and subtracts appointments at query time.
+
+CREATE TABLE IF NOT EXISTS caregiver_availability (
+    caregiver_user_id INTEGER PRIMARY KEY REFERENCES caregiver(caregiver_user_id) ON DELETE CASCADE,
+    weekly BYTEA NOT NULL CHECK (octet_length(weekly) = 84),
+    updated_at TIMESTAMP
+);
@@ -0,0 +1,31 @@
+-- One version counter per base table, bumped by a statement-level trigger on every write
+-- (ORM flushes, bulk UPDATE/DELETE, COPY from bulk_load.py, cascades, manual psql).
+-- versions.py reads them to build ETag/Last-Modified for list pages without touching the rows.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_versions AS v (table_name, version, changed_at) VALUES (TG_TABLE_NAME, 1, now())
+    ON CONFLICT (table_name) DO UPDATE SET version = v.version + 1, changed_at = now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['user', 'caregiver', 'member', 'address', 'job', 'job_application', 'appointment',
+                             'caregiver_availability'] LOOP
+        INSERT INTO table_versions (table_name) VALUES (t) ON CONFLICT DO NOTHING;
+        EXECUTE format('DROP TRIGGER IF EXISTS bump_table_version ON %I', t);
+        EXECUTE format('CREATE TRIGGER bump_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()', t);
+    END LOOP;
+END
+$$;
@@ -0,0 +1,15 @@
+-- Progress of the chunked jobs in maintenance.py (rate adjustments, address purges).
+-- A row is updated in the same transaction as each chunk it records, so a run that is
+-- interrupted resumes after its last committed chunk and never applies one twice.
+
+CREATE TABLE IF NOT EXISTS maintenance_checkpoints (
+    name TEXT PRIMARY KEY,
+    operation TEXT NOT NULL,
+    params TEXT NOT NULL,
+    last_key BIGINT,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    counts TEXT NOT NULL DEFAULT '{}',
+    started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    finished_at TIMESTAMPTZ
+);
@@ -0,0 +1,35 @@
+-- migrate: no-transaction
+-- appointment's foreign keys were created without ON DELETE CASCADE (database_schema.sql), so
+-- deleting a caregiver or member relied on the ORM loading and deleting every appointment first.
+-- With the cascade in the database the delete routes issue one DELETE and let Postgres remove
+-- the children (models.py sets passive_deletes=True to match).
+-- Each new constraint is added NOT VALID next to the old one, which then goes, so appointment is
+-- never without the check; VALIDATE scans the table under a lock that still allows writes.
+-- The swap runs as one DO block (a single transaction) and only while the _fkey constraint does
+-- not cascade yet, so re-running the file after a failure picks up where it stopped.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = 'appointment'::regclass
+                   AND conname = 'appointment_caregiver_user_id_fkey' AND confdeltype = 'c') THEN
+        ALTER TABLE appointment DROP CONSTRAINT IF EXISTS appointment_caregiver_user_id_cascade;
+        ALTER TABLE appointment ADD CONSTRAINT appointment_caregiver_user_id_cascade
+            FOREIGN KEY (caregiver_user_id) REFERENCES caregiver(caregiver_user_id) ON DELETE CASCADE NOT VALID;
+        ALTER TABLE appointment DROP CONSTRAINT IF EXISTS appointment_caregiver_user_id_fkey;
+        ALTER TABLE appointment RENAME CONSTRAINT appointment_caregiver_user_id_cascade TO appointment_caregiver_user_id_fkey;
+    END IF;
+END $$;
+ALTER TABLE appointment VALIDATE CONSTRAINT appointment_caregiver_user_id_fkey;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = 'appointment'::regclass
+                   AND conname = 'appointment_member_user_id_fkey' AND confdeltype = 'c') THEN
+        ALTER TABLE appointment DROP CONSTRAINT IF EXISTS appointment_member_user_id_cascade;
+        ALTER TABLE appointment ADD CONSTRAINT appointment_member_user_id_cascade
+            FOREIGN KEY (member_user_id) REFERENCES member(member_user_id) ON DELETE CASCADE NOT VALID;
+        ALTER TABLE appointment DROP CONSTRAINT IF EXISTS appointment_member_user_id_fkey;
+        ALTER TABLE appointment RENAME CONSTRAINT appointment_member_user_id_cascade TO appointment_member_user_id_fkey;
+    END IF;
+END $$;
+ALTER TABLE appointment VALIDATE CONSTRAINT appointment_member_user_id_fkey;
@@ -0,0 +1,17 @@
+-- 0007 kept one table_versions row per table, so every concurrent writer to a table queued on
+-- that row's lock until it committed. Versions are now spread over 16 slots per table, picked by
+-- the writing backend's pid (like platform_stats in 0004); a table's version is sum(version)
+-- over its slots, which still grows with every write, and changed_at is the newest slot's.
+
+ALTER TABLE table_versions ADD COLUMN IF NOT EXISTS slot SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE table_versions DROP CONSTRAINT IF EXISTS table_versions_pkey;
+ALTER TABLE table_versions ADD PRIMARY KEY (table_name, slot);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_versions AS v (table_name, slot, version, changed_at)
+    VALUES (TG_TABLE_NAME, pg_backend_pid() % 16, 1, now())
+    ON CONFLICT (table_name, slot) DO UPDATE SET version = v.version + 1, changed_at = now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
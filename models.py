@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Time, Numeric, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, Time, Numeric, ForeignKey, Text, LargeBinary, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -13,8 +13,8 @@ class User(Base):
     phone_number=Column(String(20))
     profile_description=Column(Text)
     password=Column(String(255), nullable=False)
-    caregiver=relationship("Caregiver", back_populates="user", uselist=False, cascade="all, delete-orphan")
-    member=relationship("Member", back_populates="user", uselist=False, cascade="all, delete-orphan")
+    caregiver=relationship("Caregiver", back_populates="user", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    member=relationship("Member", back_populates="user", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Caregiver(Base):
@@ -25,8 +25,9 @@ class Caregiver(Base):
     caregiving_type=Column(String(100))
     hourly_rate=Column(Numeric(10, 2))
     user=relationship("User", back_populates="caregiver")
-    job_applications=relationship("JobApplication", back_populates="caregiver", cascade="all, delete-orphan")
-    appointments=relationship("Appointment", back_populates="caregiver", cascade="all, delete-orphan")
+    job_applications=relationship("JobApplication", back_populates="caregiver", cascade="all, delete-orphan", passive_deletes=True)
+    appointments=relationship("Appointment", back_populates="caregiver", cascade="all, delete-orphan", passive_deletes=True)
+    availability=relationship("CaregiverAvailability", back_populates="caregiver", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Member(Base):
@@ -35,9 +36,9 @@ class Member(Base):
     house_rules=Column(Text)
     dependent_description=Column(Text)
     user=relationship("User", back_populates="member")
-    addresses=relationship("Address", back_populates="member", cascade="all, delete-orphan")
-    jobs=relationship("Job", back_populates="member", cascade="all, delete-orphan")
-    appointments=relationship("Appointment", back_populates="member", cascade="all, delete-orphan")
+    addresses=relationship("Address", back_populates="member", cascade="all, delete-orphan", passive_deletes=True)
+    jobs=relationship("Job", back_populates="member", cascade="all, delete-orphan", passive_deletes=True)
+    appointments=relationship("Appointment", back_populates="member", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Address(Base):
@@ -57,7 +58,7 @@ class Job(Base):
     other_requirements=Column(Text)
     date_posted=Column(Date)
     member =relationship("Member", back_populates="jobs")
-    job_applications= relationship("JobApplication", back_populates="job", cascade="all, delete-orphan")
+    job_applications= relationship("JobApplication", back_populates="job", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class JobApplication(Base):
@@ -82,3 +83,9 @@ class Appointment(Base):
     member=relationship("Member", back_populates="appointments")
 
 
+class CaregiverAvailability(Base):
+    __tablename__='caregiver_availability'
+    caregiver_user_id=Column(Integer, ForeignKey('caregiver.caregiver_user_id', ondelete='CASCADE'), primary_key=True)
+    weekly=Column(LargeBinary(84), nullable=False) #7 days x 96 fifteen-minute slots, one bit each (see availability.py)
+    updated_at=Column(DateTime)
+    caregiver=relationship("Caregiver", back_populates="availability")
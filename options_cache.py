@@ -0,0 +1,112 @@
+import threading
+import time
+
+from changes import on_commit
+from config import OPTIONS_CACHE_TTL
+from models import User, Caregiver, Member, Job
+
+
+def _users(session):
+    return session.query(User.user_id, User.given_name, User.surname, User.email)\
+        .order_by(User.user_id)
+
+
+def _user_label(r):
+    return r.user_id, f"{r.user_id} - {r.given_name} {r.surname} ({r.email})"
+
+
+def _caregivers(session):
+    return session.query(Caregiver.caregiver_user_id, User.given_name, User.surname)\
+        .join(User).order_by(Caregiver.caregiver_user_id)
+
+
+def _caregiver_label(r):
+    return r.caregiver_user_id, f"{r.caregiver_user_id} - {r.given_name} {r.surname}"
+
+
+def _members(session):
+    return session.query(Member.member_user_id, User.given_name, User.surname)\
+        .join(User).order_by(Member.member_user_id)
+
+
+def _member_label(r):
+    return r.member_user_id, f"{r.member_user_id} - {r.given_name} {r.surname}"
+
+
+def _jobs(session):
+    return session.query(Job.job_id, Job.required_caregiving_type, User.given_name, User.surname)\
+        .join(Member, Job.member_user_id == Member.member_user_id)\
+        .join(User, Member.member_user_id == User.user_id)\
+        .order_by(Job.job_id)
+
+
+def _job_label(r):
+    return r.job_id, f"Job #{r.job_id} - {r.required_caregiving_type or 'N/A'} (Member: {r.given_name} {r.surname})"
+
+
+#option list name -> (query builder, row -> (id, display_name), tables whose changes make it stale)
+OPTION_LISTS = {
+    'users': (_users, _user_label, {'user'}),
+    'caregivers': (_caregivers, _caregiver_label, {'caregiver', 'user'}),
+    'members': (_members, _member_label, {'member', 'user'}),
+    'jobs': (_jobs, _job_label, {'job', 'member', 'user'}),
+}
+
+
+class OptionsCache:
+    """Process-local cache of (id, display_name) tuples for form <select> boxes
+
+    Entries are dropped as soon as a local commit touches one of their tables;
+    the TTL bounds staleness for writes made by other worker processes.
+    """
+
+    def __init__(self, ttl=OPTIONS_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, name, session):
+        build_query, label, _tables = OPTION_LISTS[name]
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        options = tuple(label(row) for row in build_query(session))
+        with self._lock:
+            if generation == self._generation: #skip storing if a commit invalidated us mid-load
+                self._entries[name] = (now + self.ttl, options)
+        return options
+
+    def invalidate(self, tables=None, keys=None):
+        with self._lock:
+            self._generation += 1
+            for name, (_query, _label, depends) in OPTION_LISTS.items():
+                if name in self._entries and (tables is None or depends & tables):
+                    del self._entries[name]
+                    self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'cached': sorted(self._entries),
+                'ttl_seconds': self.ttl,
+            }
+
+
+options_cache = OptionsCache()
+on_commit(options_cache.invalidate)
+
+
+def dropdown_options(name, session):
+    return options_cache.get(name, session)
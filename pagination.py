@@ -0,0 +1,166 @@
+import base64
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask import request, url_for
+from sqlalchemy import tuple_
+
+from config import PAGE_SIZE, MAX_PAGE_SIZE
+
+
+class Page:
+    """One keyset page of results plus the cursors needed to move around it"""
+
+    def __init__(self, items, size, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.size = size
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def url(self, **cursor):
+        args = {k: v for k, v in request.args.items() if k not in ('after', 'before')}
+        args.update(request.view_args or {})
+        args['size'] = self.size
+        args.update(cursor)
+        return url_for(request.endpoint, **args)
+
+    @property
+    def next_url(self):
+        return self.url(after=self.next_cursor) if self.has_next else None
+
+    @property
+    def prev_url(self):
+        return self.url(before=self.prev_cursor) if self.has_prev else None
+
+    @property
+    def first_url(self):
+        return self.url()
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _to_json(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _from_json(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type in (date, datetime, time):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values):
+    raw = json.dumps([_to_json(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [_from_json(col, v) for col, v in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid page cursor: {cursor!r}")
+
+
+def page_size(value):
+    try:
+        size = int(value if value is not None else PAGE_SIZE)
+    except ValueError:
+        size = PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def page_size_arg():
+    return page_size(request.args.get('size'))
+
+
+def _key_of(item, columns):
+    return [getattr(item, col.key) for col in columns]
+
+
+def _keyset(columns):
+    return columns[0] if len(columns) == 1 else tuple_(*columns)
+
+
+def _bound(values):
+    return values[0] if len(values) == 1 else tuple_(*values)
+
+
+def keyset_query(query, columns, size, after_key=None, before_key=None):
+    """The SQL for one page: a range predicate on the key plus ORDER BY ... LIMIT size + 1"""
+    key = _keyset(columns)
+    if before_key is not None:
+        return query.filter(key < _bound(before_key))\
+            .order_by(*[col.desc() for col in columns])\
+            .limit(size + 1)
+    if after_key is not None:
+        query = query.filter(key > _bound(after_key))
+    return query.order_by(*columns).limit(size + 1)
+
+
+def paginate(query, columns, after=None, before=None, size=None):
+    """Keyset-paginate query on the given unique, ordered columns
+
+    Every page is a single indexed range scan plus LIMIT, so the cost does not
+    depend on how deep the user has paged. Pass either after (next page) or
+    before (previous page); both default to the request query string.
+    """
+    if size is None:
+        size = page_size_arg()
+    if after is None and before is None:
+        after = request.args.get('after') or None
+        before = None if after else (request.args.get('before') or None)
+
+    after, before, after_key, before_key = decode_cursors(after, before, columns)
+    rows = keyset_query(query, columns, size, after_key=after_key, before_key=before_key).all()
+    return build_page(rows, columns, size, after, before)
+
+
+def decode_cursors(after, before, columns):
+    """(after, before, after_key, before_key); an unreadable cursor restarts at page one"""
+    try:
+        after_key = decode_cursor(after, columns) if after else None
+        before_key = decode_cursor(before, columns) if before else None
+    except ValueError:
+        return None, None, None, None  # stale or tampered cursor
+    return after, before, after_key, before_key
+
+
+def build_page(rows, columns, size, after=None, before=None):
+    """Turn the size + 1 rows fetched by keyset_query into a Page with its cursors"""
+    has_more = len(rows) > size
+    if before:
+        items = list(reversed(rows[:size]))
+        prev_cursor = encode_cursor(_key_of(items[0], columns)) if has_more and items else None
+        next_cursor = encode_cursor(_key_of(items[-1], columns)) if items else before
+        return Page(items, size, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+    items = rows[:size]
+    next_cursor = encode_cursor(_key_of(items[-1], columns)) if has_more else None
+    prev_cursor = None
+    if after:
+        prev_cursor = encode_cursor(_key_of(items[0], columns)) if items else after
+    return Page(items, size, next_cursor=next_cursor, prev_cursor=prev_cursor)
@@ -0,0 +1,179 @@
+"""Run the read-only reports in queries.py in parallel, with timings and plans
+
+Usage:
+    python report_runner.py [--reports 5.1 6.4 ...] [--workers 4] [--repeat 3] [--explain]
+                            [--format table|json|csv] [--output FILE]
+    python report_runner.py --scale 10000 100000 1000000 --explain --format csv --output growth.csv
+
+Each report runs on its own pooled connection (a read replica when REPLICA_URLS
+is set), so the reports finish in about the time of the slowest one. Wall time
+covers executing the report and fetching every row. --explain adds EXPLAIN
+(ANALYZE, BUFFERS) per report: planning and execution time, total cost, shared
+buffers hit/read and sequentially scanned tables. Pass --workers 1 to time
+each report without competing for the database.
+
+--scale reloads the database at each size with generate_data.py (TRUNCATE, then
+COPY), runs every report there and shows how each one grows; never point it at
+real data. The mutating statements in queries.py (sections 3 and 4) never run
+here, and --reports view creates job_application_view on the primary first.
+"""
+import argparse
+import csv
+import io
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+import db
+import generate_data
+from explain_queries import compile_sql, seq_scans
+from queries import REPORTS, CREATE_VIEW
+
+CSV_FIELDS = ['scale', 'report', 'rows', 'wall_ms', 'min_wall_ms', 'planning_ms', 'execution_ms',
+              'total_cost', 'shared_hit_blocks', 'shared_read_blocks', 'seq_scans', 'error']
+
+
+def statement_for(key):
+    sql = REPORTS[key]
+    return text(sql) if isinstance(sql, str) else sql
+
+
+def explain(connection, key):
+    """Plan summary from EXPLAIN (ANALYZE, BUFFERS); the report is read-only, so ANALYZE is safe"""
+    sql = REPORTS[key] if isinstance(REPORTS[key], str) else compile_sql(REPORTS[key])
+    plan = connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    top = plan[0]['Plan']
+    return {
+        'planning_ms': plan[0].get('Planning Time'),
+        'execution_ms': plan[0].get('Execution Time'),
+        'total_cost': top['Total Cost'],
+        'shared_hit_blocks': top.get('Shared Hit Blocks'),
+        'shared_read_blocks': top.get('Shared Read Blocks'),
+        'seq_scans': sorted(set(seq_scans(top))),
+    }
+
+
+def run_report(key, repeat, with_plan):
+    """Time one report on its own connection; returns a result dict, never raises"""
+    result = {'report': key}
+    engine = db.choose_replica() or db.get_engine()
+    statement = statement_for(key)
+    try:
+        with engine.connect() as connection:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = connection.execute(statement).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            result.update(rows=len(rows), wall_ms=round(statistics.median(timings), 3),
+                          min_wall_ms=round(min(timings), 3))
+            if with_plan:
+                if engine.dialect.name == 'postgresql':
+                    result.update(explain(connection, key))
+                else:
+                    result['error'] = f'EXPLAIN (ANALYZE, BUFFERS) needs PostgreSQL, not {engine.dialect.name}'
+    except Exception as e:
+        result['error'] = str(e).splitlines()[0]
+    return result
+
+
+def ensure_view():
+    #CREATE OR REPLACE is idempotent, but it is DDL, so it always goes to the primary
+    try:
+        with db.get_engine().begin() as connection:
+            connection.execute(text(CREATE_VIEW))
+    except Exception as e: #the view report will then show the error itself
+        print(f"warning: job_application_view not created: {str(e).splitlines()[0]}", file=sys.stderr)
+
+
+def run_all(keys, workers, repeat, with_plan):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_report, key, repeat, with_plan) for key in keys]
+        return [future.result() for future in futures]
+
+
+def print_table(runs, out):
+    for scale, results in runs:
+        print(f"scale: {scale}", file=out)
+        print(f"{'report':<8}{'rows':>10}{'wall ms':>12}{'exec ms':>12}{'cost':>14}{'hit':>10}{'read':>10}  seq scans",
+              file=out)
+        for r in results:
+            if 'error' in r and 'wall_ms' not in r:
+                print(f"{r['report']:<8} ERROR {r['error']}", file=out)
+                continue
+            cells = [r.get('execution_ms'), r.get('total_cost'), r.get('shared_hit_blocks'), r.get('shared_read_blocks')]
+            exec_ms, cost, hit, read = ('-' if v is None else v for v in cells)
+            print(f"{r['report']:<8}{r['rows']:>10}{r['wall_ms']:>12}{exec_ms:>12}{cost:>14}{hit:>10}{read:>10}  "
+                  f"{', '.join(r.get('seq_scans', [])) or '-'}", file=out)
+        print(file=out)
+
+    if len(runs) > 1: #growth of each report relative to the smallest dataset
+        first_scale, first = runs[0]
+        print(f"wall time growth vs {first_scale} rows", file=out)
+        print(f"{'report':<8}" + ''.join(f"{scale:>14}" for scale, _results in runs), file=out)
+        for index, r in enumerate(first):
+            cells = []
+            for _scale, results in runs:
+                base, now = r.get('wall_ms'), results[index].get('wall_ms')
+                cells.append(f"{now / base:>13.1f}x" if base and now is not None else f"{'-':>14}")
+            print(f"{r['report']:<8}" + ''.join(cells), file=out)
+
+
+def write_csv(runs, out):
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for scale, results in runs:
+        for r in results:
+            writer.writerow({**r, 'scale': scale, 'seq_scans': ' '.join(r.get('seq_scans', []))})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', nargs='+', choices=list(REPORTS), default=list(REPORTS))
+    parser.add_argument('--workers', type=int, default=4, help='reports run at once, each on its own connection')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per report; wall_ms is the median')
+    parser.add_argument('--explain', action='store_true', help='add EXPLAIN (ANALYZE, BUFFERS) per report')
+    parser.add_argument('--scale', type=int, nargs='+', help='reload the database at each size (rows) and rerun')
+    parser.add_argument('--seed', type=int, default=0, help='generate_data.py seed for --scale')
+    parser.add_argument('--format', choices=('table', 'json', 'csv'), default='table')
+    parser.add_argument('--output', help='write to this file instead of stdout')
+    args = parser.parse_args()
+
+    runs = []
+    for scale in args.scale or [None]:
+        if scale:
+            print(f"loading about {scale} rows", file=sys.stderr)
+            generate_data.reseed(db.get_engine(), scale, args.seed)
+        if 'view' in args.reports:
+            ensure_view()
+        counts = generate_data.table_counts(db.get_engine())
+        started = time.perf_counter()
+        results = run_all(args.reports, args.workers, args.repeat, args.explain)
+        print(f"{len(results)} reports over {sum(counts.values())} rows in "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms", file=sys.stderr)
+        runs.append((scale or sum(counts.values()), results))
+
+    out = io.StringIO()
+    if args.format == 'json':
+        json.dump({'runs': [{'scale': scale, 'results': results} for scale, results in runs]}, out, indent=2)
+        out.write('\n')
+    elif args.format == 'csv':
+        write_csv(runs, out)
+    else:
+        print_table(runs, out)
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            f.write(out.getvalue())
+    else:
+        sys.stdout.write(out.getvalue())
+    return 1 if any('error' in r for _scale, results in runs for r in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
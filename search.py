@@ -0,0 +1,70 @@
+from sqlalchemy import text
+
+from config import SEARCH_LIMIT
+
+#Search modes:
+#  fulltext  - stemmed word match on the generated tsvector column (GIN) or a substring hit
+#  substring - exact ILIKE '%term%' semantics, served by the pg_trgm GIN index
+#Both rank by ts_rank plus trigram word similarity so the best matches come first.
+SEARCH_MODES = ('fulltext', 'substring')
+
+_JOB_MATCH = {
+    'fulltext': "(j.search_vector @@ websearch_to_tsquery('english', :term) OR j.other_requirements ILIKE :pattern)",
+    'substring': "j.other_requirements ILIKE :pattern",
+}
+_JOB_RANK = ("ts_rank(j.search_vector, websearch_to_tsquery('english', :term))"
+             " + word_similarity(:term, coalesce(j.other_requirements, ''))")
+
+_MEMBER_MATCH = {
+    'fulltext': "(m.search_vector @@ websearch_to_tsquery('english', :term) OR m.house_rules ILIKE :pattern)",
+    'substring': "m.house_rules ILIKE :pattern",
+}
+_MEMBER_RANK = ("ts_rank(m.search_vector, websearch_to_tsquery('english', :term))"
+                " + word_similarity(:term, coalesce(m.house_rules, ''))")
+
+
+def like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def job_search(term, mode='fulltext', caregiving_type=None, limit=SEARCH_LIMIT):
+    """Jobs whose other_requirements match term, best match first"""
+    filters = [_JOB_MATCH[mode]]
+    params = {'term': term, 'pattern': like_pattern(term), 'limit': limit}
+    if caregiving_type:
+        filters.append("j.required_caregiving_type = :caregiving_type")
+        params['caregiving_type'] = caregiving_type
+    sql = f"""
+        SELECT j.job_id, j.member_user_id, j.required_caregiving_type, j.other_requirements,
+               j.date_posted, u.given_name, u.surname, {_JOB_RANK} AS rank
+        FROM job j
+        JOIN "user" u ON u.user_id = j.member_user_id
+        WHERE {' AND '.join(filters)}
+        ORDER BY rank DESC, j.job_id
+        LIMIT :limit
+    """
+    return text(sql).bindparams(**params)
+
+
+def member_search(term, mode='fulltext', city=None, caregiving_type=None, limit=SEARCH_LIMIT):
+    """Members whose house_rules match term, optionally in a city and needing a caregiving type"""
+    filters = [_MEMBER_MATCH[mode]]
+    params = {'term': term, 'pattern': like_pattern(term), 'limit': limit}
+    if city:
+        filters.append("u.city = :city")
+        params['city'] = city
+    if caregiving_type:
+        filters.append("""m.member_user_id IN (
+            SELECT member_user_id FROM job WHERE required_caregiving_type = :caregiving_type
+        )""")
+        params['caregiving_type'] = caregiving_type
+    sql = f"""
+        SELECT m.member_user_id, u.given_name, u.surname, u.city, m.house_rules, {_MEMBER_RANK} AS rank
+        FROM member m
+        JOIN "user" u ON u.user_id = m.member_user_id
+        WHERE {' AND '.join(filters)}
+        ORDER BY rank DESC, m.member_user_id
+        LIMIT :limit
+    """
+    return text(sql).bindparams(**params)
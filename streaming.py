@@ -0,0 +1,31 @@
+from flask import Response, request, stream_template
+
+from config import STREAM_BATCH_SIZE
+
+
+def wants_stream():
+    return request.args.get('all') in ('1', 'true', 'yes')
+
+
+def iter_rows(session, query, columns, batch_size=STREAM_BATCH_SIZE):
+    """Yield rows from a server-side cursor, batch_size ORM objects at a time
+
+    The route's own session.close() runs before the first row is read; a closed
+    Session simply begins a new transaction when iteration starts, and it is
+    closed again here once the generator is exhausted or abandoned.
+    """
+    try:
+        for row in query.order_by(*columns).yield_per(batch_size):
+            yield row
+    finally:
+        session.close()
+
+
+def stream_list(session, template, name, query, columns, **context):
+    """Render a list template over every row without materializing the table
+
+    Rows are pulled from the database only as Jinja consumes them and the HTML
+    goes out in chunks, so worker memory stays flat regardless of table size.
+    """
+    context[name] = iter_rows(session, query, columns)
+    return Response(stream_template(template, page=None, streaming=True, **context))
@@ -0,0 +1,90 @@
+"""Fixtures for the route tests: the app against a throwaway SQLite database
+
+config.py reads DATABASE_URL at import time, so it is pointed at a temporary
+file before anything from the app is imported. Postgres-only pieces
+(table_versions, the exclusion constraint, full-text search) are missing there
+and the routes fall back the way they do on an unmigrated database. Foreign keys
+are switched on, so ON DELETE CASCADE behaves as it does on Postgres.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import event
+
+_tmp = tempfile.mkdtemp(prefix='caregiver-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.pop('REPLICA_URLS', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as appmod  # noqa: E402
+import db  # noqa: E402
+from fragment_cache import fragment_cache  # noqa: E402
+from matching import caregiver_index  # noqa: E402
+from models import Base, User, Caregiver, Member, Address, Job, JobApplication, Appointment  # noqa: E402
+from options_cache import options_cache  # noqa: E402
+from validation import CAREGIVING_TYPES, GENDERS, APPOINTMENT_STATUSES  # noqa: E402
+
+
+@db.on_engine
+def _foreign_keys(engine):
+    #SQLite only enforces foreign keys, and so ON DELETE CASCADE, when asked to on each connection
+    event.listen(engine, 'connect', lambda connection, _record: connection.execute('PRAGMA foreign_keys=ON'))
+
+
+@pytest.fixture(scope='session')
+def engine():
+    engine = db.get_engine()
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+    shutil.rmtree(_tmp, ignore_errors=True)
+
+
+@pytest.fixture
+def client(engine):
+    return appmod.create_app({'TESTING': True}).test_client()
+
+
+def populate(session, n):
+    """n caregivers, 2n members with an address and a job each, n applications and 2n appointments"""
+    for i in range(1, 3 * n + 1):
+        session.add(User(user_id=i, email=f'user{i}@example.test', given_name=f'Given{i}', surname=f'Surname{i}',
+                         city='Astana' if i % 2 else 'Almaty', password='secret'))
+    session.flush()
+    for i in range(1, n + 1):
+        session.add(Caregiver(caregiver_user_id=i, gender=GENDERS[i % len(GENDERS)],
+                              caregiving_type=CAREGIVING_TYPES[i % len(CAREGIVING_TYPES)], hourly_rate=8 + i % 10))
+    for i in range(n + 1, 3 * n + 1):
+        session.add(Member(member_user_id=i, house_rules='No pets'))
+        session.add(Address(member_user_id=i, house_number=str(i), street='Kabanbay Batyr', town='Astana'))
+        session.add(Job(job_id=i - n, member_user_id=i, required_caregiving_type=CAREGIVING_TYPES[i % 3],
+                        other_requirements='soft-spoken', date_posted=date(2025, 1, 1)))
+    session.flush()
+    for i in range(1, n + 1):
+        session.add(JobApplication(caregiver_user_id=i, job_id=i, date_applied=date(2025, 1, 2)))
+    for k in range(2 * n): #one appointment per caregiver per day, so none overlap
+        session.add(Appointment(appointment_id=k + 1, caregiver_user_id=1 + k % n, member_user_id=n + 1 + k % (2 * n),
+                                appointment_date=date(2025, 1, 1) + timedelta(days=k // n), appointment_time=time(10),
+                                work_hours=2, status=APPOINTMENT_STATUSES[k % 3]))
+    session.commit()
+
+
+@pytest.fixture
+def seed(engine):
+    """seed(n) replaces every row with populate(n) and empties the per-process caches"""
+    def seed(n):
+        session = db.Session()
+        try:
+            for table in reversed(Base.metadata.sorted_tables):
+                session.execute(table.delete())
+            session.commit()
+            populate(session, n)
+        finally:
+            session.close()
+        for cache in (fragment_cache, options_cache, caregiver_index):
+            cache.invalidate()
+    return seed
@@ -0,0 +1,37 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from sqlalchemy import event
+
+import async_api
+
+
+def fetch_with_statements(path):
+    """(status, body text, statements run) for one GET against a fresh async_api app"""
+    async def fetch():
+        app = async_api.create_app()
+        statements = []
+        async with TestClient(TestServer(app)) as client:
+            event.listen(app[async_api.ENGINE].sync_engine, 'after_cursor_execute',
+                         lambda *args: statements.append(args[2]))
+            response = await client.get(path)
+            return response.status, await response.text(), statements
+    return asyncio.run(fetch())
+
+
+@pytest.mark.parametrize('resource, nested', [
+    ('caregivers', 'given_name'),
+    ('jobs', 'member_name'),
+    ('appointments', 'caregiver_name'),
+])
+def test_list_loader_options_survive_query_statement(seed, resource, nested):
+    #list_queries' contains_eager/joinedload options must carry over into Query.statement: a
+    #lazy load while serializing would raise MissingGreenlet on the asyncio driver
+    seed(6)
+    status, body, statements = fetch_with_statements(f'/api/{resource}?size=5')
+    assert status == 200, body #500 here is usually MissingGreenlet from a lazy load
+    items = json.loads(body)['items']
+    assert len(items) == 5 and all(item[nested] for item in items)
+    assert len(statements) == 1
@@ -0,0 +1,40 @@
+from datetime import date, time
+
+import pytest
+
+import db
+from availability import parse_ranges, ranges_of, window_bits, find_available, set_weekly, week_from_days
+from models import Caregiver
+
+
+def test_free_ranges_round_inwards():
+    assert ranges_of(parse_ranges('09:10-12:00')) == '09:15-12:00'
+    assert ranges_of(parse_ranges('09:00-12:05, 14:00-24:00')) == '09:00-12:00, 14:00-24:00'
+
+
+def test_free_range_without_a_whole_slot_is_rejected():
+    with pytest.raises(ValueError, match='no whole 15-minute slot'):
+        parse_ranges('09:05-09:10')
+    with pytest.raises(ValueError, match='end time must be after start time'):
+        parse_ranges('12:00-09:00')
+
+
+def test_search_window_still_rounds_outwards():
+    assert window_bits(time(9, 10), time(9, 20)) == window_bits(time(9), time(9, 30))
+
+
+def test_off_grid_free_time_does_not_match_the_slot_before_it(seed):
+    seed(3)
+    session = db.Session()
+    try:
+        monday = date(2030, 1, 7)
+        set_weekly(session, 1, week_from_days({'monday': parse_ranges('09:10-12:00')}))
+        session.commit()
+        caregiver = session.get(Caregiver, 1)
+        found = find_available(session, caregiver.caregiving_type, caregiver.user.city, monday, time(9), time(12))
+        assert 1 not in [e.caregiver_user_id for e in found]
+        found = find_available(session, caregiver.caregiving_type, caregiver.user.city, monday, time(9, 15), time(12))
+        assert 1 in [e.caregiver_user_id for e in found]
+    finally:
+        session.close()
+
@@ -0,0 +1,42 @@
+from datetime import date
+
+from sqlalchemy import event
+
+import db
+from models import Appointment
+from options_cache import options_cache
+
+
+def test_edit_into_overlap_shows_conflict_without_flushing(client, seed, engine):
+    seed(6)
+    session = db.Session()
+    session.get(Appointment, 1).status = 'accepted' #caregiver 1, 2025-01-01 10:00-12:00
+    session.commit()
+    session.close()
+    options_cache.invalidate() #a cache miss loads the dropdowns, which used to autoflush the rejected edit
+
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('UPDATE APPOINTMENT'):
+            updates.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.post('/appointments/7/edit', data={ #caregiver 1's appointment on 2025-01-02
+            'caregiver_user_id': '1', 'member_user_id': '13', 'appointment_date': '2025-01-01',
+            'appointment_time': '11:00', 'work_hours': '2', 'status': 'accepted'})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 200
+    body = response.data.decode()
+    assert 'Scheduling conflict' in body
+    assert 'value="11:00"' in body #the form shows what was submitted
+    assert updates == [] #on Postgres a flushed UPDATE would hit appointment_no_overlap
+
+    session = db.Session()
+    try:
+        assert session.get(Appointment, 7).appointment_date == date(2025, 1, 2)
+    finally:
+        session.close()
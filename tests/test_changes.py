@@ -0,0 +1,12 @@
+def test_editing_a_composite_key_refreshes_the_cached_list(client, seed):
+    seed(6)
+    #a short first page ends at (3, 3), so the new key (6, 12) falls outside it and only the old one reaches it
+    assert '/job-applications/1/1/edit' in client.get('/job-applications?size=3').data.decode()
+
+    response = client.post('/job-applications/1/1/edit', data={
+        'caregiver_user_id': '6', 'job_id': '12', 'date_applied': '2025-01-03'})
+    assert response.status_code == 302
+
+    body = client.get('/job-applications?size=3').data.decode()
+    assert '/job-applications/1/1/edit' not in body
+    assert '/job-applications/2/2/edit' in body
@@ -0,0 +1,90 @@
+"""Single-row and bulk deletes: one DELETE, cascaded children, and caches that notice them"""
+import pytest
+from sqlalchemy import event
+
+import db
+from config import BATCH_MAX_RECORDS
+from models import Member, Job, Appointment
+
+
+@pytest.fixture
+def deletes(engine):
+    """DELETE statements the engine runs; tests clear it once seeded"""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('DELETE'):
+            seen.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', record)
+    yield seen
+    event.remove(engine, 'after_cursor_execute', record)
+
+
+def prime_child_pages(client):
+    """Cache pages showing member 7's appointment and, two cascades down (member, job), job 1's application"""
+    assert '/appointments/1/edit' in client.get('/appointments').data.decode()
+    assert '/job-applications/1/1/edit' in client.get('/job-applications').data.decode()
+
+
+def assert_children_gone(client):
+    #the job-applications page references no member key, so only the cascade marking can refresh it
+    assert '/appointments/1/edit' not in client.get('/appointments').data.decode()
+    assert '/job-applications/1/1/edit' not in client.get('/job-applications').data.decode()
+    session = db.Session()
+    try:
+        assert session.query(Job).filter_by(member_user_id=7).count() == 0
+        assert session.query(Appointment).filter_by(member_user_id=7).count() == 0
+    finally:
+        session.close()
+
+
+def test_delete_route_runs_one_delete_and_refreshes_cascaded_pages(client, seed, deletes):
+    seed(6)
+    prime_child_pages(client)
+    deletes.clear()
+    response = client.post('/members/7/delete')
+    assert response.status_code == 302
+    assert response.headers['X-DB-Queries'] == '1' and len(deletes) == 1
+    assert_children_gone(client)
+
+
+def test_delete_route_reports_a_missing_key(client, seed, deletes):
+    seed(6)
+    deletes.clear()
+    response = client.post('/members/999/delete', follow_redirects=True)
+    assert 'Error deleting member: 404 Not Found' in response.data.decode()
+    assert len(deletes) == 1
+    assert '/members/7/edit' in client.get('/members').data.decode()
+
+
+def test_bulk_delete_runs_one_delete_and_reports_missing_ids(client, seed, deletes):
+    seed(6)
+    prime_child_pages(client)
+    deletes.clear()
+    response = client.post('/api/members:delete', json={'ids': [7, 8, 999, 7]})
+    assert response.status_code == 200
+    assert response.get_json() == {'requested': 3, 'deleted': 2, 'missing': [999]}
+    assert response.headers['X-DB-Queries'] == '1' and len(deletes) == 1
+    assert_children_gone(client)
+    session = db.Session()
+    try:
+        assert session.get(Member, 9) is not None
+    finally:
+        session.close()
+
+
+@pytest.mark.parametrize('path, body, status, error', [
+    ('/api/caregivers:delete', {'ids': 'all'}, 400, 'expected a JSON list'),
+    ('/api/caregivers:delete', [1, '2'], 400, 'ids must be integers'),
+    ('/api/caregivers:delete', [True], 400, 'ids must be integers'),
+    ('/api/caregivers:delete', list(range(BATCH_MAX_RECORDS + 1)), 413, f'at most {BATCH_MAX_RECORDS} ids'),
+    ('/api/job-applications:delete', [1], 404, 'entity must be one of'),
+])
+def test_bulk_delete_rejects_bad_requests_without_deleting(client, seed, deletes, path, body, status, error):
+    seed(6)
+    deletes.clear()
+    response = client.post(path, json=body)
+    assert response.status_code == status
+    assert error in response.get_json()['error']
+    assert deletes == []
@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+import pytest
+
+import db
+import maintenance
+from models import Caregiver
+
+PARAMS = {'below': Decimal('10'), 'add': Decimal('0.3'), 'percent': Decimal('10')}
+
+
+@pytest.fixture
+def checkpoints(engine):
+    maintenance.maintenance_metadata.create_all(engine)
+    yield
+    maintenance.maintenance_metadata.drop_all(engine)
+
+
+def rates():
+    session = db.Session()
+    try:
+        return {c.caregiver_user_id: c.hourly_rate for c in session.query(Caregiver)}
+    finally:
+        session.close()
+
+
+def raised_once(before):
+    """The rates after exactly one application of PARAMS"""
+    return {key: (rate + PARAMS['add'] if rate < PARAMS['below'] else rate * (1 + PARAMS['percent'] / 100))
+            .quantize(Decimal('0.01')) for key, rate in before.items()}
+
+
+def run(**kwargs):
+    return maintenance.run('rates', PARAMS, name='raise', chunk_size=2, pause=0, **kwargs)
+
+
+def test_max_chunks_stops_and_a_rerun_resumes_after_the_checkpoint(seed, checkpoints):
+    seed(6) #rates 9..14: caregiver 1 gets the flat increase, the rest the percentage
+    before = rates()
+
+    first = run(max_chunks=1)
+    assert first['stopped'] == 'max_chunks' and first['last_key'] == 2 and first['chunks_done'] == 1
+    assert rates() == {**before, **{key: raised_once(before)[key] for key in (1, 2)}}
+
+    second = run()
+    assert second['stopped'] == 'finished' and second['chunks_done'] == 3 #6 rows in chunks of 2; the empty 4th ends it
+    assert second['counts'] == {'caregiver': 6}
+    assert rates() == raised_once(before)
+
+    again = run() #a finished run is not repeated
+    assert again['stopped'] == 'finished' and again['chunks_done'] == 3
+    assert rates() == raised_once(before)
+
+
+def test_an_interrupted_chunk_is_rolled_back_with_its_checkpoint(seed, checkpoints, monkeypatch):
+    seed(6)
+    before = rates()
+    now = maintenance._now
+    calls = []
+
+    def failing_now(): #start() and chunk 1 stamp their rows; chunk 2 fails after its UPDATE, before its checkpoint
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError('connection lost')
+        return now()
+
+    monkeypatch.setattr(maintenance, '_now', failing_now)
+    with pytest.raises(RuntimeError):
+        run()
+    monkeypatch.setattr(maintenance, '_now', now)
+    assert maintenance.status('raise')[0]['last_key'] == 2
+
+    assert run()['stopped'] == 'finished'
+    assert rates() == raised_once(before) #chunk 3..4 was applied once, by the rerun
+
+
+def test_resuming_with_other_parameters_is_refused_unless_restarted(seed, checkpoints):
+    seed(6)
+    before = rates()
+    run(max_chunks=1)
+    with pytest.raises(ValueError, match='restart it'):
+        maintenance.run('rates', {**PARAMS, 'percent': Decimal('20')}, name='raise', chunk_size=2, pause=0)
+    assert rates() == {**before, **{key: raised_once(before)[key] for key in (1, 2)}}
+
+    run() #finish, then start over: --restart applies the increase a second time
+    restarted = run(restart=True)
+    assert restarted['stopped'] == 'finished' and restarted['counts'] == {'caregiver': 6}
+    assert rates() == raised_once(raised_once(before))
+
+
+def test_dry_run_counts_what_the_run_would_still_do(seed, checkpoints):
+    seed(6)
+    assert maintenance.dry_run('rates', PARAMS, name='raise')['counts'] == {'caregiver': 6}
+    run(max_chunks=1)
+    partial = maintenance.dry_run('rates', PARAMS, name='raise')
+    assert partial['resume_after'] == 2 and partial['counts'] == {'caregiver': 4}
+
+    run()
+    finished = maintenance.dry_run('rates', PARAMS, name='raise')
+    assert finished['finished'] and finished['counts'] == {} #run() would stop at once
+    restarted = maintenance.dry_run('rates', PARAMS, name='raise', restart=True)
+    assert not restarted['finished'] and restarted['counts'] == {'caregiver': 6}
@@ -0,0 +1,52 @@
+import pytest
+
+import migrate
+
+
+def test_no_transaction_files_keep_do_blocks_whole():
+    with open(f'{migrate.MIGRATIONS_DIR}/0009_appointment_cascade.sql') as f:
+        statements = migrate.split_statements(f.read())
+    assert len(statements) == 4
+    assert statements[0].startswith('DO $$') and statements[0].endswith('END $$;')
+    assert statements[1] == 'ALTER TABLE appointment VALIDATE CONSTRAINT appointment_caregiver_user_id_fkey;'
+
+
+def test_no_transaction_statements_never_end_inside_dollar_quotes():
+    for name in migrate.available_migrations():
+        with open(f'{migrate.MIGRATIONS_DIR}/{name}') as f:
+            sql = f.read()
+        if sql.startswith(migrate.NO_TRANSACTION):
+            for statement in migrate.split_statements(sql):
+                assert statement.endswith(';') and statement.count('$$') % 2 == 0, (name, statement)
+
+
+class RecordingConnection:
+    """Answers the pg_index lookup with invalid and records every statement"""
+
+    def __init__(self, invalid):
+        self.invalid = invalid
+        self.executed = []
+
+    def exec_driver_sql(self, sql):
+        self.executed.append(sql)
+        invalid = self.invalid
+
+        class Result:
+            def scalar(self):
+                return invalid
+        return Result()
+
+
+@pytest.mark.parametrize('invalid, dropped', [(True, True), (False, False), (None, False)])
+def test_an_invalid_leftover_index_is_dropped_before_its_create(invalid, dropped):
+    conn = RecordingConnection(invalid) #None: no index of that name yet
+    statement = 'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_job_member_user_id ON job (member_user_id);'
+    assert migrate.drop_invalid_index(conn, statement) is dropped
+    assert "to_regclass('idx_job_member_user_id')" in conn.executed[0]
+    assert conn.executed[1:] == (['DROP INDEX CONCURRENTLY idx_job_member_user_id'] if dropped else [])
+
+
+def test_other_statements_are_left_alone():
+    conn = RecordingConnection(True)
+    assert not migrate.drop_invalid_index(conn, 'ALTER TABLE appointment VALIDATE CONSTRAINT appointment_member_user_id_fkey;')
+    assert conn.executed == []
@@ -0,0 +1,71 @@
+"""List pages must run the same number of SQL statements whatever the table size
+
+Each route is fetched at N and 10*N rows with QUERY_BUDGET_STRICT on, so a
+route over its @query_budget fails with a 500 and one whose statement count
+grows with the rows (an N+1 lazy load) fails the comparison.
+"""
+import pytest
+from sqlalchemy import event
+
+import instrumentation
+
+LIST_ROUTES = ['/users', '/caregivers', '/members', '/addresses', '/jobs', '/job-applications', '/appointments']
+SMALL, LARGE = 6, 60
+
+
+@pytest.fixture(autouse=True)
+def strict_budget(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'QUERY_BUDGET_STRICT', True)
+
+
+@pytest.fixture
+def statements(engine):
+    """Every statement the engine runs, including ones a streamed body issues after X-DB-Queries is set"""
+    seen = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', count)
+    yield seen
+    event.remove(engine, 'after_cursor_execute', count)
+
+
+def page_statements(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.data[:500]
+    return int(response.headers['X-DB-Queries'])
+
+
+def streamed_statements(client, statements, url):
+    before = len(statements)
+    response = client.get(url)
+    body = response.get_data() #the rows are queried while the body streams
+    assert response.status_code == 200, body[:500]
+    assert b'<tr' in body
+    return len(statements) - before
+
+
+@pytest.mark.parametrize('url', LIST_ROUTES)
+def test_list_page_statement_count_is_constant(client, seed, url):
+    seed(SMALL)
+    small = page_statements(client, url)
+    seed(LARGE)
+    large = page_statements(client, url)
+    assert small == large, f"{url}: {small} statements at {SMALL}, {large} at {LARGE}"
+
+
+@pytest.mark.parametrize('url', LIST_ROUTES)
+def test_streamed_list_statement_count_is_constant(client, seed, statements, url):
+    seed(SMALL)
+    small = streamed_statements(client, statements, url + '?all=1')
+    seed(LARGE)
+    large = streamed_statements(client, statements, url + '?all=1')
+    assert small == large, f"{url}?all=1: {small} statements at {SMALL}, {large} at {LARGE}"
+
+
+def test_page_after_the_first_is_constant_too(client, seed):
+    seed(LARGE)
+    first = client.get('/appointments?size=10')
+    cursor = first.data.decode().split('after=', 1)[1].split('"', 1)[0].replace('&amp;', '&')
+    assert page_statements(client, f'/appointments?size=10&after={cursor}') == int(first.headers['X-DB-Queries'])
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import db
+import versions
+from conftest import populate
+from models import Base
+
+
+def write_versions(engine, version):
+    with engine.begin() as connection:
+        connection.execute(versions.table_versions.delete())
+        connection.execute(versions.table_versions.insert().values(
+            table_name='user', slot=0, version=version, changed_at=datetime.now(timezone.utc)))
+
+
+@pytest.fixture
+def lagging_replica(engine, tmp_path, monkeypatch):
+    """A replica that is behind: populate(3) rows and version 1 of "user" (the primary is at 2)"""
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    replica_engine = create_engine(url)
+    Base.metadata.create_all(replica_engine)
+    versions.versions_metadata.create_all(replica_engine)
+    with Session(replica_engine) as session:
+        populate(session, 3)
+    write_versions(replica_engine, 1)
+    replica_engine.dispose()
+
+    versions.versions_metadata.create_all(engine)
+    write_versions(engine, 2)
+    monkeypatch.setattr(db, 'REPLICA_URLS', [url])
+    monkeypatch.setattr(db, '_replicas', [db.Replica(url)])
+    yield db._replicas[0]
+    db._replicas[0].engine.dispose()
+    versions.versions_metadata.drop_all(engine)
+
+
+def test_etag_is_read_from_the_replica_that_serves_the_body(client, seed, lagging_replica):
+    seed(6)
+    response = client.get('/users')
+    body = response.data.decode()
+    assert lagging_replica.reads == 1
+    assert 'user9@example.test' in body and 'user18@example.test' not in body #the replica's rows...
+    replica_versions = versions.current_versions(['user'], engine=lagging_replica.engine)
+    assert response.headers['ETag'] == f'W/"{versions.etag_for(replica_versions, "/users?")}"' #...under its version
+
+    #once the replica catches up the version moves on, so the cached stale page is not revalidated
+    write_versions(lagging_replica.engine, 2)
+    assert client.get('/users', headers={'If-None-Match': response.headers['ETag']}).status_code == 200
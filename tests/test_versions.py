@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import versions
+
+
+@pytest.fixture
+def version_slots(engine):
+    """table_versions as migrations 0007 and 0010 leave it, with one row per (table, slot)"""
+    versions.versions_metadata.create_all(engine)
+
+    def bump(table, slot):
+        with engine.begin() as connection:
+            row = connection.execute(versions.table_versions.select().where(
+                versions.table_versions.c.table_name == table, versions.table_versions.c.slot == slot)).first()
+            now = datetime.now(timezone.utc)
+            if row is None:
+                connection.execute(versions.table_versions.insert().values(
+                    table_name=table, slot=slot, version=1, changed_at=now))
+            else:
+                connection.execute(versions.table_versions.update().where(
+                    versions.table_versions.c.table_name == table, versions.table_versions.c.slot == slot)
+                    .values(version=row.version + 1, changed_at=now))
+
+    yield bump
+    versions.versions_metadata.drop_all(engine)
+
+
+def test_version_is_the_sum_of_slots(engine, version_slots):
+    version_slots('user', 3)
+    version_slots('user', 3)
+    version_slots('user', 11)
+    found = versions.current_versions(['user', 'job'])
+    assert found['user'][0] == 3
+    assert found['job'] == (0, None)
+
+
+def test_etag_changes_with_any_slot_and_with_the_release(client, seed, version_slots, monkeypatch):
+    seed(3)
+    version_slots('user', 0)
+    first = client.get('/users')
+    etag = first.headers['ETag']
+    assert client.get('/users', headers={'If-None-Match': etag}).status_code == 304
+
+    version_slots('user', 7) #a writer on another backend's slot
+    second = client.get('/users', headers={'If-None-Match': etag})
+    assert second.status_code == 200 and second.headers['ETag'] != etag
+
+    etag = second.headers['ETag']
+    monkeypatch.setattr(versions, 'RELEASE_REVISION', 'next-deploy')
+    assert client.get('/users', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_conditional_get_off_serves_full_pages_without_etags(client, seed, version_slots, monkeypatch):
+    seed(3)
+    version_slots('user', 0)
+    etag = client.get('/users').headers['ETag']
+    monkeypatch.setattr(versions, 'CONDITIONAL_GET', False)
+    response = client.get('/users', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and 'ETag' not in response.headers
@@ -0,0 +1,179 @@
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+
+#mirrors the CHECK constraints in database_schema.sql
+CAREGIVING_TYPES = ('Babysitter', 'Elderly Care', 'Playmate')
+GENDERS = ('M', 'F', 'O')
+APPOINTMENT_STATUSES = ('pending', 'accepted', 'declined')
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and value.strip() == '')
+
+
+def text_value(record, field, required=False, max_length=None):
+    value = record.get(field)
+    if _blank(value):
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    value = str(value).strip()
+    if max_length and len(value) > max_length:
+        raise ValueError(f"{field} is longer than {max_length} characters")
+    return value
+
+
+def int_value(record, field, required=False):
+    value = record.get(field)
+    if _blank(value):
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be an integer, got {value!r}")
+
+
+def decimal_value(record, field, required=False, minimum=None, exclusive=False):
+    value = record.get(field)
+    if _blank(value):
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"{field} must be a number, got {value!r}")
+    if not number.is_finite():
+        raise ValueError(f"{field} must be a finite number")
+    if minimum is not None and (number <= minimum if exclusive else number < minimum):
+        raise ValueError(f"{field} must be {'greater than' if exclusive else 'at least'} {minimum}")
+    return number
+
+
+def date_value(record, field, required=False, default=None):
+    value = record.get(field)
+    if _blank(value):
+        if required:
+            raise ValueError(f"{field} is required")
+        return default
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"{field} must use YYYY-MM-DD format, got {value!r}")
+
+
+def time_value(record, field, required=False):
+    value = record.get(field)
+    if _blank(value):
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    text = str(value).strip()
+    for fmt in ('%H:%M', '%H:%M:%S'):
+        try:
+            return datetime.strptime(text, fmt).time()
+        except ValueError:
+            pass
+    raise ValueError(f"{field} must use HH:MM format, got {value!r}")
+
+
+def choice_value(record, field, choices, required=False, default=None):
+    value = text_value(record, field)
+    if value is None:
+        if required and default is None:
+            raise ValueError(f"{field} is required")
+        return default
+    if value not in choices:
+        raise ValueError(f"{field} must be one of: {', '.join(choices)}")
+    return value
+
+
+#entity -> function(record) -> dict of typed column values; raises ValueError on the first bad field
+
+def validate_user(record):
+    return {
+        'user_id': int_value(record, 'user_id'),
+        'email': text_value(record, 'email', required=True, max_length=255),
+        'given_name': text_value(record, 'given_name', required=True, max_length=100),
+        'surname': text_value(record, 'surname', required=True, max_length=100),
+        'city': text_value(record, 'city', max_length=100),
+        'phone_number': text_value(record, 'phone_number', max_length=50),
+        'profile_description': text_value(record, 'profile_description'),
+        'password': text_value(record, 'password', required=True, max_length=255),
+    }
+
+
+def validate_caregiver(record):
+    return {
+        'caregiver_user_id': int_value(record, 'caregiver_user_id'),
+        'photo': text_value(record, 'photo'),
+        'gender': choice_value(record, 'gender', GENDERS),
+        'caregiving_type': choice_value(record, 'caregiving_type', CAREGIVING_TYPES, required=True),
+        'hourly_rate': decimal_value(record, 'hourly_rate', required=True, minimum=0),
+    }
+
+
+def validate_member(record):
+    return {
+        'member_user_id': int_value(record, 'member_user_id'),
+        'house_rules': text_value(record, 'house_rules'),
+        'dependent_description': text_value(record, 'dependent_description'),
+    }
+
+
+def validate_address(record):
+    return {
+        'member_user_id': int_value(record, 'member_user_id'),
+        'house_number': text_value(record, 'house_number', max_length=20),
+        'street': text_value(record, 'street', max_length=255),
+        'town': text_value(record, 'town', max_length=100),
+    }
+
+
+def validate_job(record):
+    return {
+        'job_id': int_value(record, 'job_id'),
+        'member_user_id': int_value(record, 'member_user_id'),
+        'required_caregiving_type': choice_value(record, 'required_caregiving_type', CAREGIVING_TYPES, required=True),
+        'person_age': int_value(record, 'person_age'),
+        'preferred_time_start': time_value(record, 'preferred_time_start'),
+        'preferred_time_end': time_value(record, 'preferred_time_end'),
+        'service_frequency': text_value(record, 'service_frequency', max_length=50),
+        'other_requirements': text_value(record, 'other_requirements'),
+        'date_posted': date_value(record, 'date_posted', default=date.today()),
+    }
+
+
+def validate_job_application(record):
+    return {
+        'caregiver_user_id': int_value(record, 'caregiver_user_id'),
+        'job_id': int_value(record, 'job_id', required=True),
+        'date_applied': date_value(record, 'date_applied', default=date.today()),
+    }
+
+
+def validate_appointment(record):
+    return {
+        'appointment_id': int_value(record, 'appointment_id'),
+        'caregiver_user_id': int_value(record, 'caregiver_user_id'),
+        'member_user_id': int_value(record, 'member_user_id'),
+        'appointment_date': date_value(record, 'appointment_date', required=True),
+        'appointment_time': time_value(record, 'appointment_time', required=True),
+        'work_hours': decimal_value(record, 'work_hours', required=True, minimum=0, exclusive=True),
+        'status': choice_value(record, 'status', APPOINTMENT_STATUSES, default='pending'),
+    }
+
+
+VALIDATORS = {
+    'user': validate_user,
+    'caregiver': validate_caregiver,
+    'member': validate_member,
+    'address': validate_address,
+    'job': validate_job,
+    'job_application': validate_job_application,
+    'appointment': validate_appointment,
+}
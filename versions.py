@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session as flask_session
+from sqlalchemy import Table, Column, String, SmallInteger, BigInteger, DateTime, MetaData, select, func
+from sqlalchemy.exc import SQLAlchemyError
+
+import db
+from config import RELEASE, CONDITIONAL_GET
+
+logger = logging.getLogger(__name__)
+
+#created and maintained by migrations/0007_table_versions.sql and 0010, not by create_all()
+versions_metadata = MetaData()
+
+table_versions = Table(
+    'table_versions', versions_metadata,
+    Column('table_name', String, primary_key=True),
+    Column('slot', SmallInteger, primary_key=True), #writers spread over slots so they never share a row lock
+    Column('version', BigInteger, nullable=False),
+    Column('changed_at', DateTime(timezone=True), nullable=False),
+)
+
+
+def _release():
+    """(revision, modified) of the deployed code: a page's ETag and Last-Modified must change with its markup"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    paths = sorted([os.path.join(root, name) for name in os.listdir(root) if name.endswith('.py')] +
+                   [os.path.join(directory, name) for directory, _dirs, names in os.walk(os.path.join(root, 'templates'))
+                    for name in names if name.endswith('.html')])
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    modified = max((os.path.getmtime(path) for path in paths), default=0)
+    return RELEASE or digest.hexdigest()[:12], datetime.fromtimestamp(modified, timezone.utc)
+
+
+RELEASE_REVISION, RELEASE_MODIFIED = _release()
+
+
+def reads_from_replica():
+    """GET/HEAD may read from a replica, unless this client wrote in the last REPLICA_PIN_SECONDS"""
+    return request.method in ('GET', 'HEAD') and flask_session.get('primary_until', 0) < datetime.now().timestamp()
+
+
+def current_versions(tables, connection=None, engine=None):
+    """{table: (version, changed_at)} in one indexed lookup; tables never written are (0, None)
+
+    A table's version is the sum over its slots: every write bumps one slot, so the
+    sum changes whenever the table does. engine defaults to the primary.
+    """
+    statement = select(table_versions.c.table_name, func.sum(table_versions.c.version),
+                       func.max(table_versions.c.changed_at))\
+        .where(table_versions.c.table_name.in_(tables)).group_by(table_versions.c.table_name)
+    if connection is None:
+        with (engine or db.get_engine()).connect() as connection:
+            rows = connection.execute(statement).all()
+    else:
+        rows = connection.execute(statement).all()
+    found = {name: (version, changed_at) for name, version, changed_at in rows}
+    return {name: found.get(name, (0, None)) for name in tables}
+
+
+def version_key(versions):
+    return ','.join(f'{name}:{versions[name][0]}' for name in sorted(versions))
+
+
+def etag_for(versions, path):
+    """Weak ETag for a rendered page: the release, the versions of its tables and the URL (page, size, filters)"""
+    digest = hashlib.sha1(f'{RELEASE_REVISION}|{version_key(versions)}|{path}'.encode()).hexdigest()[:20]
+    return digest
+
+
+def conditional(*tables):
+    """Answer 304 Not Modified from the table versions alone, before the view runs
+
+    The view, its ORM queries and the template render only happen when the
+    client's ETag (or If-Modified-Since) is stale. Pages with pending flash
+    messages are always rendered, since the message is part of the body, and so
+    is every page when CONDITIONAL_GET is off.
+
+    The versions are read from the server the body will be read from: the replica
+    is picked here and kept in g.replica_engine for the view's session, so a
+    lagging replica's rows are never sent (or cached) under the primary's ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not CONDITIONAL_GET or '_flashes' in flask_session:
+                return view(*args, **kwargs)
+            if reads_from_replica():
+                g.replica_engine = db.choose_replica() #None: no usable replica, so the primary serves both
+            try:
+                versions = current_versions(tables, engine=g.get('replica_engine'))
+            except SQLAlchemyError as e: #table_versions not migrated yet: behave like a plain view
+                logger.debug("table versions unavailable: %s", e)
+                return view(*args, **kwargs)
+            g.table_versions = versions #lets the view key its own caches on them without a second lookup
+            etag = etag_for(versions, request.full_path)
+            changed = [at if at.tzinfo else at.replace(tzinfo=timezone.utc)
+                       for _version, at in versions.values() if at is not None]
+            #a deploy can change the markup without a write, so it counts as a modification too
+            last_modified = max(changed + [RELEASE_MODIFIED]).replace(microsecond=0) if changed else None
+
+            if request.if_none_match:
+                fresh = request.if_none_match.contains_weak(etag)
+            else:
+                fresh = bool(last_modified and request.if_modified_since and last_modified <= request.if_modified_since)
+            if fresh:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache' #store, but revalidate on every use
+            return response
+        return wrapper
+    return decorator
+